@@ -0,0 +1,160 @@
+import json
+import os
+import platform
+import resource
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pulp
+import scipy
+
+import lp_optimizer
+from farm_area_parser import read_area_register
+from fertility_scoring import score_soil
+from lp_model_builder import build_lp_arrays
+from soil_stream import _iter_csv_batches, _iter_xlsx_batches, clean_soil_batch, to_scoring_frame
+from synthetic_data import (SOIL_EXPORT_HEADER, make_crop_catalogue, make_recommendations, make_soil_samples,
+                            write_area_register, write_soil_export_csv)
+
+# Benchmark harness for the planning pipeline on synthetic instances.
+# For each size (number of plots) a fresh worker process generates a soil
+# export, an area register and a crop catalogue, then times every stage:
+# CSV and Excel ingest, unit cleaning, Pᵢ/P综 scoring, area register parsing,
+# LP array build, PuLP model build, solve and report output. Each record has
+# wall seconds, rows per second and the process peak RSS after the stage,
+# and all records go to one JSON results file together with the machine and
+# library versions, so runs can be compared across refactors and hardware.
+
+BENCHMARK_SIZES = (100, 1_000, 10_000, 100_000, 1_000_000)
+RESULTS_FILE = 'benchmark_results.json'
+
+# Stages that are impractical at the largest sizes run only up to these plot counts
+DEFAULT_LIMITS = {
+    'excel_ingest': 10_000, # openpyxl writes/reads ~10⁴ rows/s
+    'lp_pulp_build': 100_000, # one Python object per variable
+    'lp_solve': 100_000,
+    'report_output': 100_000
+}
+
+
+def _peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024 # KiB on Linux
+
+
+def _write_soil_export_xlsx(path, n_rows, seed):
+    from openpyxl import Workbook # Only needed for the Excel stage
+
+    samples = make_soil_samples(n_rows, seed=seed)
+    units = ['', '℃', '%', 'us/cm', '', 'mg/kg', 'mg/kg', 'mg/kg', 'mg/kg']
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('土壤指标')
+    sheet.append(SOIL_EXPORT_HEADER)
+    columns = [samples[col].astype(str) + unit for col, unit in zip(samples.columns, units)]
+    for row in zip(*columns):
+        sheet.append(list(row))
+    workbook.save(path)
+
+
+# --- 1. One Instance Size ---
+def _run_size(n_plots, n_crops, seed, limits, work_dir):
+    records = []
+
+    def record(stage, rows, func, *args):
+        if n_plots > limits.get(stage, n_plots):
+            records.append({'Plots': n_plots, 'Stage': stage, 'Status': 'skipped', 'Rows': rows,
+                            'Seconds': None, 'Rows_per_s': None, 'Peak_RSS_MB': None})
+            return None
+        start = time.perf_counter()
+        result = func(*args)
+        seconds = time.perf_counter() - start
+        records.append({'Plots': n_plots, 'Stage': stage, 'Status': 'ok', 'Rows': rows, 'Seconds': round(seconds, 4),
+                        'Rows_per_s': round(rows / seconds) if seconds > 0 else None,
+                        'Peak_RSS_MB': round(_peak_rss_mb(), 1)})
+        return result
+
+    csv_path = os.path.join(work_dir, f'soil_{n_plots}.csv')
+    xlsx_path = os.path.join(work_dir, f'soil_{n_plots}.xlsx')
+    register_path = os.path.join(work_dir, f'areas_{n_plots}.txt')
+    write_soil_export_csv(csv_path, n_plots, seed=seed)
+    write_area_register(register_path, n_plots, seed=seed)
+    if n_plots <= limits.get('excel_ingest', n_plots):
+        _write_soil_export_xlsx(xlsx_path, n_plots, seed)
+
+    raw = record('csv_ingest', n_plots, lambda: pd.concat(_iter_csv_batches(csv_path, n_plots), ignore_index=True))
+    record('excel_ingest', n_plots, lambda: pd.concat(_iter_xlsx_batches(xlsx_path, n_plots), ignore_index=True))
+    cleaned = record('unit_cleaning', n_plots, clean_soil_batch, raw)
+    scored = record('scoring', n_plots, lambda: score_soil(to_scoring_frame(cleaned)))
+    farm_areas_df = record('area_parse', n_plots, lambda: read_area_register(register_path)[0])
+
+    if n_crops is None:
+        crop_df, recommendations, nitrogen_fixers = (lp_optimizer.crop_df, lp_optimizer.recommendations,
+                                                     lp_optimizer.nitrogen_fixers)
+    else:
+        crop_df = make_crop_catalogue(n_crops, seed=seed)
+        recommendations, nitrogen_fixers = make_recommendations(crop_df['Crop_Name'], seed=seed)
+    scored_grades = dict(zip(scored['Farm_Name'], scored['Fertility_Grade']))
+    grades = {farm: scored_grades.get(farm, 'II') for farm in farm_areas_df['Farm_Name']}
+    model = record('lp_arrays', n_plots, build_lp_arrays, farm_areas_df, crop_df, grades, recommendations, nitrogen_fixers)
+    planner = record('lp_pulp_build', n_plots, lp_optimizer.CropPlanner, farm_areas_df, crop_df, grades,
+                     recommendations, nitrogen_fixers)
+    if planner is not None:
+        record('lp_solve', n_plots, planner.solve)
+        plan_path = os.path.join(work_dir, f'plan_{n_plots}.csv')
+        record('report_output', n_plots, lambda: lp_optimizer.build_planting_report(planner)[0].to_csv(plan_path, index=False))
+    for rec in records:
+        rec['LP_Variables'] = int(len(model['c']))
+    return records
+
+
+# --- 2. Suite ---
+def environment_info():
+    """Machine and library versions stored with every results file."""
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'platform': platform.platform(),
+        'processor': platform.processor(),
+        'cpu_count': os.cpu_count(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'scipy': scipy.__version__,
+        'pulp': pulp.__version__
+    }
+
+
+def run_benchmarks(sizes=BENCHMARK_SIZES, n_crops=None, seed=0, limits=None, results_file=RESULTS_FILE):
+    """Run every stage for each plot count and write the JSON results file.
+
+    `n_crops=None` uses the 30-crop campus catalogue, otherwise a synthetic
+    catalogue of that size. Each size runs in its own process so peak RSS is
+    per size. Returns the records as a DataFrame.
+    """
+    limits = {**DEFAULT_LIMITS, **(limits or {})}
+    records = []
+    with tempfile.TemporaryDirectory() as work_dir:
+        for n in sizes:
+            with ProcessPoolExecutor(max_workers=1) as pool:
+                records += pool.submit(_run_size, n, n_crops, seed, limits, work_dir).result()
+            for name in os.listdir(work_dir):
+                os.remove(os.path.join(work_dir, name))
+    results = {'environment': environment_info(),
+               'config': {'sizes': list(sizes), 'n_crops': n_crops, 'seed': seed, 'limits': limits},
+               'records': records}
+    with open(results_file, 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    return pd.DataFrame(records)
+
+
+def main():
+    df = run_benchmarks()
+    print(f"--- Pipeline Benchmarks (results in {RESULTS_FILE}) ---")
+    print(df.pivot_table(index='Stage', columns='Plots', values='Seconds', sort=False).to_string())
+    print("\nPeak RSS (MB) per size:")
+    print(df.groupby('Plots')['Peak_RSS_MB'].max().to_string())
+
+
+if __name__ == '__main__':
+    main()
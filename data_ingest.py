@@ -0,0 +1,187 @@
+import hashlib
+import os
+import re
+import time
+
+import numpy as np
+import pandas as pd
+
+from tracing import span, traced
+from unit_parser import parse_numeric
+
+# Single ingest layer for the 附件1 (soil) and 附件3 (crop) workbooks.
+# Each workbook is parsed once into a cleaned, typed table and stored in a
+# columnar .npz cache (one NumPy array per column, no pickling). The cache
+# file name carries the workbook's content hash and modification time, so an
+# edited or replaced workbook is re-parsed automatically and unchanged ones
+# load without touching Excel.
+
+SOIL_WORKBOOK = "附件1 校园微农场土壤指标.xlsx"
+CROP_WORKBOOK = "附件3 微农场农作物产量.xlsx"
+CACHE_DIR = ".ingest_cache"
+CACHE_VERSION = 3 # Bump when a parser's output changes
+
+
+# --- 1. Workbook Parsers ---
+def clean_col_name(col_name):
+    name = str(col_name)
+    name = re.sub(r'\s*\(.*\)|℃|%|mg/kg|g/kg|us/cm', '', name).strip()
+    if name == "酸碱度pH" or name == "酸碱度": # Handles if original is '酸碱度pH' or just '酸碱度'
+        return "pH"
+    return name
+
+
+@traced('ingest.soil_workbook')
+def parse_soil_workbook(path=SOIL_WORKBOOK):
+    """Soil indicator table indexed by 学院 with unit-free numeric columns."""
+    df = pd.read_excel(path, sheet_name='土壤指标', skiprows=1)
+    cleaned_column_names = [clean_col_name(col) for col in df.columns]
+    df.columns = cleaned_column_names
+    df = df.set_index(cleaned_column_names[0])
+    for col in df.columns:
+        if df[col].dtype == 'object' or pd.api.types.is_string_dtype(df[col]):
+            df[col] = parse_numeric(df[col])[0]
+    # Drop the sampling note row at the bottom of the sheet
+    return df.drop(index=[i for i in df.index if str(i).startswith('注')])
+
+
+def parse_price(price_range_str):
+    if isinstance(price_range_str, (int, float)):
+        return float(price_range_str), float(price_range_str), float(price_range_str)
+    if isinstance(price_range_str, str):
+        numbers = re.findall(r'\d+\.?\d*', price_range_str)
+        if numbers:
+            prices = [float(n) for n in numbers]
+            return min(prices), max(prices), sum(prices) / len(prices)
+    return None, None, None
+
+
+CROP_COLUMN_RENAME_MAP = {
+    '蔬菜序号': 'ID',
+    '蔬菜名称': 'Crop_Name',
+    '生长季节': 'Planting_Season',
+    '产量（斤/㎡）': 'Yield_jin_per_m2',
+    '种植成本（元/㎡）': 'Cost_Yuan_per_m2',
+    '销售单价(元/公斤)': 'Selling_Price_Range_Yuan_per_kg',
+    '生长周期': 'Growth_Cycle_days'
+}
+CROP_COLUMNS = [
+    'ID', 'Crop_Name', 'Planting_Season', 'Growth_Cycle_days',
+    'Yield_kg_per_m2', 'Cost_Yuan_per_m2',
+    'Min_Selling_Price_Yuan_per_kg', 'Max_Selling_Price_Yuan_per_kg', 'Avg_Selling_Price_Yuan_per_kg'
+]
+
+
+@traced('ingest.crop_workbook')
+def parse_crop_workbook(path=CROP_WORKBOOK):
+    """Crop table with yields in kg/m² and Min/Max/Avg selling prices (Yuan/kg)."""
+    df_data = pd.read_excel(path, sheet_name='2024年数据')
+    df_cycle = pd.read_excel(path, sheet_name='蔬菜生长周期')
+    df = pd.merge(df_data, df_cycle[['蔬菜名称', '蔬菜序号', '生长周期']], on=['蔬菜名称', '蔬菜序号'], how='left')
+    df = df.rename(columns=CROP_COLUMN_RENAME_MAP)
+    df['Yield_kg_per_m2'] = df['Yield_jin_per_m2'] * 0.5 # 1 斤 = 0.5 kg
+    parsed_prices = np.array([parse_price(p) for p in df['Selling_Price_Range_Yuan_per_kg']], dtype=np.float64).reshape(-1, 3)
+    df['Min_Selling_Price_Yuan_per_kg'] = parsed_prices[:, 0]
+    df['Max_Selling_Price_Yuan_per_kg'] = parsed_prices[:, 1]
+    df['Avg_Selling_Price_Yuan_per_kg'] = parsed_prices[:, 2]
+    return df[[col for col in CROP_COLUMNS if col in df.columns]].reset_index(drop=True)
+
+
+# --- 2. Columnar Cache ---
+def file_fingerprint(path):
+    """Content hash (sha256) and modification time of a source file."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest(), os.stat(path).st_mtime_ns
+
+
+def _cache_prefix(path, kind):
+    # One cache lineage per (table kind, source path)
+    return f"{kind}-{hashlib.sha1(os.path.abspath(path).encode('utf-8')).hexdigest()[:8]}-"
+
+
+def cache_path_for(path, kind, cache_dir=CACHE_DIR):
+    content_hash, mtime_ns = file_fingerprint(path)
+    return os.path.join(cache_dir, f"{_cache_prefix(path, kind)}v{CACHE_VERSION}-{content_hash[:24]}-{mtime_ns}.npz")
+
+
+def _column_array(series):
+    if series.dtype == object:
+        return series.fillna('').astype(str).to_numpy(dtype=str), series.isna().to_numpy()
+    return series.to_numpy(), None
+
+
+def save_table(df, cache_file):
+    """Store a DataFrame as one NumPy array per column (strings as fixed-width unicode)."""
+    arrays = {'__columns__': np.array(df.columns.astype(str), dtype=str),
+              '__index_name__': np.array([df.index.name or ''], dtype=str)}
+    columns = [('__index__', df.index.to_series())] + [(f'col_{i}', df.iloc[:, i]) for i in range(df.shape[1])]
+    for key, series in columns:
+        values, mask = _column_array(series)
+        arrays[key] = values
+        if mask is not None and mask.any():
+            arrays[f'{key}__mask'] = mask
+    os.makedirs(os.path.dirname(cache_file) or '.', exist_ok=True)
+    tmp_file = cache_file + '.tmp.npz'
+    np.savez(tmp_file, **arrays)
+    os.replace(tmp_file, cache_file) # Atomic, so a crashed write never leaves a half cache
+
+
+def load_table(cache_file):
+    """Inverse of save_table."""
+    with np.load(cache_file, allow_pickle=False) as data:
+        def column(key):
+            values = data[key]
+            if values.dtype.kind == 'U':
+                values = values.astype(object)
+                if f'{key}__mask' in data:
+                    values[data[f'{key}__mask']] = None
+            return values
+        columns = data['__columns__'].tolist()
+        df = pd.DataFrame({name: column(f'col_{i}') for i, name in enumerate(columns)}, columns=columns)
+        df.index = pd.Index(column('__index__'), name=data['__index_name__'][0] or None)
+    return df
+
+
+def load_cached(path, kind, parser, cache_dir=CACHE_DIR, refresh=False):
+    """Parse `path` with `parser` once; later calls load the columnar cache."""
+    cache_file = cache_path_for(path, kind, cache_dir)
+    if not refresh and os.path.exists(cache_file):
+        with span('ingest.load_cache', kind=kind):
+            return load_table(cache_file)
+    df = parser(path)
+    save_table(df, cache_file)
+    # Drop stale caches of earlier versions of the same source
+    prefix = _cache_prefix(path, kind)
+    for name in os.listdir(cache_dir):
+        stale = os.path.join(cache_dir, name)
+        if name.startswith(prefix) and stale != cache_file:
+            os.remove(stale)
+    return df
+
+
+def load_soil_table(path=SOIL_WORKBOOK, cache_dir=CACHE_DIR, refresh=False):
+    """Cleaned 附件1 soil table (index 学院; 温度, 水分, 电导率, pH, 氮, 磷, 钾, 肥力)."""
+    return load_cached(path, 'soil', parse_soil_workbook, cache_dir, refresh)
+
+
+def load_crop_table(path=CROP_WORKBOOK, cache_dir=CACHE_DIR, refresh=False):
+    """Cleaned 附件3 crop table with the columns used by lp_optimizer.py."""
+    return load_cached(path, 'crop', parse_crop_workbook, cache_dir, refresh).reset_index(drop=True)
+
+
+def main():
+    for label, loader in (('soil', load_soil_table), ('crop', load_crop_table)):
+        start = time.perf_counter()
+        loader(refresh=True)
+        parse_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        df = loader()
+        cache_seconds = time.perf_counter() - start
+        print(f"{label}: {df.shape[0]} rows; parse {parse_seconds * 1000:.1f} ms, cached load {cache_seconds * 1000:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,8 @@
 import pandas as pd
 import re
 
+from unit_parser import parse_numeric
+
 # Load the Excel file, using the second row as header (skiprows=1)
 file_path = "附件1 校园微农场土壤指标.xlsx"
 df = pd.read_excel(file_path, sheet_name='土壤指标', skiprows=1)
@@ -41,19 +43,15 @@ df = df.set_index(cleaned_column_names[0])
 print("--- Data Cleaning and Conversion ---")
 for col in df.columns:
     if df[col].dtype == 'object' or pd.api.types.is_string_dtype(df[col]):
-        # Ensure data is string before trying string operations
-        df[col] = df[col].astype(str)
-        # Remove units from the data itself
-        df[col] = df[col].str.replace(r'℃|%|mg/kg|g/kg|us/cm', '', regex=True).str.strip()
-        try:
-            df[col] = pd.to_numeric(df[col])
+        # Remove units from the data itself (one unit per column) and convert to float
+        values = parse_numeric(df[col])[0]
+        df[col] = values
+        if not pd.isna(values).any():
             print(f"Successfully converted column '{col}' to numeric.")
-        except ValueError:
+        else:
             print(f"Could not convert column '{col}' to numeric after cleaning. Values like 'nan' or other non-numeric strings might be present.")
-            # Attempt to coerce errors, turning unconvertible values into NaNs
-            df[col] = pd.to_numeric(df[col], errors='coerce')
-            if df[col].isnull().any():
-                 print(f"Non-numeric values in '{col}' were converted to NaN.")
+            # Unconvertible values were coerced to NaN
+            print(f"Non-numeric values in '{col}' were converted to NaN.")
 
     elif pd.api.types.is_numeric_dtype(df[col]):
         print(f"Column '{col}' is already numeric.")
@@ -1,6 +1,10 @@
-import pandas as pd
+import io
+import itertools
 import re
 
+import numpy as np
+import pandas as pd
+
 raw_text_data = """
 学院4 465㎡
 学院10 430㎡
@@ -22,54 +26,159 @@ raw_text_data = """
 学院2 522㎡
 """
 
-lines = raw_text_data.strip().split('\n')
-
-farm_names = []
-areas = []
-logistics_counter = 1
-
-# Regex to capture name and area.
-# It looks for:
-# (anything not a digit, not a space at the end) (optional space) (digits) (optional space) ㎡
-# Pattern: r"^(.*?)(\s*)(\d+)\s*㎡$"
-# Refined pattern: r"^(.*?)\s*(\d+)\s*㎡$"
-# Name part: (.+?) captures the farm name (non-greedy).
-# Area part: (\d+) captures the area digits.
-# \s* handles optional spaces.
-# ㎡ is the area unit.
-pattern = re.compile(r"^(.*?)\s*(\d+)\s*㎡$")
-
-for line in lines:
-    match = pattern.match(line)
-    if match:
-        name_part = match.group(1).strip()
-        area_part = int(match.group(2))
-
-        if name_part == "后勤临时管理用地":
-            farm_names.append(f"{name_part}{logistics_counter}")
-            logistics_counter += 1
+# Area register lines look like "学院4 465㎡" or "学院12 423 ㎡":
+# Name part: (.*?\S) captures the non-empty farm name (non-greedy).
+# Area part: (\d+) captures the area digits, which follow whitespace or a
+# character that is neither a digit nor a dot ("学院4 46.5㎡" and a bare
+# "465㎡" are malformed, not farm "学院4 46." or an unnamed farm).
+# \s* handles optional spaces; ㎡ is the area unit.
+AREA_LINE_PATTERN = re.compile(r"^(.*?\S)(?:\s+|(?<=[^\d.]))(\d+)\s*㎡$")
+# Same grammar applied to a whole block of lines at once. The greedy name
+# group backtracks from the line end instead of from the start, and stops
+# right before the area digits.
+_AREA_BLOCK_PATTERN = re.compile(r"^[^\S\n]*(.*\S)(?:[^\S\n]+|(?<=[^\d.\s]))(\d+)[^\S\n]*㎡[^\S\n]*$", re.M)
+
+# Shared plot names that are always numbered in order of appearance
+# (后勤临时管理用地 -> 后勤临时管理用地1, 后勤临时管理用地2, ...)
+NUMBERED_NAMES = ('后勤临时管理用地',)
+
+DEFAULT_CHUNK_LINES = 200_000
+
+
+# --- 1. Vectorized Block Parsing ---
+def _malformed_lines(text, first_line_number):
+    # Slow path, only taken when a block has lines that do not match
+    rows = [(first_line_number + i, line.strip()) for i, line in enumerate(text.split('\n'))
+            if line.strip() and not AREA_LINE_PATTERN.match(line.strip())]
+    return pd.DataFrame(rows, columns=['Line_Number', 'Line']).astype({'Line_Number': np.int64, 'Line': object})
+
+
+def _claim_names(names, name_counts, taken, numbered_names):
+    # Slow path, only taken when a generated name collides: each row claims
+    # the first candidate not used by an earlier row of the register
+    farm_names = np.empty(len(names), dtype=object)
+    for i, name in enumerate(names):
+        if name in numbered_names:
+            candidate = None
+            while candidate is None or candidate in taken:
+                name_counts[name] = name_counts.get(name, 0) + 1
+                candidate = f'{name}{name_counts[name]}'
+        elif name_counts.get(name, 0) == 0 and name not in taken:
+            name_counts[name], candidate = 1, name
         else:
-            farm_names.append(name_part)
-        areas.append(area_part)
-    else:
+            candidate = None
+            while candidate is None or candidate in taken:
+                name_counts[name] = max(name_counts.get(name, 0), 1) + 1
+                candidate = f'{name}_{name_counts[name]}'
+        taken.add(candidate)
+        farm_names[i] = candidate
+    return farm_names
+
+
+def _dedupe_names(names, name_counts, taken, numbered_names):
+    # name_counts (name -> last number used) and taken (all names handed out)
+    # are updated in place so numbering continues across blocks
+    names = np.array(names, dtype=object)
+    codes, uniques = pd.factorize(names)
+    counts = np.bincount(codes, minlength=len(uniques))
+    previous = np.fromiter((name_counts.get(name, 0) for name in uniques), dtype=np.int64, count=len(uniques))
+    # 1-based occurrence number of each row's name: rank within its code group plus earlier blocks
+    order = np.argsort(codes, kind='stable')
+    rank = np.empty(len(names), dtype=np.int64)
+    rank[order] = np.arange(len(names)) - np.repeat(np.cumsum(counts) - counts, counts)
+    ordinal = previous[codes] + rank + 1
+
+    numbered = np.isin(names, list(numbered_names))
+    repeated = ~numbered & (ordinal > 1)
+    farm_names = names.copy()
+    farm_names[numbered] = names[numbered] + ordinal[numbered].astype(str).astype(object)
+    # Other repeated names keep the first occurrence and get _2, _3, ... suffixes
+    farm_names[repeated] = names[repeated] + '_' + ordinal[repeated].astype(str).astype(object)
+    # A generated name can equal a name given literally in the register
+    # ("后勤临时管理用地1", "学院4_2"); such blocks are renamed row by row
+    if not pd.Index(farm_names).is_unique or not taken.isdisjoint(farm_names):
+        return _claim_names(names.tolist(), name_counts, taken, numbered_names)
+    name_counts.update(zip(uniques, (previous + counts).tolist()))
+    taken.update(farm_names)
+    return farm_names
+
+
+def _parse_block(text, first_line_number, name_counts, taken, numbered_names):
+    matches = _AREA_BLOCK_PATTERN.findall(text)
+    n_lines = sum(1 for line in text.split('\n') if line.strip())
+    malformed = _malformed_lines(text if len(matches) < n_lines else '', first_line_number)
+    df_areas = pd.DataFrame({
+        'Farm_Name': _dedupe_names([name.rstrip() for name, _ in matches], name_counts, taken,
+                                   numbered_names),
+        'Area_m2': np.array([int(area) for _, area in matches], dtype=np.int64)
+    })
+    return df_areas, malformed
+
+
+def parse_area_text(text, numbered_names=NUMBERED_NAMES):
+    """Parse a whole area register text at once.
+
+    Returns (df_areas, malformed): Farm_Name / Area_m2 (int64) in register
+    order, and the Line_Number / Line of every non-blank line that did not
+    match "<name> <digits>㎡".
+    """
+    return _parse_block(text, 1, {}, set(), numbered_names)
+
+
+def iter_area_register(source, chunk_lines=DEFAULT_CHUNK_LINES, numbered_names=NUMBERED_NAMES, encoding='utf-8'):
+    """Stream (df_areas, malformed) chunks from a register file path or text stream.
+
+    Names are de-duplicated across chunks, so the concatenated result does
+    not depend on `chunk_lines`.
+    """
+    stream = open(source, encoding=encoding) if isinstance(source, str) else source
+    try:
+        name_counts, taken, first_line_number = {}, set(), 1
+        while True:
+            lines = list(itertools.islice(stream, chunk_lines))
+            if not lines:
+                break
+            yield _parse_block(''.join(lines), first_line_number, name_counts, taken, numbered_names)
+            first_line_number += len(lines)
+    finally:
+        if stream is not source:
+            stream.close()
+
+
+def read_area_register(source, chunk_lines=DEFAULT_CHUNK_LINES, numbered_names=NUMBERED_NAMES, encoding='utf-8'):
+    """Read a whole register file or stream; returns (df_areas, malformed) like parse_area_text."""
+    chunks = list(iter_area_register(source, chunk_lines, numbered_names, encoding))
+    if not chunks:
+        return parse_area_text('', numbered_names)
+    df_areas = pd.concat([c[0] for c in chunks], ignore_index=True)
+    malformed = pd.concat([c[1] for c in chunks], ignore_index=True)
+    return df_areas, malformed
+
+
+def load_farm_areas(text=raw_text_data):
+    """Farm_Name / Area_m2 table of the campus register, as consumed by lp_optimizer.py."""
+    return parse_area_text(text)[0]
+
+
+def main():
+    df_areas, malformed = read_area_register(io.StringIO(raw_text_data))
+    for line in malformed['Line']:
         print(f"Warning: Could not parse line: '{line}'")
 
-# Create DataFrame
-df_areas = pd.DataFrame({
-    'Farm_Name': farm_names,
-    'Area_m2': areas
-})
+    # --- Output Summary ---
+    print("--- Farm Area DataFrame Summary ---")
+    print("\nDataFrame Shape:")
+    print(df_areas.shape)
+
+    print("\nColumn Names:")
+    print(df_areas.columns.tolist())
 
-# --- Output Summary ---
-print("--- Farm Area DataFrame Summary ---")
-print("\nDataFrame Shape:")
-print(df_areas.shape)
+    print("\nFirst 5 Rows of DataFrame:")
+    print(df_areas.head())
 
-print("\nColumn Names:")
-print(df_areas.columns.tolist())
+    print("\nFull DataFrame:")
+    print(df_areas)
 
-print("\nFirst 5 Rows of DataFrame:")
-print(df_areas.head())
 
-print("\nFull DataFrame:")
-print(df_areas)
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,7 @@
 import pandas as pd
 import numpy as np
 import io
+from unit_parser import parse_numeric
 
 # --- 1. Parse Soil Data ---
 raw_soil_data_text = """学院1	17.7℃	22.6%	1003.0us/cm	8.0	50mg/kg	70mg/kg	160mg/kg	551mg/kg
@@ -24,23 +25,15 @@ data = io.StringIO(raw_soil_data_text)
 # Columns based on typical structure: Farm, Temp, Moisture, Conductivity, pH, N, P, K, Fertility
 # We only need Farm, pH, N, P, K for this task
 # Indices: Farm (0), pH (4), N (5), P (6), K (7)
-parsed_data = []
-for line in data:
-    parts = line.strip().split('\t')
-    farm_name = parts[0]
-    ph_val = float(parts[4])
-    # Extract numeric part of N, P, K and convert
-    n_val_mg_kg = float(parts[5].replace('mg/kg', ''))
-    p_val_mg_kg = float(parts[6].replace('mg/kg', ''))
-    k_val_mg_kg = float(parts[7].replace('mg/kg', ''))
-    parsed_data.append({
-        'Farm_Name': farm_name,
-        'pH_value': ph_val,
-        'N_mg_per_kg': n_val_mg_kg,
-        'P_mg_per_kg': p_val_mg_kg,
-        'K_mg_per_kg': k_val_mg_kg
-    })
-soil_df = pd.DataFrame(parsed_data)
+columns = list(zip(*(line.strip().split('\t') for line in data if line.strip())))
+# Numeric parts of N, P, K: the mg/kg unit is stripped once per column
+soil_df = pd.DataFrame({
+    'Farm_Name': list(columns[0]),
+    'pH_value': parse_numeric(columns[4])[0],
+    'N_mg_per_kg': parse_numeric(columns[5], unit='mg/kg')[0],
+    'P_mg_per_kg': parse_numeric(columns[6], unit='mg/kg')[0],
+    'K_mg_per_kg': parse_numeric(columns[7], unit='mg/kg')[0]
+})
 
 # --- 2. Define Standard Values (Sᵢ) and pH Pᵢ Scoring ---
 S_values = {
@@ -0,0 +1,207 @@
+import numpy as np
+import pandas as pd
+
+from tracing import traced
+
+# Vectorized soil fertility scoring (Pᵢ, P综 and grade) for whole sample tables.
+# Produces exactly the columns printed by fertility_calculator.py, but in one
+# batched NumPy pass instead of a per-row iterrows() loop.
+
+# --- 1. Indicator Registry (unit, Sᵢ, capping rule, scoring table) ---
+# Each indicator is declared once; compile_indicators() turns a selection of
+# them into flat lookup arrays so scoring N indicators costs N vectorized
+# column operations, never per-row Python work.
+
+# Right-closed bin edges from Table C.2: pH ≤ 5.8 -> 1.0, (5.8, 6.0] -> 1.5,
+# (6.0, 7.0] -> 2.0, (7.0, 7.5] -> 2.5, (7.5, 8.0] -> 3.0, > 8.0 -> 1.0
+PH_BIN_EDGES = np.array([5.8, 6.0, 7.0, 7.5, 8.0])
+PH_BIN_SCORES = np.array([1.0, 1.5, 2.0, 2.5, 3.0, 1.0])
+
+PI_CAP = 3.0
+INDICATOR_REGISTRY = {}
+_COMPILED_CACHE = {}
+
+
+def register_indicator(name, column, unit, S=None, unit_divisor=1.0, cap=PI_CAP,
+                       table=None, pi_column=None, pi_decimals=2,
+                       ci_column=None, ci_decimals=None, s_column=None):
+    """Declare a soil fertility indicator for P综 scoring.
+
+    Ratio indicators score Pᵢ = min((Cᵢ / unit_divisor) / Sᵢ, cap), where
+    `column` holds the raw measurement and `unit_divisor` converts it into
+    `unit` (the unit of Sᵢ, e.g. 1000 for mg/kg -> g/kg). Table indicators
+    pass `table=(edges, scores)` instead of S: right-closed bins with
+    len(scores) == len(edges) + 1, as in the pH Table C.2. `cap=None` disables
+    capping. Re-registering a name replaces the previous definition.
+    """
+    if (S is None) == (table is None):
+        raise ValueError(f"Indicator '{name}' needs exactly one of S (ratio scoring) or table (piecewise scoring)")
+    if table is not None:
+        edges, scores = (np.asarray(t, dtype=np.float64) for t in table)
+        if len(scores) != len(edges) + 1 or np.any(np.diff(edges) <= 0):
+            raise ValueError(f"Indicator '{name}' table needs strictly increasing edges and len(edges) + 1 scores")
+        table = (edges, scores)
+    INDICATOR_REGISTRY[name] = {
+        'column': column,
+        'unit': unit,
+        'S': None if S is None else float(S),
+        'unit_divisor': float(unit_divisor),
+        'cap': np.inf if cap is None else float(cap),
+        'table': table,
+        'pi_column': pi_column or f'P_{name}',
+        'pi_decimals': pi_decimals,
+        'ci_column': ci_column or column,
+        'ci_decimals': ci_decimals,
+        's_column': s_column if S is None else (s_column or f'S_{name}_{unit.replace("/", "_per_")}')
+    }
+    _COMPILED_CACHE.clear()
+
+
+register_indicator('pH', 'pH_value', 'pH', table=(PH_BIN_EDGES, PH_BIN_SCORES),
+                   pi_column='P_pH', pi_decimals=None)
+register_indicator('Nitrogen', 'N_mg_per_kg', 'g/kg', S=1.0, unit_divisor=1000.0,
+                   ci_column='N_g_per_kg_Ci', ci_decimals=4, s_column='S_Nitrogen_g_per_kg')
+register_indicator('Phosphorus', 'P_mg_per_kg', 'mg/kg', S=7.5,
+                   ci_column='P_mg_per_kg_Ci', s_column='S_Phosphorus_mg_per_kg')
+register_indicator('Potassium', 'K_mg_per_kg', 'mg/kg', S=80.0,
+                   ci_column='K_mg_per_kg_Ci', s_column='S_Potassium_mg_per_kg')
+register_indicator('Organic_Matter', 'Organic_Matter_g_per_kg', 'g/kg', S=12.5,
+                   ci_column='Organic_Matter_g_per_kg_Ci', s_column='S_Organic_Matter_g_per_kg')
+
+# Indicators available in the 附件1 survey (organic matter is not measured there)
+DEFAULT_INDICATORS = ('pH', 'Nitrogen', 'Phosphorus', 'Potassium')
+
+
+def compile_indicators(names=DEFAULT_INDICATORS):
+    """Precompute the lookup arrays used by score_soil for a set of indicators.
+
+    Compiled specs are cached per indicator tuple, so repeated scoring calls
+    only pay for the array arithmetic.
+    """
+    names = tuple(names)
+    if names in _COMPILED_CACHE:
+        return _COMPILED_CACHE[names]
+    missing = [n for n in names if n not in INDICATOR_REGISTRY]
+    if missing:
+        raise KeyError(f"Unknown fertility indicators: {missing}. Registered: {list(INDICATOR_REGISTRY)}")
+    specs = [INDICATOR_REGISTRY[n] for n in names]
+    ratio_idx = np.array([i for i, s in enumerate(specs) if s['table'] is None], dtype=np.intp)
+    compiled = {
+        'names': names,
+        'specs': specs,
+        'input_columns': [s['column'] for s in specs],
+        'ratio_idx': ratio_idx,
+        'unit_divisor': np.array([specs[i]['unit_divisor'] for i in ratio_idx]),
+        'S': np.array([specs[i]['S'] for i in ratio_idx]),
+        'cap': np.array([specs[i]['cap'] for i in ratio_idx]),
+        'tables': [(i, s['table'][0], s['table'][1]) for i, s in enumerate(specs) if s['table'] is not None],
+        # sqrt((N-1)/N) with N = number of participating indicators
+        'n_factor': np.sqrt((len(names) - 1) / len(names))
+    }
+    _COMPILED_CACHE[names] = compiled
+    return compiled
+
+
+def round_half_even(values, decimals):
+    """Vectorized equivalent of Python's built-in round(x, decimals).
+
+    np.round scales by 10**decimals first, which disagrees with round() on
+    values such as 0.025 whose scaled product lands exactly on a half. Those
+    few near-tie elements are re-rounded with round() so results match the
+    scalar script bit for bit.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    scale = 10.0 ** decimals
+    scaled = values * scale
+    rounded = np.round(scaled) / scale
+    frac = np.abs(scaled - np.trunc(scaled))
+    near_tie = np.abs(frac - 0.5) <= 1e-9 * np.maximum(1.0, np.abs(scaled))
+    if near_tie.any():
+        idx = np.flatnonzero(near_tie)
+        flat = rounded.reshape(-1)
+        flat[idx] = [round(v, decimals) for v in values.reshape(-1)[idx].tolist()]
+    return rounded
+
+
+def lookup_table_scores(values, edges, scores):
+    """Piecewise scoring through right-closed bins (NaN stays NaN)."""
+    values = np.asarray(values, dtype=np.float64)
+    return np.where(np.isnan(values), np.nan, scores[np.searchsorted(edges, values, side='left')])
+
+
+def calculate_ph_pi_vectorized(ph):
+    """Table C.2 pH scoring for an array of pH values."""
+    return lookup_table_scores(ph, PH_BIN_EDGES, PH_BIN_SCORES)
+
+
+def assign_fertility_grades(p_comprehensive):
+    """Map P综 values to grades: > 1.7 -> I, 0.9–1.7 -> II, otherwise III."""
+    p_comprehensive = np.asarray(p_comprehensive, dtype=np.float64)
+    return np.select(
+        [p_comprehensive > 1.7, p_comprehensive >= 0.9],
+        ['I', 'II'],
+        default='III'
+    ).astype(object)
+
+
+def _as_soil_arrays(soil, farm_names, input_columns):
+    # Accept either a DataFrame holding the registered input columns or a plain
+    # (n, k) array ordered like the compiled indicators (pH, N, P, K by default).
+    if isinstance(soil, pd.DataFrame):
+        if farm_names is None:
+            farm_names = soil['Farm_Name'].to_numpy() if 'Farm_Name' in soil.columns else soil.index.to_numpy()
+        values = soil[input_columns].to_numpy(dtype=np.float64)
+    else:
+        values = np.asarray(soil, dtype=np.float64)
+        if values.ndim != 2 or values.shape[1] != len(input_columns):
+            raise ValueError(f"Expected an (n, {len(input_columns)}) array of {input_columns}, got shape {values.shape}")
+        if farm_names is None:
+            farm_names = np.arange(values.shape[0])
+    return np.asarray(farm_names, dtype=object), values
+
+
+@traced('scoring.score_soil')
+def score_soil(soil, farm_names=None, indicators=DEFAULT_INDICATORS):
+    """Compute every Pᵢ, P_min, P_avg, P综 and fertility grade in one pass.
+
+    `soil` is a DataFrame holding Farm_Name plus the input column of each
+    indicator (pH_value, N_mg_per_kg, P_mg_per_kg, K_mg_per_kg by default), or
+    an (n, k) array in indicator order. With the default indicators the result
+    has the same columns and rounding as fertility_calculator.py.
+    """
+    compiled = compile_indicators(indicators)
+    farm_names, values = _as_soil_arrays(soil, farm_names, compiled['input_columns'])
+    n_rows, n_indicators = values.shape
+
+    # Cᵢ in the unit of Sᵢ, then Pᵢ = Cᵢ/Sᵢ clipped at the cap, for all ratio indicators at once
+    ci = values.copy()
+    ratio_idx = compiled['ratio_idx']
+    ci[:, ratio_idx] = values[:, ratio_idx] / compiled['unit_divisor']
+    pi = np.empty_like(values)
+    pi[:, ratio_idx] = np.minimum(ci[:, ratio_idx] / compiled['S'], compiled['cap'])
+    # Piecewise-scored indicators (e.g. pH) through binned lookup
+    for i, edges, scores in compiled['tables']:
+        pi[:, i] = lookup_table_scores(values[:, i], edges, scores)
+
+    # Column-by-column summation keeps the order of sum(pi_values) so P_avg matches the scalar loop exactly
+    p_min = pi.min(axis=1)
+    p_sum = pi[:, 0].copy()
+    for i in range(1, n_indicators):
+        p_sum += pi[:, i]
+    p_avg = p_sum / n_indicators
+
+    # P综 = ((P_min)^2 + (P_avg)^2) / 2 * sqrt((N-1)/N)
+    p_comprehensive = ((p_min**2) + (p_avg**2)) / 2 * compiled['n_factor']
+
+    columns = {'Farm_Name': farm_names}
+    for i, spec in enumerate(compiled['specs']):
+        ci_values = ci[:, i] if spec['ci_decimals'] is None else round_half_even(ci[:, i], spec['ci_decimals'])
+        columns[spec['ci_column']] = ci_values
+        if spec['table'] is None:
+            columns[spec['s_column']] = np.full(n_rows, spec['S'])
+        columns[spec['pi_column']] = pi[:, i] if spec['pi_decimals'] is None else round_half_even(pi[:, i], spec['pi_decimals'])
+    columns['P_min'] = round_half_even(p_min, 2)
+    columns['P_avg'] = round_half_even(p_avg, 2)
+    columns['P_Comprehensive'] = round_half_even(p_comprehensive, 2)
+    columns['Fertility_Grade'] = assign_fertility_grades(p_comprehensive)
+    return pd.DataFrame(columns)
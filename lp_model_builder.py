@@ -0,0 +1,179 @@
+import numpy as np
+import scipy.sparse as sp
+from pulp import LpProblem, LpVariable, LpAffineExpression, LpConstraint, LpConstraintLE, LpMaximize
+
+from tracing import traced
+
+# Matrix-form builder for the crop planting LP in lp_optimizer.py.
+# Farms and crops are mapped to integer indices once; eligible (farm, crop)
+# pairs, the objective vector and the area / nitrogen-fixer constraint rows
+# are then assembled as NumPy / scipy.sparse arrays with no per-variable scans.
+
+# Minimum share of nitrogen-fixing crops per fertility grade (lp_optimizer.py)
+DEFAULT_FIXER_RATIOS = {'II': 0.10, 'III': 0.20}
+
+
+def crop_profit_per_m2(crop_df, price_column='Avg_Selling_Price_Yuan_per_kg'):
+    """Profit per m² = yield (kg/m²) × selling price (Yuan/kg) − cost (Yuan/m²)."""
+    return (crop_df['Yield_kg_per_m2'] * crop_df[price_column]) - crop_df['Cost_Yuan_per_m2']
+
+
+def lp_var_name(farm_name, crop_name):
+    return f"Area_{farm_name.replace(' ', '_')}_{crop_name.replace(' ', '_')}"
+
+
+@traced('lp.build_arrays')
+def build_lp_arrays(farm_areas_df, crop_df, farm_fertility_grades, recommendations,
+                    nitrogen_fixers, fixer_ratios=DEFAULT_FIXER_RATIOS, eligibility=None):
+    """Assemble the crop planting LP as arrays: max c·x s.t. A_ub·x ≤ b_ub, x ≥ 0.
+
+    Variables are the recommended (farm, crop) pairs in farm-major order, the
+    same order lp_optimizer.py creates them in. Rows are one Area_Constraint_*
+    per farm (Σ x ≤ area) followed by one N_Fixer_* per graded farm that has a
+    fixer available (ratio·Σ x − Σ x_fixer ≤ 0). Returns a dict of arrays and
+    the index maps used to build them.
+
+    `eligibility` (from recommendation_engine.eligibility_mask) replaces the
+    grade -> crop `recommendations` lookup with a per-plot crop mask.
+    """
+    # Farms without a fertility grade get no variables (as in lp_optimizer.py)
+    farms = farm_areas_df[farm_areas_df['Farm_Name'].map(farm_fertility_grades).notna()]
+    farm_names = farms['Farm_Name'].to_numpy(dtype=object)
+    farm_areas = farms['Area_m2'].to_numpy(dtype=np.float64)
+    farm_grades = np.array([farm_fertility_grades[f] for f in farm_names], dtype=object)
+    crop_names = crop_df['Crop_Name'].to_numpy(dtype=object)
+    crop_profit = (crop_df['Profit_per_m2'] if 'Profit_per_m2' in crop_df.columns
+                   else crop_profit_per_m2(crop_df)).to_numpy(dtype=np.float64)
+    is_fixer = np.isin(crop_names, list(nitrogen_fixers))
+
+    if eligibility is None:
+        # Grade × crop eligibility table, broadcast to farms by grade code
+        grade_names = sorted(set(farm_grades) | set(recommendations))
+        grade_index = {g: i for i, g in enumerate(grade_names)}
+        grade_crop_mask = np.array([np.isin(crop_names, list(recommendations.get(g, []))) for g in grade_names],
+                                   dtype=bool).reshape(len(grade_names), len(crop_names))
+        farm_grade_idx = np.array([grade_index[g] for g in farm_grades], dtype=np.intp)
+        eligible = grade_crop_mask[farm_grade_idx]
+    else:
+        # Per-plot mask rows in farm order; only its nonzero pairs become variables
+        if list(eligibility['crop_names']) != list(crop_names):
+            raise ValueError("Eligibility mask columns do not match crop_df['Crop_Name']")
+        mask_row = {f: i for i, f in enumerate(eligibility['farm_names'])}
+        missing = set(farm_names) - set(mask_row)
+        if missing:
+            raise KeyError(f"Farms missing from the eligibility mask: {sorted(missing)}")
+        eligible = sp.csr_matrix(eligibility['mask'])[np.array([mask_row[f] for f in farm_names], dtype=np.intp)]
+        eligible.eliminate_zeros()
+        eligible.sort_indices()
+    var_farm, var_crop = eligible.nonzero()
+    n_vars = len(var_farm)
+
+    c = crop_profit[var_crop]
+
+    # Area rows: one per farm with at least one eligible crop
+    vars_per_farm = np.bincount(var_farm, minlength=len(farm_names))
+    area_farms = np.flatnonzero(vars_per_farm > 0)
+    area_row_of_farm = np.full(len(farm_names), -1, dtype=np.intp)
+    area_row_of_farm[area_farms] = np.arange(len(area_farms))
+    A_area = sp.csr_matrix((np.ones(n_vars), (area_row_of_farm[var_farm], np.arange(n_vars))),
+                           shape=(len(area_farms), n_vars))
+    b_area = farm_areas[area_farms]
+
+    # N-fixer rows: Σ fixers − ratio·Σ all ≥ 0, stored as ratio·Σ all − Σ fixers ≤ 0
+    farm_ratio = np.array([fixer_ratios.get(g, np.nan) for g in farm_grades], dtype=np.float64)
+    fixers_per_farm = np.bincount(var_farm, weights=is_fixer[var_crop], minlength=len(farm_names))
+    fixer_farms = np.flatnonzero(~np.isnan(farm_ratio) & (fixers_per_farm > 0) & (vars_per_farm > 0))
+    fixer_row_of_farm = np.full(len(farm_names), -1, dtype=np.intp)
+    fixer_row_of_farm[fixer_farms] = np.arange(len(fixer_farms))
+    in_fixer_row = fixer_row_of_farm[var_farm] >= 0
+    fixer_vars = np.flatnonzero(in_fixer_row)
+    ratio = farm_ratio[var_farm[fixer_vars]]
+    A_fixer = sp.csr_matrix((ratio - is_fixer[var_crop[fixer_vars]], (fixer_row_of_farm[var_farm[fixer_vars]], fixer_vars)),
+                            shape=(len(fixer_farms), n_vars))
+    b_fixer = np.zeros(len(fixer_farms))
+
+    row_names = ([f"Area_Constraint_{farm_names[f].replace(' ', '_')}" for f in area_farms] +
+                 [f"N_Fixer_{farm_grades[f]}_{farm_names[f].replace(' ', '_')}" for f in fixer_farms])
+
+    return {
+        'farm_names': farm_names,
+        'farm_areas': farm_areas,
+        'farm_grades': farm_grades,
+        'crop_names': crop_names,
+        'crop_profit': crop_profit,
+        'is_fixer': is_fixer,
+        'farm_index': {f: i for i, f in enumerate(farm_names)},
+        'crop_index': {c_name: j for j, c_name in enumerate(crop_names)},
+        'var_farm': var_farm,
+        'var_crop': var_crop,
+        'c': c,
+        'A_ub': sp.vstack([A_area, A_fixer], format='csr'),
+        'b_ub': np.concatenate([b_area, b_fixer]),
+        'row_names': row_names,
+        'area_farms': area_farms,
+        'fixer_farms': fixer_farms
+    }
+
+
+def to_pulp_problem(model, name="Crop_Planting_Optimization"):
+    """Hand the array model to PuLP in bulk; returns (prob, variables)."""
+    farm_names, crop_names = model['farm_names'], model['crop_names']
+    var_names = [lp_var_name(farm_names[f], crop_names[j])
+                 for f, j in zip(model['var_farm'].tolist(), model['var_crop'].tolist())]
+    return pulp_problem_from_arrays(model['c'], model['A_ub'], model['b_ub'], var_names, model['row_names'], name=name)
+
+
+@traced('lp.build_pulp')
+def pulp_problem_from_arrays(c, A_ub, b_ub, var_names, row_names, lower_bounds=0, name="Crop_Planting_Optimization",
+                             upper_bounds=None, categories='Continuous'):
+    """Maximize c·x s.t. A_ub·x ≤ b_ub as a PuLP problem; returns (prob, variables).
+
+    `lower_bounds` / `upper_bounds` are scalars or per-variable sequences
+    (None = unbounded) and `categories` a PuLP category or per-variable
+    sequence of them ('Continuous', 'Integer', 'Binary').
+    """
+    n_vars = len(var_names)
+    lower_bounds, upper_bounds, categories = (
+        [v] * n_vars if v is None or isinstance(v, str) or np.isscalar(v) else list(v)
+        for v in (lower_bounds, upper_bounds, categories))
+    variables = [LpVariable(var_name, lowBound=lb, upBound=ub, cat=cat)
+                 for var_name, lb, ub, cat in zip(var_names, lower_bounds, upper_bounds, categories)]
+    prob = LpProblem(name, LpMaximize)
+    prob += LpAffineExpression(zip(variables, np.asarray(c, dtype=np.float64).tolist())), "Total_Profit"
+
+    A_ub = sp.csr_matrix(A_ub)
+    for row, row_name in enumerate(row_names):
+        prob.addConstraint(_csr_row_constraint(A_ub, b_ub, variables, row), row_name)
+    return prob, variables
+
+
+def _csr_row_constraint(A, b, variables, row):
+    start, end = A.indptr[row], A.indptr[row + 1]
+    expr = LpAffineExpression([(variables[k], a) for k, a in zip(A.indices[start:end].tolist(), A.data[start:end].tolist())])
+    return LpConstraint(expr, LpConstraintLE, rhs=float(b[row]))
+
+
+def row_constraint(model, variables, row):
+    """PuLP constraint for a single row of the array model."""
+    return _csr_row_constraint(model['A_ub'], model['b_ub'], variables, row)
+
+
+def farm_var_range(model, farm_idx):
+    """Slice of variable positions belonging to one farm (var_farm is sorted)."""
+    start, end = np.searchsorted(model['var_farm'], [farm_idx, farm_idx + 1])
+    return slice(int(start), int(end))
+
+
+def farm_row_indices(model, farm_idx):
+    """Row positions (area row first, then N-fixer row) owned by one farm."""
+    rows = []
+    for offset, owners in ((0, model['area_farms']), (len(model['area_farms']), model['fixer_farms'])):
+        pos = np.searchsorted(owners, farm_idx)
+        if pos < len(owners) and owners[pos] == farm_idx:
+            rows.append(offset + int(pos))
+    return rows
+
+
+def solution_vector(variables):
+    """Collect the solved variable values into one array (None -> 0)."""
+    return np.array([v.varValue or 0.0 for v in variables], dtype=np.float64)
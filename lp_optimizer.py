@@ -1,18 +1,27 @@
+import numpy as np
 import pandas as pd
-from pulp import LpProblem, LpVariable, lpSum, LpMaximize, value, LpStatus # Import LpStatus
+import scipy.sparse as sp
+from pulp import PULP_CBC_CMD, LpVariable
 import io
+import time
+from farm_area_parser import load_farm_areas
+from market_saturation import solve_with_demand
+from pareto_frontier import pareto_frontier
+from plan_report import plan_tables
+from recommendation_engine import eligibility_mask, requirements_from_recommendations
+from sensitivity import sensitivity_report
+from solve_cache import cache_entry, planner_cache_key, restore_entry
+from separable_solver import solve_planning_model
+from solver_backends import DEFAULT_BACKEND, pulp_result, solve_model
+from tracing import cbc_log_stats, solver_log_path, span
+from lp_model_builder import (DEFAULT_FIXER_RATIOS, build_lp_arrays, crop_profit_per_m2, farm_row_indices,
+                              farm_var_range, lp_var_name, row_constraint, solution_vector, to_pulp_problem)
 
 # --- 1. Prepare Input Data ---
 
-# Farm Area Data (from Step 3 output)
-farm_area_data_dict = {
-    '学院4': 465, '学院10': 430, '学院9': 340, '学院8': 341, '学院12': 423,
-    '学院14': 360, '学院11': 364, '学院5': 473, '后勤临时管理用地1': 408,
-    '后勤临时管理用地2': 336, '学院6': 350, '学院13': 390, '学院1': 610,
-    '后勤临时管理用地3': 472, '后勤临时管理用地4': 113, '学院3': 328,
-    '学院7': 407, '学院2': 522
-}
-farm_areas_df = pd.DataFrame(list(farm_area_data_dict.items()), columns=['Farm_Name', 'Area_m2'])
+# Farm Area Data (Step 3 register, parsed by farm_area_parser)
+farm_areas_df = load_farm_areas()
+farm_area_data_dict = dict(zip(farm_areas_df['Farm_Name'], farm_areas_df['Area_m2']))
 
 # Crop Data (from Step 2 output)
 crop_csv_data = """ID,Crop_Name,Planting_Season,Growth_Cycle_days,Yield_kg_per_m2,Cost_Yuan_per_m2,Min_Selling_Price_Yuan_per_kg,Max_Selling_Price_Yuan_per_kg,Avg_Selling_Price_Yuan_per_kg
@@ -69,130 +78,286 @@ recommendations = {
 
 farm_areas_df = farm_areas_df[farm_areas_df['Farm_Name'].isin(farm_fertility_grades.keys())]
 
-# --- 2. Create LP Model ---
-prob = LpProblem("Crop_Planting_Optimization", LpMaximize)
-
-plant_vars = {}
-for _, farm_row in farm_areas_df.iterrows():
-    farm_name = farm_row['Farm_Name']
-    farm_grade = farm_fertility_grades.get(farm_name)
-    if not farm_grade: continue
-    recommended_crop_names = recommendations.get(farm_grade, [])
-    for _, crop_row in crop_df.iterrows():
-        crop_name = crop_row['Crop_Name']
-        if crop_name in recommended_crop_names:
-            var_name = f"Area_{farm_name.replace(' ', '_')}_{crop_name.replace(' ', '_')}"
-            plant_vars[(farm_name, crop_name)] = LpVariable(var_name, lowBound=0, cat='Continuous')
-
-total_profit_terms = []
-for (farm_name, crop_name), var in plant_vars.items():
-    profit = crop_df[crop_df['Crop_Name'] == crop_name]['Profit_per_m2'].iloc[0]
-    total_profit_terms.append(var * profit)
-prob += lpSum(total_profit_terms), "Total_Profit"
-
-for _, farm_row in farm_areas_df.iterrows():
-    farm_name = farm_row['Farm_Name']
-    farm_total_area = farm_row['Area_m2']
-    farm_crop_vars = [plant_vars[(f, c)] for (f, c) in plant_vars if f == farm_name]
-    if farm_crop_vars:
-        prob += lpSum(farm_crop_vars) <= farm_total_area, f"Area_Constraint_{farm_name.replace(' ', '_')}"
-
-for _, farm_row in farm_areas_df.iterrows():
-    farm_name = farm_row['Farm_Name']
-    farm_grade = farm_fertility_grades.get(farm_name)
-    if not farm_grade: continue
-    all_crops_on_farm_vars = [plant_vars[(f, c)] for (f, c) in plant_vars if f == farm_name]
-    n_fixing_crops_on_farm_vars = [
-        plant_vars[(f, c)] for (f, c) in plant_vars 
-        if f == farm_name and c in nitrogen_fixers
-    ]
-    if not all_crops_on_farm_vars: continue
-    if farm_grade == 'II' and n_fixing_crops_on_farm_vars:
-        prob += lpSum(n_fixing_crops_on_farm_vars) - 0.10 * lpSum(all_crops_on_farm_vars) >= 0, f"N_Fixer_II_{farm_name.replace(' ', '_')}"
-    elif farm_grade == 'III' and n_fixing_crops_on_farm_vars:
-        prob += lpSum(n_fixing_crops_on_farm_vars) - 0.20 * lpSum(all_crops_on_farm_vars) >= 0, f"N_Fixer_III_{farm_name.replace(' ', '_')}"
-
-# --- 3. Solve LP Problem ---
-prob.solve()
-
-# --- 4. Output Results ---
-print("--- LP Model Results ---")
-print(f"Status: {LpStatus[prob.status]}") # Corrected line
-
-if LpStatus[prob.status] == 'Optimal': # Corrected line
-    total_profit_value = value(prob.objective)
-    print(f"Total Expected Profit: {total_profit_value:.2f} Yuan")
-
-    planting_plan_data = []
-    for (farm_name, crop_name), var in plant_vars.items():
-        if var.varValue is not None and var.varValue > 0: # Added check for None
-            area_planted = var.varValue
-            profit_per_m2 = crop_df[crop_df['Crop_Name'] == crop_name]['Profit_per_m2'].iloc[0]
-            crop_profit = area_planted * profit_per_m2
-            farm_grade = farm_fertility_grades.get(farm_name, "N/A")
-            planting_plan_data.append({
-                'Farm_Name': farm_name,
-                'Fertility_Grade': farm_grade,
-                'Crop_Name': crop_name,
-                'Area_m2_Allocated': round(area_planted, 2),
-                'Expected_Profit_from_Crop': round(crop_profit, 2)
-            })
-    
-    planting_plan_df = pd.DataFrame(planting_plan_data)
-    print("\nPlanting Plan:")
-    # Ensure DataFrame is not empty before printing
-    if not planting_plan_df.empty:
-        print(planting_plan_df.to_string())
-    else:
-        print("No crops allocated in the optimal plan.")
-
-
-    print("\nSummary per Farm:")
-    summary_data = []
-    # Iterate through unique farm names present in the planting plan or all farms if plan is empty
-    farm_names_in_plan = planting_plan_df['Farm_Name'].unique() if not planting_plan_df.empty else []
-    
-    # If plan is empty, still show farm capacities
-    if planting_plan_df.empty:
-         for _, farm_row in farm_areas_df.iterrows():
-            farm_name_grp = farm_row['Farm_Name']
-            farm_grade_grp = farm_fertility_grades.get(farm_name_grp, "N/A")
-            farm_total_capacity_grp = farm_row['Area_m2']
-            summary_data.append({
-                'Farm_Name': farm_name_grp,
-                'Fertility_Grade': farm_grade_grp,
-                'Total_Area_Planted_m2': 0,
-                'Farm_Capacity_m2': farm_total_capacity_grp,
-                'N_Fixer_Area_m2': 0,
-                'N_Fixer_Percentage': 0
-            })
+# --- 2. Planning API ---
+class CropPlanner:
+    """Crop planting LP that is built once and re-solved after in-place updates.
+
+    Prices, farm areas, fertility grades and N-fixer ratios can be changed
+    through the update_* methods; only the affected objective coefficients,
+    right-hand sides or per-farm rows of the PuLP model are touched. solve()
+    passes the previous solution as a warm start to backends that accept one.
+    An optional plot × crop `eligibility` mask (recommendation_engine)
+    decides which (farm, crop) variables exist instead of the grade lists.
+    `backend` picks the solver (solver_backends: 'cbc' through PuLP, 'highs'
+    in-process on the arrays; 'separable' is the closed-form per-farm solve,
+    falling back to HiGHS when the model has coupling rows); either way
+    `result` holds the common result dict and the PuLP variables carry the
+    solution values. `demand` switches on demand-curve prices
+    (market_saturation; a dict of its options, {} for the defaults): the
+    campus-wide market rows are solved as an LP over farm classes with the
+    chosen array backend ('highs' for 'separable'). With a `cache`
+    (solve_cache.MemoryCache / DiskCache) a solve whose inputs were seen
+    before restores the stored plan instead of solving, and `report` holds
+    the planting plan and per-farm summary of the last solve.
+    """
+
+    def __init__(self, farm_areas_df, crop_df, farm_fertility_grades, recommendations, nitrogen_fixers,
+                 fixer_ratios=DEFAULT_FIXER_RATIOS, price_column='Avg_Selling_Price_Yuan_per_kg', solver=None,
+                 eligibility=None, backend=DEFAULT_BACKEND, demand=None, cache=None):
+        self.farm_areas_df = farm_areas_df.reset_index(drop=True).copy()
+        self.crop_df = crop_df.reset_index(drop=True).copy()
+        self.price_column = price_column
+        self.crop_df['Profit_per_m2'] = crop_profit_per_m2(self.crop_df, price_column)
+        self.farm_fertility_grades = dict(farm_fertility_grades)
+        self.recommendations = {grade: list(crops) for grade, crops in recommendations.items()}
+        self.nitrogen_fixers = list(nitrogen_fixers)
+        self.fixer_ratios = dict(fixer_ratios)
+        self.solver = solver
+        self.backend = backend
+        self.eligibility = eligibility
+        self.demand = demand
+        self.cache = cache
+        self.report = None
+        self.status = None
+        self.objective_value = None
+        self.solution = None
+        self.result = None
+
+        self.model = self._build_arrays()
+        self.prob, self.variables = to_pulp_problem(self.model)
+        self._var_cache = dict(zip(self._var_keys(), self.variables))
+
+    def _build_arrays(self):
+        return build_lp_arrays(self.farm_areas_df, self.crop_df, self.farm_fertility_grades,
+                               self.recommendations, self.nitrogen_fixers, self.fixer_ratios, self.eligibility)
+
+    def _var_keys(self):
+        farm_names, crop_names = self.model['farm_names'], self.model['crop_names']
+        return [(farm_names[f], crop_names[c]) for f, c in zip(self.model['var_farm'].tolist(), self.model['var_crop'].tolist())]
+
+    @property
+    def plant_vars(self):
+        """(farm, crop) -> LpVariable, in model order."""
+        return dict(zip(self._var_keys(), self.variables))
+
+    # --- In-place updates ---
+    def update_prices(self, prices):
+        """Set selling prices (crop name -> Yuan/kg) and refresh the objective coefficients."""
+        prices = pd.Series(prices, dtype='float64')
+        unknown = set(prices.index) - set(self.crop_df['Crop_Name'])
+        if unknown:
+            raise KeyError(f"Unknown crops in price update: {sorted(unknown)}")
+        rows = self.crop_df.index[self.crop_df['Crop_Name'].isin(prices.index)]
+        self.crop_df.loc[rows, self.price_column] = prices.reindex(self.crop_df.loc[rows, 'Crop_Name']).to_numpy()
+        self.crop_df['Profit_per_m2'] = crop_profit_per_m2(self.crop_df, self.price_column)
+        self.model['crop_profit'][:] = self.crop_df['Profit_per_m2'].to_numpy()
+        self.model['c'] = self.model['crop_profit'][self.model['var_crop']]
+        self.report = None
+        objective = self.prob.objective
+        for var, coef in zip(self.variables, self.model['c'].tolist()):
+            objective[var] = coef
+
+    def update_areas(self, areas):
+        """Set farm areas (farm name -> m²); only the Area_Constraint_* right-hand sides change."""
+        farm_index = self.model['farm_index']
+        unknown = set(areas) - set(farm_index)
+        if unknown:
+            raise KeyError(f"Unknown or ungraded farms in area update: {sorted(unknown)}")
+        self.report = None
+        for farm_name, area in areas.items():
+            f = farm_index[farm_name]
+            self.farm_areas_df.loc[self.farm_areas_df['Farm_Name'] == farm_name, 'Area_m2'] = area
+            self.model['farm_areas'][f] = area
+            rows = farm_row_indices(self.model, f)
+            if rows and self.model['area_farms'][rows[0]] == f:
+                self.model['b_ub'][rows[0]] = area
+                self.prob.constraints[self.model['row_names'][rows[0]]].changeRHS(float(area))
+
+    def update_grades(self, grades):
+        """Set fertility grades (farm name -> I/II/III); the farms' crops and rows are rebuilt."""
+        self.farm_fertility_grades.update(grades)
+        if self.eligibility is not None:
+            self._grade_mask_rows(list(grades))
+        self._patch_farms(list(grades))
+
+    def add_farms(self, areas, grades):
+        """Add new farms (farm name -> m², farm name -> grade); only their variables and rows are built."""
+        existing = set(self.farm_areas_df['Farm_Name'])
+        duplicate = existing.intersection(areas)
+        if duplicate:
+            raise KeyError(f"Farms already in the model: {sorted(duplicate)}")
+        new_rows = pd.DataFrame({'Farm_Name': list(areas), 'Area_m2': list(areas.values())})
+        self.farm_areas_df = pd.concat([self.farm_areas_df, new_rows], ignore_index=True)
+        self.farm_fertility_grades.update({farm_name: grades[farm_name] for farm_name in areas})
+        if self.eligibility is not None:
+            self._grade_mask_rows(list(areas))
+        self._patch_farms(list(areas))
+
+    def update_eligibility(self, eligibility):
+        """Swap the plot × crop eligibility mask; only farms whose mask row changed are rebuilt."""
+        farm_names = self.model['farm_names']
+        if self.eligibility is None:
+            changed = farm_names
+        else:
+            def rows(e):
+                index = {f: i for i, f in enumerate(e['farm_names'])}
+                return sp.csr_matrix(e['mask'])[[index[f] for f in farm_names]].astype(bool)
+            changed = farm_names[np.unique((rows(self.eligibility) != rows(eligibility)).nonzero()[0])]
+        self.eligibility = eligibility
+        self._patch_farms(list(changed))
+
+    def update_fixer_ratios(self, fixer_ratios):
+        """Set the minimum N-fixer share per grade (grade -> ratio, None removes the requirement)."""
+        for grade, ratio in fixer_ratios.items():
+            if ratio is None:
+                self.fixer_ratios.pop(grade, None)
+            else:
+                self.fixer_ratios[grade] = float(ratio)
+        self._patch_farms([f for f, g in self.farm_fertility_grades.items() if g in fixer_ratios])
+
+    def _grade_mask_rows(self, farm_names):
+        # Regraded or new farms get their eligibility mask row from the grade
+        # lists in `recommendations`; soil thresholds of an earlier mask are
+        # not kept for them (pass a new mask to update_eligibility for that).
+        crop_names = self.eligibility['crop_names']
+        requirements = requirements_from_recommendations(self.recommendations, crop_names)
+        rows = eligibility_mask(farm_names, self.farm_fertility_grades, requirements)
+        old_names = np.asarray(self.eligibility['farm_names'], dtype=object)
+        keep = ~np.isin(old_names, farm_names)
+        self.eligibility = {
+            'farm_names': np.concatenate([old_names[keep], rows['farm_names']]),
+            'crop_names': crop_names,
+            'mask': sp.vstack([sp.csr_matrix(self.eligibility['mask'])[keep], rows['mask']], format='csr')
+        }
+
+    def _patch_farms(self, farm_names):
+        # Retire the farms' old variables and rows, rebuild the (cheap) arrays,
+        # then re-add only these farms' variables and rows to the PuLP model.
+        # Retired variables stay in the objective fixed at 0 so PuLP can still
+        # map them when reading solutions back.
+        self.report = None
+        old_model, old_variables = self.model, self.variables
+        for farm_name in farm_names:
+            f = old_model['farm_index'].get(farm_name)
+            if f is None:
+                continue
+            for var in old_variables[farm_var_range(old_model, f)]:
+                var.upBound = 0
+                self.prob.objective[var] = 0.0
+            for row in farm_row_indices(old_model, f):
+                self.prob.constraints.pop(old_model['row_names'][row], None)
+
+        self.model = self._build_arrays()
+        self.variables = []
+        for key in self._var_keys():
+            if key not in self._var_cache:
+                self._var_cache[key] = LpVariable(lp_var_name(*key), lowBound=0, cat='Continuous')
+            self.variables.append(self._var_cache[key])
+
+        for farm_name in farm_names:
+            f = self.model['farm_index'].get(farm_name)
+            if f is None:
+                continue
+            var_range = farm_var_range(self.model, f)
+            for var, coef in zip(self.variables[var_range], self.model['c'][var_range].tolist()):
+                var.upBound = None
+                self.prob.objective[var] = coef
+            for row in farm_row_indices(self.model, f):
+                self.prob.addConstraint(row_constraint(self.model, self.variables, row), self.model['row_names'][row])
+
+    # --- Solve ---
+    def solve(self, warm_start=True, backend=None):
+        """Solve the current model with `backend` (default: the planner's); returns the LpStatus string."""
+        backend = backend or self.backend
+        self.report = None
+        key = None
+        if self.cache is not None:
+            start = time.perf_counter()
+            key = planner_cache_key(self, backend)
+            entry = self.cache.get(key)
+            if entry is not None:
+                self.report = restore_entry(self, entry, time.perf_counter() - start)
+                return self.status
+        if self.demand is not None:
+            # Cross-farm market rows: only the array backends apply
+            _, self.result = solve_with_demand(self.model, self.crop_df, 'highs' if backend == 'separable' else backend,
+                                               price_column=self.price_column, **self.demand)
+            for var, area in zip(self.variables, self.result['plan_x'].tolist()):
+                var.varValue = area
+        elif backend == 'cbc' or self.solver is not None:
+            start = time.perf_counter()
+            with span('lp.solve', variables=len(self.variables), rows=len(self.prob.constraints)) as stats:
+                log_path = None if self.solver else solver_log_path() # CBC log for the trace's solver statistics
+                solver = self.solver or PULP_CBC_CMD(msg=False, warmStart=warm_start, logPath=log_path)
+                self.prob.solve(solver)
+                stats.update(cbc_log_stats(log_path), solver=solver.name)
+            self.result = pulp_result(self.prob, self.variables, self.model['row_names'], self.model['c'],
+                                      time.perf_counter() - start, stats)
+        else:
+            # In-process backends solve the arrays; copy the values onto the PuLP variables
+            if backend == 'separable':
+                self.result = solve_planning_model(self.model, fallback='highs')
+            else:
+                self.result = solve_model(self.model, backend)
+            for var, area in zip(self.variables, self.result['x'].tolist()):
+                var.varValue = area
+        self.status = self.result['status']
+        self.objective_value = self.result['objective']
+        self.solution = solution_vector(self.variables)
+        if key is not None and self.status != 'Not Solved':
+            self.report = plan_tables(self.model, self.solution)
+            self.cache.put(key, cache_entry(self, self.report))
+        return self.status
+
+    def sensitivity(self):
+        """Shadow prices, reduced costs and crop profit ranging for the current solution (sensitivity.py)."""
+        if self.demand is not None:
+            raise ValueError("Sensitivity report covers the fixed-price model only")
+        return sensitivity_report(self.model, self.result)
+
+    def fixer_frontier(self):
+        """Profit vs. N-fixer area Pareto breakpoints of the current model (pareto_frontier.py)."""
+        return pareto_frontier(self.model)
+
+
+# --- 3. Output Results ---
+def build_planting_report(planner):
+    """Planting plan and per-farm summary DataFrames for a solved planner."""
+    if planner.report is not None: # Kept by a cached solve
+        return planner.report
+    return plan_tables(planner.model, solution_vector(planner.variables))
+
+
+def main():
+    # Per-plot eligibility from the grade -> crop recommendations; gates which LP variables exist
+    eligibility = eligibility_mask(farm_areas_df['Farm_Name'], farm_fertility_grades,
+                                   requirements_from_recommendations(recommendations, crop_df['Crop_Name']))
+    planner = CropPlanner(farm_areas_df, crop_df, farm_fertility_grades, recommendations, nitrogen_fixers,
+                          eligibility=eligibility)
+    planner.solve()
+
+    print("--- LP Model Results ---")
+    print(f"Status: {planner.status}")
+
+    if planner.status == 'Optimal':
+        print(f"Total Expected Profit: {planner.objective_value:.2f} Yuan")
+        planting_plan_df, farm_summary_df = build_planting_report(planner)
+
+        print("\nPlanting Plan:")
+        # Ensure DataFrame is not empty before printing
+        if not planting_plan_df.empty:
+            print(planting_plan_df.to_string())
+        else:
+            print("No crops allocated in the optimal plan.")
+
+        print("\nSummary per Farm:")
+        print(farm_summary_df.to_string())
+
     else:
-        for farm_name_grp, group_df in planting_plan_df.groupby('Farm_Name'):
-            total_planted_on_farm = group_df['Area_m2_Allocated'].sum()
-            farm_total_capacity = farm_areas_df[farm_areas_df['Farm_Name'] == farm_name_grp]['Area_m2'].iloc[0]
-            
-            n_fixer_area_on_farm = 0
-            for index, row in group_df.iterrows():
-                if row['Crop_Name'] in nitrogen_fixers:
-                    n_fixer_area_on_farm += row['Area_m2_Allocated']
-            
-            n_fixer_percentage = (n_fixer_area_on_farm / total_planted_on_farm * 100) if total_planted_on_farm > 0 else 0
-            
-            summary_data.append({
-                'Farm_Name': farm_name_grp,
-                'Fertility_Grade': group_df['Fertility_Grade'].iloc[0],
-                'Total_Area_Planted_m2': round(total_planted_on_farm,2),
-                'Farm_Capacity_m2': farm_total_capacity,
-                'N_Fixer_Area_m2': round(n_fixer_area_on_farm,2),
-                'N_Fixer_Percentage': round(n_fixer_percentage, 2)
-            })
-
-    farm_summary_df = pd.DataFrame(summary_data)
-    # Sort summary by Farm_Name to match original farm_areas_df order as much as possible
-    farm_summary_df = farm_summary_df.set_index('Farm_Name').reindex(farm_areas_df['Farm_Name'].tolist()).reset_index()
-    print(farm_summary_df.to_string())
-
-else:
-    print("LP problem could not be solved to optimality.")
-
-print("\n--- End of LP Model Script ---")
+        print("LP problem could not be solved to optimality.")
+
+    print("\n--- End of LP Model Script ---")
+
+
+if __name__ == '__main__':
+    main()
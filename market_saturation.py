@@ -0,0 +1,312 @@
+import time
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+from separable_solver import separable_structure
+from solver_backends import solve_arrays
+from tracing import span
+
+# Demand-curve mode of the planting LP: a crop's selling price falls as the
+# campus grows more of it. For crop k the price of the marginal kg falls
+# linearly from the planner's price (Avg_Selling_Price_Yuan_per_kg) at zero
+# volume to Min_Selling_Price_Yuan_per_kg once the campus yield reaches the
+# crop's market size D_k, and stays at the Min price beyond. Split into
+# B = `breakpoints` equal tranches of w = D_k / B kg, each priced at the
+# curve's value at its mid-point, plus an unbounded Min-price tranche, the
+# revenue is concave piecewise linear in the yield. That matches the exact
+# (quadratic) revenue of the linear curve only at tranche boundaries; inside
+# a tranche it is lower by a·u·(w − u)/2 at u kg into the tranche, where
+# a = (price − Min price) / D_k is the curve's slope. The error peaks at the
+# tranche mid-point at a·w²/8 = (price − Min price)·D_k / (8·B²) Yuan per
+# crop: 1/128 of (price − Min price)·D_k for the default B = 4.
+#
+# As an LP (no binaries): one sales variable s_kj per crop and tranche with
+# 0 ≤ s_kj ≤ tranche width, and one campus-wide row per crop
+#   Σ_j s_kj − yield_k · Σ_farms x_fk ≤ 0
+# Planting variables now cost Cost_Yuan_per_m2 and revenue comes from the
+# sales variables. Tranche prices decrease, so an optimal solution fills
+# them in order without any ordering constraints. The rows couple all farms,
+# so these models go to an LP backend (never the separable closed form).
+#
+# Simplex on that LP needs about one pivot per farm, so it is solved on
+# farm classes instead: farms with the same eligible crops and N-fixer ratio
+# have constraints that only scale with their area, and the market rows see
+# campus totals only, so each class is one farm with the summed area and its
+# plan is shared back to the farms in proportion to area. That is exact and
+# the LP size depends on the number of classes (a handful per fertility
+# grade), not on the number of plots.
+
+DEFAULT_BREAKPOINTS = 4
+
+
+def demand_curves(crop_df, total_area_m2, breakpoints=DEFAULT_BREAKPOINTS, market_kg=None,
+                  price_column='Avg_Selling_Price_Yuan_per_kg'):
+    """Per-crop tranche widths (kg) and marginal prices (Yuan/kg), in crop_df order.
+
+    `market_kg` maps crop name -> yield (kg) at which the price reaches the
+    Min price; crops not in it get an equal share of the campus: yield per
+    m² × total_area_m2 / number of crops. The last tranche is unbounded at
+    the Min price (or the start price if that is lower).
+    """
+    if breakpoints < 1:
+        raise ValueError("Demand curves need at least one breakpoint")
+    crop_names = crop_df['Crop_Name'].to_numpy(dtype=object)
+    crop_yield = crop_df['Yield_kg_per_m2'].to_numpy(dtype=np.float64)
+    start = crop_df[price_column].to_numpy(dtype=np.float64)
+    floor = np.minimum(crop_df['Min_Selling_Price_Yuan_per_kg'].to_numpy(dtype=np.float64), start)
+    market = crop_yield * total_area_m2 / len(crop_names)
+    if market_kg:
+        unknown = set(market_kg) - set(crop_names)
+        if unknown:
+            raise KeyError(f"Unknown crops in market sizes: {sorted(unknown)}")
+        market = np.where(pd.Series(crop_names).isin(market_kg.keys()),
+                          pd.Series(crop_names).map(market_kg).to_numpy(dtype=np.float64), market)
+
+    midpoints = (np.arange(breakpoints) + 0.5) / breakpoints
+    prices = np.column_stack([start[:, None] - (start - floor)[:, None] * midpoints[None, :], floor])
+    widths = np.column_stack([np.repeat((market / breakpoints)[:, None], breakpoints, axis=1),
+                              np.full(len(crop_names), np.inf)])
+    return {
+        'crop_names': crop_names,
+        'yield': crop_yield,
+        'cost': crop_df['Cost_Yuan_per_m2'].to_numpy(dtype=np.float64),
+        'market_kg': market,
+        'widths': widths,
+        'prices': prices
+    }
+
+
+# --- 1. Farm Classes ---
+def aggregate_farms(model):
+    """Merge farms with the same eligible crops and N-fixer ratio into one farm per class.
+
+    Returns a build_lp_arrays()-style model over the classes (area rows hold
+    the class areas) plus 'var_map' (class variable of every original
+    variable), 'var_share' (its farm's share of the class area) and
+    'farm_class'; None if the model has cross-farm rows of its own.
+    """
+    structure = separable_structure(model)
+    if structure is None:
+        return None
+    var_farm, var_crop = model['var_farm'], model['var_crop']
+    n_farms, n_crops = len(model['farm_names']), len(model['crop_names'])
+    eligible = np.zeros((n_farms, n_crops), dtype=bool)
+    eligible[var_farm, var_crop] = True
+    ratio = np.nan_to_num(structure['ratio'], nan=-1.0) # No N-fixer row
+    signature = np.column_stack([np.packbits(eligible, axis=1), ratio.view(np.uint8).reshape(n_farms, 8)])
+    farms = np.flatnonzero(eligible.any(axis=1))
+    # One opaque value per farm row, so classes come from a single 1-d unique
+    rows = np.ascontiguousarray(signature[farms]).view(np.dtype((np.void, signature.shape[1]))).ravel()
+    _, first, inverse = np.unique(rows, return_index=True, return_inverse=True)
+    inverse = inverse.ravel()
+    reps = farms[first] # One representative farm per class
+    area = np.nan_to_num(structure['area'], nan=0.0)
+    class_area = np.bincount(inverse, weights=area[farms], minlength=len(reps))
+    farm_class = np.full(n_farms, -1, dtype=np.intp)
+    farm_class[farms] = inverse
+
+    # Class variables = the representatives' variables, in class order
+    farm_start = np.searchsorted(var_farm, np.arange(n_farms))
+    vars_per_farm = np.bincount(var_farm, minlength=n_farms)
+    rep_sizes = vars_per_farm[reps]
+    class_start = np.r_[0, np.cumsum(rep_sizes)[:-1]]
+    class_vars = np.concatenate([np.arange(farm_start[f], farm_start[f] + k) for f, k in zip(reps, rep_sizes)])
+    var_class = np.repeat(np.arange(len(reps)), rep_sizes)
+    n_class_vars = len(class_vars)
+    A_area = sp.csr_matrix((np.ones(n_class_vars), (var_class, np.arange(n_class_vars))),
+                           shape=(len(reps), n_class_vars))
+    fixer_classes = np.flatnonzero(~np.isnan(structure['ratio'][reps]))
+    fixer_row = np.full(len(reps), -1, dtype=np.intp)
+    fixer_row[fixer_classes] = np.arange(len(fixer_classes))
+    in_row = np.flatnonzero(fixer_row[var_class] >= 0)
+    is_fixer = model['is_fixer']
+    A_fixer = sp.csr_matrix((structure['ratio'][reps][var_class[in_row]] - is_fixer[var_crop[class_vars[in_row]]],
+                             (fixer_row[var_class[in_row]], in_row)), shape=(len(fixer_classes), n_class_vars))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        share = np.where(class_area[inverse] > 0, area[farms] / class_area[inverse], 0.0)
+    farm_share = np.zeros(n_farms)
+    farm_share[farms] = share
+    class_names = np.array([f"Class_{k}" for k in range(len(reps))], dtype=object)
+    return {
+        'farm_names': class_names,
+        'farm_areas': class_area,
+        'farm_grades': model['farm_grades'][reps],
+        'crop_names': model['crop_names'],
+        'crop_profit': model['crop_profit'],
+        'is_fixer': is_fixer,
+        'var_farm': var_class,
+        'var_crop': var_crop[class_vars],
+        'c': model['c'][class_vars],
+        'A_ub': sp.vstack([A_area, A_fixer], format='csr'),
+        'b_ub': np.r_[class_area, np.zeros(len(fixer_classes))],
+        'row_names': [f"Area_Constraint_{name}" for name in class_names] +
+                     [f"N_Fixer_{name}" for name in class_names[fixer_classes]],
+        'area_farms': np.arange(len(reps)),
+        'fixer_farms': fixer_classes,
+        'farm_class': farm_class,
+        'var_map': class_start[farm_class[var_farm]] + np.arange(len(var_farm)) - farm_start[var_farm],
+        'var_share': farm_share[var_farm]
+    }
+
+
+def disaggregate(classes, x):
+    """Planting areas of the original model's variables from a solution over aggregate_farms() classes."""
+    return np.asarray(x, dtype=np.float64)[classes['var_map']] * classes['var_share']
+
+
+# --- 2. Model ---
+def build_demand_model(model, curves):
+    """Extend a build_lp_arrays() model with sales tranches and one campus-wide yield row per grown crop.
+
+    Returns {'c', 'A_ub', 'b_ub', 'upper_bounds', 'row_names', 'n_plant'
+    (planting variables come first, in model order), 'sale_crop',
+    'plant_crop', 'sale_tranche', 'curves'}.
+    """
+    if list(curves['crop_names']) != list(model['crop_names']):
+        raise ValueError("Demand curves do not match the model's crops")
+    var_crop = model['var_crop']
+    n_plant, n_crops = len(var_crop), len(model['crop_names'])
+    n_tranches = curves['prices'].shape[1]
+    grown = np.flatnonzero(np.bincount(var_crop, minlength=n_crops) > 0)
+    sale_crop = np.repeat(grown, n_tranches)
+    sale_tranche = np.tile(np.arange(n_tranches), len(grown))
+    n_sale = len(sale_crop)
+
+    row_of_crop = np.full(n_crops, -1, dtype=np.intp)
+    row_of_crop[grown] = np.arange(len(grown))
+    A_yield = sp.csr_matrix((np.r_[-curves['yield'][var_crop], np.ones(n_sale)],
+                             (np.r_[row_of_crop[var_crop], row_of_crop[sale_crop]], np.arange(n_plant + n_sale))),
+                            shape=(len(grown), n_plant + n_sale))
+    A_ub = sp.vstack([sp.hstack([model['A_ub'], sp.csr_matrix((model['A_ub'].shape[0], n_sale))]), A_yield],
+                     format='csr')
+    return {
+        'c': np.r_[-curves['cost'][var_crop], curves['prices'][sale_crop, sale_tranche]],
+        'A_ub': A_ub,
+        'b_ub': np.r_[model['b_ub'], np.zeros(len(grown))],
+        'upper_bounds': np.r_[np.full(n_plant, np.inf), curves['widths'][sale_crop, sale_tranche]],
+        'row_names': list(model['row_names']) + [f"Market_{name}" for name in model['crop_names'][grown]],
+        'n_plant': n_plant,
+        'plant_crop': var_crop,
+        'sale_crop': sale_crop,
+        'sale_tranche': sale_tranche,
+        'curves': curves
+    }
+
+
+def solve_demand_model(demand_model, backend='highs', **options):
+    """Solve a build_demand_model() LP; the common result dict (x = planting areas, then sales in kg)."""
+    with span('lp.solve_demand', variables=len(demand_model['c']), rows=len(demand_model['b_ub'])):
+        return solve_arrays(demand_model['c'], demand_model['A_ub'], demand_model['b_ub'], backend=backend,
+                            upper_bounds=demand_model['upper_bounds'], **options)
+
+
+def solve_with_demand(model, crop_df, backend='highs', breakpoints=DEFAULT_BREAKPOINTS, market_kg=None,
+                      price_column='Avg_Selling_Price_Yuan_per_kg', aggregate=True, **options):
+    """Demand curves from crop_df, the extended model (over farm classes unless `aggregate=False`) and its solve.
+
+    Returns (demand_model, result); result['x'] is in the demand model's
+    columns and result['plan_x'] holds the planting areas of `model`'s
+    variables.
+    """
+    curves = demand_curves(crop_df, float(model['farm_areas'].sum()), breakpoints, market_kg, price_column)
+    classes = aggregate_farms(model) if aggregate else None
+    demand_model = build_demand_model(classes or model, curves)
+    result = solve_demand_model(demand_model, backend, **options)
+    plan_x = result['x'][:demand_model['n_plant']]
+    result['plan_x'] = disaggregate(classes, plan_x) if classes else plan_x
+    result['stats']['farm_classes'] = len(classes['farm_names']) if classes else None
+    return demand_model, result
+
+
+def market_report(demand_model, x):
+    """Per grown crop: planted area, yield, kg sold, revenue and the realized / marginal price."""
+    curves, n_plant, sale_crop = demand_model['curves'], demand_model['n_plant'], demand_model['sale_crop']
+    n_crops = len(curves['crop_names'])
+    x = np.asarray(x, dtype=np.float64)
+    area = np.bincount(demand_model['plant_crop'], weights=x[:n_plant], minlength=n_crops)
+    sold, prices = x[n_plant:], demand_model['c'][n_plant:]
+    sold_kg = np.bincount(sale_crop, weights=sold, minlength=n_crops)
+    revenue = np.bincount(sale_crop, weights=sold * prices, minlength=n_crops)
+    marginal = np.full(n_crops, np.nan) # Price of the last tranche in use
+    in_use = sold > 1e-9
+    np.fmin.at(marginal, sale_crop[in_use], prices[in_use])
+    crops = np.unique(sale_crop)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        realized = np.where(sold_kg > 0, revenue / sold_kg, np.nan)
+    return pd.DataFrame({
+        'Crop_Name': curves['crop_names'][crops],
+        'Area_m2': area[crops],
+        'Yield_kg': area[crops] * curves['yield'][crops],
+        'Market_kg': curves['market_kg'][crops],
+        'Sold_kg': sold_kg[crops],
+        'Revenue_Yuan': revenue[crops],
+        'Realized_Price': realized[crops],
+        'Marginal_Price': marginal[crops]
+    })
+
+
+# --- 3. Benchmark ---
+def benchmark_demand_model(plot_counts=(1_000, 10_000, 100_000, 1_000_000), breakpoint_counts=(1, 4, 16, 64, 256),
+                           backends=('highs', 'cbc'), per_plot_limit=1_000, seed=0):
+    """Build and solve seconds of the demand-curve LP over farm classes per plot count × breakpoints.
+
+    Up to `per_plot_limit` plots the same LP is also solved with one farm
+    per plot (HiGHS) to check the objective and show the difference.
+    """
+    import lp_optimizer
+    from lp_model_builder import build_lp_arrays
+    from synthetic_data import make_farm_areas, make_fertility_grades
+
+    rows = []
+    for n in plot_counts:
+        farm_areas_df = make_farm_areas(n, seed=seed)
+        grades = make_fertility_grades(farm_areas_df['Farm_Name'], seed=seed)
+        model = build_lp_arrays(farm_areas_df, lp_optimizer.crop_df, grades, lp_optimizer.recommendations,
+                                lp_optimizer.nitrogen_fixers)
+        total_area = float(model['farm_areas'].sum())
+        for breakpoints in breakpoint_counts:
+            start = time.perf_counter()
+            curves = demand_curves(lp_optimizer.crop_df, total_area, breakpoints)
+            classes = aggregate_farms(model)
+            demand_model = build_demand_model(classes, curves)
+            build_seconds = time.perf_counter() - start
+            per_plot = None
+            if n <= per_plot_limit:
+                per_plot = solve_demand_model(build_demand_model(model, curves), 'highs')
+            for backend in backends:
+                result = solve_demand_model(demand_model, backend)
+                rows.append({'Plots': n, 'Breakpoints': breakpoints, 'Farm_Classes': len(classes['farm_names']),
+                             'Variables': len(demand_model['c']), 'Rows': len(demand_model['b_ub']),
+                             'Backend': backend, 'Status': result['status'],
+                             'Objective': round(result['objective'] or 0.0, 2), 'Build_s': round(build_seconds, 4),
+                             'Solve_s': round(result['seconds'], 4),
+                             'Per_Plot_Solve_s': round(per_plot['seconds'], 3) if per_plot else None,
+                             'Per_Plot_Match': bool(np.isclose(per_plot['objective'], result['objective'],
+                                                               rtol=1e-7)) if per_plot else None})
+    return pd.DataFrame(rows)
+
+
+def main():
+    import lp_optimizer
+
+    planner = lp_optimizer.CropPlanner(lp_optimizer.farm_areas_df, lp_optimizer.crop_df,
+                                       lp_optimizer.farm_fertility_grades, lp_optimizer.recommendations,
+                                       lp_optimizer.nitrogen_fixers)
+    planner.solve(backend='highs')
+    fixed_price = planner.objective_value
+    demand_model, result = solve_with_demand(planner.model, planner.crop_df)
+    pd.set_option('display.width', 200)
+    print(f"Fixed prices: {fixed_price:.2f} Yuan; with demand curves ({DEFAULT_BREAKPOINTS} breakpoints): "
+          f"{result['objective']:.2f} Yuan")
+    print("\n--- Campus Market per Crop ---")
+    report = market_report(demand_model, result['x'])
+    print(report[report['Area_m2'] > 1e-9].round(2).to_string())
+
+    print("\n--- Demand-Curve LP Build / Solve Time ---")
+    print(benchmark_demand_model().to_string())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,227 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from pulp import PULP_CBC_CMD, LpStatus, value
+
+import lp_optimizer
+from lp_model_builder import DEFAULT_FIXER_RATIOS, build_lp_arrays, pulp_problem_from_arrays
+from synthetic_data import make_farm_areas, make_fertility_grades
+
+# Integer planting mode for the crop allocation model.
+# On top of the continuous areas from build_lp_arrays it adds
+#   - a minimum planted area per crop (x = 0 or x ≥ min_area, via binary y),
+#   - a maximum number of crops per plot (Σ y ≤ max_crops_per_plot),
+#   - whole bed units (x = bed_size × integer beds),
+#   - optional campus-wide crop quotas (Σ_farms x_crop ≤ quota).
+# Without quotas farms are independent, so groups of farms are solved as
+# separate MIPs across a process pool. Quotas are the only coupling; the
+# decomposition then splits each quota across farms in proportion to their
+# area, which keeps every block feasible, and reports the gap to the
+# monolithic optimum.
+
+DEFAULT_MIP_OPTIONS = {
+    'min_area': 10.0, # m² per planted crop
+    'max_crops_per_plot': 3,
+    'bed_size': None, # m² per bed; None keeps areas continuous
+    'crop_quotas': None, # {crop name: max campus-wide m²}
+    'gap_rel': 1e-4
+}
+
+
+# --- 1. MIP Construction ---
+def build_mip_arrays(model, options, farms=None, quota_shares=None):
+    """Integer model arrays for the given farm indices (all farms by default).
+
+    Variables are [area or bed count per (farm, crop) | binary use flag per
+    (farm, crop)]. `quota_shares` maps crop -> per-farm quota array and
+    replaces the global quota rows with farm-local ones. Returns a dict with
+    the solver arrays plus `base_vars` (positions in the base model) and
+    `area_scale` (m² per unit of the first variable block).
+    """
+    options = {**DEFAULT_MIP_OPTIONS, **options}
+    farms = np.arange(len(model['farm_names'])) if farms is None else np.asarray(farms)
+    base_vars = np.flatnonzero(np.isin(model['var_farm'], farms))
+    row_owner = np.concatenate([model['area_farms'], model['fixer_farms']])
+    base_rows = np.flatnonzero(np.isin(row_owner, farms))
+    n = len(base_vars)
+    var_farm, var_crop = model['var_farm'][base_vars], model['var_crop'][base_vars]
+    scale = float(options['bed_size'] or 1.0)
+    use_flags = options['min_area'] > 0 or options['max_crops_per_plot'] is not None
+
+    blocks, b_blocks, row_names = [], [], []
+    A_base = model['A_ub'][base_rows][:, base_vars] * scale
+    blocks.append(A_base)
+    b_blocks.append(model['b_ub'][base_rows])
+    row_names += [model['row_names'][r] for r in base_rows]
+
+    # Global or farm-local quotas on total crop area
+    for crop_name, quota in (options['crop_quotas'] or {}).items():
+        cols = np.flatnonzero(model['crop_names'][var_crop] == crop_name)
+        if quota_shares is None:
+            blocks.append(sp.csr_matrix((np.full(len(cols), scale), (np.zeros(len(cols), dtype=np.intp), cols)), shape=(1, n)))
+            b_blocks.append(np.array([quota], dtype=np.float64))
+            row_names.append(f'Quota_{crop_name}')
+        else:
+            blocks.append(sp.csr_matrix((np.full(len(cols), scale), (np.arange(len(cols)), cols)), shape=(len(cols), n)))
+            b_blocks.append(quota_shares[crop_name][var_farm[cols]])
+            row_names += [f'Quota_{crop_name}_{model["farm_names"][f]}' for f in var_farm[cols]]
+
+    n_y = n if use_flags else 0
+    A = sp.hstack([sp.vstack(blocks, format='csr'), sp.csr_matrix((sum(b.shape[0] for b in blocks), n_y))], format='csr')
+    extra, b_extra = [], []
+    if use_flags:
+        eye = sp.identity(n, format='csr')
+        farm_area = model['farm_areas'][var_farm]
+        # Linking: scale·x − area·y ≤ 0, minimum size: min_area·y − scale·x ≤ 0
+        extra.append(sp.hstack([eye * scale, -sp.diags(farm_area)], format='csr'))
+        b_extra.append(np.zeros(n))
+        row_names += [f'Link_{k}' for k in base_vars]
+        if options['min_area'] > 0:
+            extra.append(sp.hstack([-eye * scale, eye * options['min_area']], format='csr'))
+            b_extra.append(np.zeros(n))
+            row_names += [f'Min_Area_{k}' for k in base_vars]
+        if options['max_crops_per_plot'] is not None:
+            used_farms, farm_row = np.unique(var_farm, return_inverse=True)
+            extra.append(sp.hstack([sp.csr_matrix((len(used_farms), n)),
+                                    sp.csr_matrix((np.ones(n), (farm_row, np.arange(n))), shape=(len(used_farms), n))],
+                                   format='csr'))
+            b_extra.append(np.full(len(used_farms), float(options['max_crops_per_plot'])))
+            row_names += [f'Max_Crops_{model["farm_names"][f]}' for f in used_farms]
+
+    A = sp.vstack([A] + extra, format='csr')
+    x_category = 'Integer' if options['bed_size'] else 'Continuous'
+    return {
+        'c': np.concatenate([model['c'][base_vars] * scale, np.zeros(n_y)]),
+        'A_ub': A,
+        'b_ub': np.concatenate(b_blocks + b_extra),
+        'var_names': [f'X{k}' for k in base_vars] + [f'Y{k}' for k in base_vars[:n_y]],
+        'row_names': row_names,
+        'categories': [x_category] * n + ['Binary'] * n_y,
+        'base_vars': base_vars,
+        'area_scale': scale
+    }
+
+
+def solve_mip_arrays(arrays, gap_rel=1e-4, time_limit=None):
+    """Solve one MIP block; returns (status, objective, areas on arrays['base_vars'], seconds)."""
+    start = time.perf_counter()
+    prob, variables = pulp_problem_from_arrays(arrays['c'], arrays['A_ub'], arrays['b_ub'], arrays['var_names'],
+                                               arrays['row_names'], categories=arrays['categories'],
+                                               name='Crop_Planting_MIP')
+    prob.solve(PULP_CBC_CMD(msg=False, gapRel=gap_rel, timeLimit=time_limit))
+    n = len(arrays['base_vars'])
+    areas = np.array([v.varValue or 0.0 for v in variables[:n]]) * arrays['area_scale']
+    objective = value(prob.objective) or 0.0
+    return LpStatus[prob.status], objective, areas, time.perf_counter() - start
+
+
+# --- 2. Per-Farm Decomposition ---
+_WORKER_MODEL = None
+
+
+def _init_worker(model):
+    global _WORKER_MODEL
+    _WORKER_MODEL = model
+
+
+def _solve_farm_block(farms, options, quota_shares):
+    arrays = build_mip_arrays(_WORKER_MODEL, options, farms=farms, quota_shares=quota_shares)
+    status, objective, areas, seconds = solve_mip_arrays(arrays, options['gap_rel'])
+    return arrays['base_vars'], status, objective, areas, seconds
+
+
+def split_quotas(model, crop_quotas):
+    """Share each global crop quota among eligible farms in proportion to farm area."""
+    shares = {}
+    for crop_name, quota in (crop_quotas or {}).items():
+        j = model['crop_index'][crop_name]
+        eligible_area = np.zeros(len(model['farm_names']))
+        farms = model['var_farm'][model['var_crop'] == j]
+        eligible_area[farms] = model['farm_areas'][farms]
+        total = eligible_area.sum()
+        shares[crop_name] = quota * eligible_area / total if total > 0 else eligible_area
+    return shares
+
+
+def solve_decomposed(model, options=None, processes=None, farms_per_task=50):
+    """Solve the MIP farm-block by farm-block across a process pool.
+
+    Returns (status, objective, areas over all base variables, wall seconds).
+    The status is the worst block status ('Optimal' only if every block is).
+    """
+    options = {**DEFAULT_MIP_OPTIONS, **(options or {})}
+    quota_shares = split_quotas(model, options['crop_quotas']) if options['crop_quotas'] else None
+    farm_blocks = [np.arange(i, min(i + farms_per_task, len(model['farm_names'])))
+                   for i in range(0, len(model['farm_names']), farms_per_task)]
+    areas = np.zeros(len(model['c']))
+    statuses, objective = [], 0.0
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=processes or os.cpu_count() or 1,
+                             initializer=_init_worker, initargs=(model,)) as pool:
+        for base_vars, status, block_objective, block_areas, _ in pool.map(
+                _solve_farm_block, farm_blocks, [options] * len(farm_blocks), [quota_shares] * len(farm_blocks)):
+            areas[base_vars] = block_areas
+            statuses.append(status)
+            objective += block_objective
+    status = 'Optimal' if all(s == 'Optimal' for s in statuses) else next(s for s in statuses if s != 'Optimal')
+    return status, objective, areas, time.perf_counter() - start
+
+
+def solve_monolithic(model, options=None):
+    """Solve all farms as one MIP; returns (status, objective, areas, seconds)."""
+    options = {**DEFAULT_MIP_OPTIONS, **(options or {})}
+    return solve_mip_arrays(build_mip_arrays(model, options), options['gap_rel'])
+
+
+def compare_decomposition(model, options=None, processes=None, farms_per_task=50):
+    """Decomposed vs monolithic objective, relative optimality gap and wall times."""
+    dec_status, dec_obj, _, dec_seconds = solve_decomposed(model, options, processes, farms_per_task)
+    mono_status, mono_obj, _, mono_seconds = solve_monolithic(model, options)
+    return {
+        'Decomposed_Status': dec_status,
+        'Decomposed_Profit': round(dec_obj, 2),
+        'Decomposed_s': round(dec_seconds, 3),
+        'Monolithic_Status': mono_status,
+        'Monolithic_Profit': round(mono_obj, 2),
+        'Monolithic_s': round(mono_seconds, 3),
+        'Optimality_Gap': (mono_obj - dec_obj) / abs(mono_obj) if mono_obj else 0.0
+    }
+
+
+def plan_from_areas(model, areas):
+    """Planting plan DataFrame for nonzero areas over the base variables."""
+    k = np.flatnonzero(areas > 1e-9)
+    return pd.DataFrame({
+        'Farm_Name': model['farm_names'][model['var_farm'][k]],
+        'Fertility_Grade': model['farm_grades'][model['var_farm'][k]],
+        'Crop_Name': model['crop_names'][model['var_crop'][k]],
+        'Area_m2_Allocated': np.round(areas[k], 2),
+        'Expected_Profit_from_Crop': np.round(areas[k] * model['c'][k], 2)
+    })
+
+
+def main():
+    model = build_lp_arrays(lp_optimizer.farm_areas_df, lp_optimizer.crop_df, lp_optimizer.farm_fertility_grades,
+                            lp_optimizer.recommendations, lp_optimizer.nitrogen_fixers, DEFAULT_FIXER_RATIOS)
+    options = {'min_area': 20.0, 'max_crops_per_plot': 2, 'bed_size': 1.5}
+    status, objective, areas, seconds = solve_decomposed(model, options)
+    print("--- Integer Planting Plan (min 20 m² per crop, ≤ 2 crops per plot, 1.5 m² beds) ---")
+    print(f"Status: {status}, Total Expected Profit: {objective:.2f} Yuan ({seconds:.2f}s)")
+    print(plan_from_areas(model, areas).to_string())
+
+    print("\n--- Decomposition vs Monolithic Solve ---")
+    rows = [{'Case': 'campus, no quotas', **compare_decomposition(model, options)},
+            {'Case': 'campus, 蒜 quota 3000 m²', **compare_decomposition(model, {**options, 'crop_quotas': {'蒜': 3000.0}})}]
+    farm_areas_df = make_farm_areas(500, seed=0)
+    large = build_lp_arrays(farm_areas_df, lp_optimizer.crop_df, make_fertility_grades(farm_areas_df['Farm_Name'], seed=0),
+                            lp_optimizer.recommendations, lp_optimizer.nitrogen_fixers)
+    rows.append({'Case': '500 synthetic plots', **compare_decomposition(large, options, farms_per_task=100)})
+    print(pd.DataFrame(rows).to_string())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,257 @@
+import time
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from pulp import PULP_CBC_CMD, LpStatus
+
+from lp_model_builder import pulp_problem_from_arrays
+from separable_solver import separable_structure
+from solver_backends import solve_arrays
+
+# Profit vs. nitrogen-fixer area trade-off of the planting LP. Both
+# objectives are linear, so the Pareto frontier is concave and piecewise
+# linear and every point on it maximizes profit + λ·(fixer area) for some
+# λ ≥ 0 (λ = profit given up per extra m² of fixer crops). The per-grade
+# ratios stay in force as floors.
+#
+# Separable model: each farm's best plan as a function of λ is the upper
+# envelope of at most three lines (best non-fixer or nothing, the r : 1 − r
+# fixer blend, all on the best fixer), so each farm switches plans at no more
+# than two λ values. Sorting all switches by λ and accumulating their profit
+# and fixer-area changes gives the exact frontier breakpoints in one sweep.
+#
+# Other models (e.g. with cross-farm rows): the breakpoints are found by
+# weighted-sum re-solves between known frontier points. Each re-solve only
+# changes the objective of one PuLP model, so the rows are built once, but
+# CBC solves every step cold (its warm start applies to MIPs only).
+
+
+def fixer_area_vector(model):
+    """1.0 for every variable that is a nitrogen-fixing crop (fixer area = d·x)."""
+    return model['is_fixer'][model['var_crop']].astype(np.float64)
+
+
+def _frontier_frame(lam, fixer_area, planted, profit, switched):
+    frontier = pd.DataFrame({
+        'Lambda_Yuan_per_m2': lam,
+        'Fixer_Area_m2': fixer_area,
+        'Planted_Area_m2': planted,
+        'Total_Profit': profit,
+        'Farms_Switched': switched
+    })
+    with np.errstate(divide='ignore', invalid='ignore'):
+        frontier.insert(3, 'Fixer_Share', np.where(planted > 0, fixer_area / planted, 0.0))
+    return frontier
+
+
+# --- 1. Exact Sweep for the Separable Model ---
+def _farm_lines(model, structure):
+    """Per-farm candidate plans as lines in λ: intercept (profit), slope (fixer area) and planted area."""
+    var_farm, c = model['var_farm'], model['c']
+    n_farms = len(model['farm_names'])
+    fixer_var = model['is_fixer'][model['var_crop']]
+    area = np.nan_to_num(structure['area'], nan=0.0)
+    has_ratio = ~np.isnan(structure['ratio'])
+    ratio = np.where(has_ratio, np.maximum(structure['ratio'], 0.0), 0.0)
+    feasible = ratio <= 1
+
+    best_fixer = np.full(n_farms, -np.inf)
+    np.maximum.at(best_fixer, var_farm[fixer_var], c[fixer_var])
+    best_other = np.full(n_farms, -np.inf)
+    np.maximum.at(best_other, var_farm[~fixer_var], c[~fixer_var])
+
+    # Line 0: nothing or (plain farms) the best non-fixer; line 1: fixer blend; line 2: all on the best fixer
+    plain_other = np.where(~has_ratio & np.isfinite(best_other), best_other * area, -np.inf)
+    zero_line = np.maximum(plain_other, 0.0)
+    with np.errstate(invalid='ignore'):
+        blend = np.where(has_ratio & feasible & np.isfinite(best_fixer) & np.isfinite(best_other),
+                         (ratio * best_fixer + (1 - ratio) * best_other) * area, -np.inf)
+    fixer = np.where(feasible & np.isfinite(best_fixer), best_fixer * area, -np.inf)
+    intercept = np.column_stack([zero_line, blend, fixer])
+    slope = np.column_stack([np.zeros(n_farms), ratio * area, area])
+    planted = np.column_stack([np.where(plain_other > 0, area, 0.0), area, area])
+    return intercept, slope, planted
+
+
+def separable_frontier(model, structure=None, tol=1e-9):
+    """Exact Pareto breakpoints (profit vs. fixer area) of a separable planting model, in one sweep."""
+    structure = structure or separable_structure(model)
+    if structure is None:
+        raise ValueError("Model has cross-farm rows; use lp_frontier()")
+    intercept, slope, planted = _farm_lines(model, structure)
+    n_farms = len(intercept)
+    rows = np.arange(n_farms)
+    finite = np.isfinite(intercept)
+
+    # Plan at λ = 0: most profitable line, ties to the one with more fixer area (Pareto-efficient)
+    best = intercept.max(axis=1)
+    ties = finite & (intercept >= (best - tol * np.maximum(np.abs(best), 1.0))[:, None])
+    current = np.argmax(np.where(ties, slope, -1.0), axis=1)
+    fixer_area, planted_area = slope[rows, current].sum(), planted[rows, current].sum()
+    profit = intercept[rows, current].sum()
+
+    # Walk each farm's envelope: next line = earliest crossing among steeper lines (ties to the steepest)
+    events = []
+    lam = np.zeros(n_farms)
+    for _ in range(2): # At most two switches per farm
+        a, s = intercept[rows, current], slope[rows, current]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cross = np.where(finite & (slope > s[:, None] + tol), (a[:, None] - intercept) / (slope - s[:, None]),
+                             np.inf)
+        cross = np.maximum(cross, lam[:, None])
+        first = cross.min(axis=1)
+        moving = np.flatnonzero(np.isfinite(first))
+        if not len(moving):
+            break
+        nxt = np.argmax(np.where(cross[moving] <= first[moving, None] * (1 + tol) + tol, slope[moving], -1.0), axis=1)
+        now = current[moving]
+        # (λ, Δ fixer area, Δ planted area, Δ profit) per switch
+        events.append(np.column_stack([first[moving], slope[moving, nxt] - slope[moving, now],
+                                       planted[moving, nxt] - planted[moving, now],
+                                       intercept[moving, nxt] - intercept[moving, now]]))
+        current[moving], lam[moving] = nxt, first[moving]
+
+    events = np.vstack(events) if events else np.zeros((0, 4))
+    events = events[np.argsort(events[:, 0], kind='stable')]
+    # Switches at the same λ (up to round-off) make up one frontier segment
+    lam_sorted = events[:, 0]
+    starts = np.flatnonzero(np.r_[True, np.diff(lam_sorted) > tol * np.maximum(np.abs(lam_sorted[1:]), 1.0)])
+    lam_values = lam_sorted[starts]
+    totals = np.cumsum(np.add.reduceat(events[:, 1:], starts, axis=0), axis=0) if len(events) else np.zeros((0, 3))
+    return _frontier_frame(np.r_[0.0, lam_values], fixer_area + np.r_[0.0, totals[:, 0]],
+                           planted_area + np.r_[0.0, totals[:, 1]], profit + np.r_[0.0, totals[:, 2]],
+                           np.r_[0, np.diff(np.r_[starts, len(events)])])
+
+
+# --- 2. Weighted-Sum Re-solves for Coupled Models ---
+def lp_frontier(model, max_solves=200, tol=1e-9):
+    """Pareto breakpoints of any planting model by weighted-sum re-solves of one PuLP/CBC model.
+
+    Between two known frontier points the weights are chosen so both score
+    the same; a solve scoring higher adds a breakpoint between them, one that
+    does not shows the segment lies on the frontier (Aneja-Nair search).
+    """
+    c, d = model['c'], fixer_area_vector(model)
+    n = len(c)
+    prob, variables = pulp_problem_from_arrays(c, model['A_ub'], model['b_ub'], [f'X{k}' for k in range(n)],
+                                               list(model['row_names']))
+    solver = PULP_CBC_CMD(msg=False)
+    solves = 0
+
+    def solve(w_profit, w_fixer):
+        nonlocal solves
+        weights = w_profit * c + w_fixer * d
+        for var, coef in zip(variables, weights.tolist()):
+            prob.objective[var] = coef
+        prob.solve(solver)
+        solves += 1
+        if LpStatus[prob.status] != 'Optimal':
+            raise ValueError(f"Weighted solve failed: {LpStatus[prob.status]}")
+        x = np.array([v.varValue or 0.0 for v in variables], dtype=np.float64)
+        return float(d @ x), float(c @ x), float(x.sum())
+
+    # Ends: max profit (ties to more fixer area), max fixer area (ties to more profit)
+    eps = tol / max(1.0, float(np.abs(c).max(initial=0.0)))
+    points = [solve(1.0, eps), solve(eps, 1.0)]
+    pending = [(0, 1)] if points[1][0] > points[0][0] * (1 + tol) + tol else []
+    edges = []
+    while pending and solves < max_solves:
+        i, j = pending.pop()
+        (f1, p1, _), (f2, p2, _) = points[i], points[j]
+        w_profit, w_fixer = f2 - f1, p1 - p2
+        point = solve(w_profit, w_fixer)
+        level = w_profit * p1 + w_fixer * f1
+        if w_profit * point[1] + w_fixer * point[0] > level + tol * max(1.0, abs(level)):
+            points.append(point)
+            pending += [(i, len(points) - 1), (len(points) - 1, j)]
+        else:
+            edges.append((i, j))
+    points = sorted(points[:1] + [points[k] for _, k in edges], key=lambda p: p[0]) if edges else points[:1]
+    fixer_area, profit, planted = (np.array(v) for v in zip(*points))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        lam = np.r_[0.0, (profit[:-1] - profit[1:]) / (fixer_area[1:] - fixer_area[:-1])]
+    frontier = _frontier_frame(lam, fixer_area, planted, profit, np.zeros(len(points), dtype=np.int64))
+    frontier.attrs['solves'] = solves
+    return frontier.drop(columns='Farms_Switched')
+
+
+def pareto_frontier(model):
+    """Profit vs. fixer-area frontier: exact sweep for separable models, weighted-sum re-solves otherwise."""
+    structure = separable_structure(model)
+    if structure is None:
+        return lp_frontier(model)
+    return separable_frontier(model, structure)
+
+
+def frontier_profit(frontier, fixer_area):
+    """Best total profit with at least `fixer_area` m² of fixers (linear between breakpoints; -inf beyond the end)."""
+    areas, profits = frontier['Fixer_Area_m2'].to_numpy(), frontier['Total_Profit'].to_numpy()
+    fixer_area = np.asarray(fixer_area, dtype=np.float64)
+    return np.where(fixer_area > areas[-1] * (1 + 1e-12), -np.inf,
+                    np.interp(fixer_area, areas, profits, left=profits[0]))
+
+
+# --- 3. Check and Benchmark ---
+def fixer_floor_check(model, frontier, backend='highs', midpoints=True):
+    """Max profit s.t. fixer area ≥ target, solved as an LP at each breakpoint (and segment midpoint),
+    against the frontier's value there."""
+    d = fixer_area_vector(model)
+    A_ub = sp.vstack([model['A_ub'], sp.csr_matrix(-d)], format='csr')
+    targets = frontier['Fixer_Area_m2'].to_numpy()
+    if midpoints:
+        targets = np.sort(np.r_[targets, (targets[1:] + targets[:-1]) / 2])
+    rows = []
+    for target in targets:
+        result = solve_arrays(model['c'], A_ub, np.r_[model['b_ub'], -target], backend=backend)
+        expected = float(frontier_profit(frontier, target))
+        rows.append({'Fixer_Area_m2': target, 'Frontier_Profit': expected, 'LP_Profit': result['objective'],
+                     'Match': bool(np.isclose(result['objective'], expected, rtol=1e-7, atol=1e-6))})
+    return pd.DataFrame(rows)
+
+
+def benchmark_frontier(plot_counts=(100, 1_000, 10_000, 100_000, 1_000_000), lp_limit=1_000, seed=0):
+    """Seconds for the one-sweep frontier per size and, up to `lp_limit` plots, the weighted-sum re-solve search."""
+    import lp_optimizer
+    from lp_model_builder import build_lp_arrays
+    from synthetic_data import make_farm_areas, make_fertility_grades
+
+    rows = []
+    for n in plot_counts:
+        farm_areas_df = make_farm_areas(n, seed=seed)
+        grades = make_fertility_grades(farm_areas_df['Farm_Name'], seed=seed)
+        model = build_lp_arrays(farm_areas_df, lp_optimizer.crop_df, grades, lp_optimizer.recommendations,
+                                lp_optimizer.nitrogen_fixers)
+        start = time.perf_counter()
+        frontier = separable_frontier(model)
+        row = {'Plots': n, 'Variables': len(model['c']), 'Breakpoints': len(frontier),
+               'Sweep_s': round(time.perf_counter() - start, 4), 'LP_Solves': None, 'LP_s': None, 'LP_Match': None}
+        if n <= lp_limit:
+            start = time.perf_counter()
+            reference = lp_frontier(model)
+            row.update(LP_Solves=reference.attrs['solves'], LP_s=round(time.perf_counter() - start, 3),
+                       LP_Match=bool(np.allclose(frontier_profit(frontier, reference['Fixer_Area_m2']),
+                                                 reference['Total_Profit'], rtol=1e-6)))
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def main():
+    import lp_optimizer
+
+    planner = lp_optimizer.CropPlanner(lp_optimizer.farm_areas_df, lp_optimizer.crop_df,
+                                       lp_optimizer.farm_fertility_grades, lp_optimizer.recommendations,
+                                       lp_optimizer.nitrogen_fixers)
+    frontier = pareto_frontier(planner.model)
+    pd.set_option('display.width', 200)
+    print("--- Profit vs. N-Fixer Area Frontier (campus) ---")
+    print(frontier.round(4).to_string())
+    check = fixer_floor_check(planner.model, frontier)
+    print(f"\nLP check at {len(check)} fixer-area floors: {int(check['Match'].sum())} match")
+
+    print("\n--- Frontier Computation Time ---")
+    print(benchmark_frontier().to_string())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,230 @@
+import hashlib
+import json
+import os
+import pickle
+import time
+
+import pandas as pd
+
+import farm_area_parser
+import lp_optimizer
+from data_ingest import CROP_WORKBOOK, SOIL_WORKBOOK, file_fingerprint, parse_crop_workbook, parse_soil_workbook
+from fertility_scoring import score_soil
+from lp_model_builder import DEFAULT_FIXER_RATIOS, crop_profit_per_m2
+from soil_stream import to_scoring_frame
+from tracing import span
+from visualizer import plot_farm_profits, plot_fertility_distribution
+
+# End-to-end runner for the planning workflow
+#   soil workbook -> soil_table -> fertility -> grades ─┐
+#   area register -> farm_areas ────────────────────────┼-> lp_plan -> charts
+#   crop workbook -> crop_table -> crop_economics ──────┘
+# Every stage declares its upstream stages, the parameters it reads and the
+# source files behind them. A stage's cache key hashes its code version, its
+# parameters, the content of its source files and the content hashes of its
+# upstream artifacts, so a run only executes stages whose inputs actually
+# changed (e.g. a price override re-runs crop_economics, lp_plan and charts
+# while ingest and soil scoring are served from the cache). Because keys use
+# artifact contents, a re-run stage that reproduces its previous output does
+# not invalidate the stages below it.
+
+PIPELINE_CACHE_DIR = ".pipeline_cache"
+
+DEFAULT_PARAMS = {
+    'soil_workbook': SOIL_WORKBOOK,
+    'crop_workbook': CROP_WORKBOOK,
+    'area_register': farm_area_parser.raw_text_data,
+    'default_grade': 'II', # Farms without a soil sample (the 后勤 plots) are assumed grade II
+    'price_overrides': {}, # {crop name: Avg selling price, Yuan/kg}
+    'recommendations': lp_optimizer.recommendations,
+    'nitrogen_fixers': lp_optimizer.nitrogen_fixers,
+    'fixer_ratios': DEFAULT_FIXER_RATIOS,
+    'chart_dir': '.'
+}
+
+
+# --- 1. Stages ---
+def _run_soil_table(upstream, params):
+    return parse_soil_workbook(params['soil_workbook'])
+
+
+def _run_crop_table(upstream, params):
+    return parse_crop_workbook(params['crop_workbook'])
+
+
+def _run_farm_areas(upstream, params):
+    df_areas, malformed = farm_area_parser.parse_area_text(params['area_register'])
+    for line in malformed['Line']:
+        print(f"Warning: Could not parse line: '{line}'")
+    return df_areas
+
+
+def _run_fertility(upstream, params):
+    soil = upstream['soil_table']
+    return score_soil(to_scoring_frame(soil.reset_index().rename(columns={soil.index.name: 'Farm_Name'})))
+
+
+def _run_grades(upstream, params):
+    scored = dict(zip(upstream['fertility']['Farm_Name'], upstream['fertility']['Fertility_Grade']))
+    return {farm: scored.get(farm, params['default_grade']) for farm in upstream['farm_areas']['Farm_Name']}
+
+
+def _run_crop_economics(upstream, params):
+    crop_df = upstream['crop_table'].copy()
+    prices = pd.Series(params['price_overrides'], dtype='float64')
+    rows = crop_df['Crop_Name'].isin(prices.index)
+    crop_df.loc[rows, 'Avg_Selling_Price_Yuan_per_kg'] = prices.reindex(crop_df.loc[rows, 'Crop_Name']).to_numpy()
+    crop_df['Profit_per_m2'] = crop_profit_per_m2(crop_df)
+    return crop_df
+
+
+def _run_lp_plan(upstream, params):
+    planner = lp_optimizer.CropPlanner(upstream['farm_areas'], upstream['crop_economics'], upstream['grades'],
+                                       params['recommendations'], params['nitrogen_fixers'], params['fixer_ratios'])
+    planner.solve()
+    plan = {'status': planner.status, 'objective': planner.objective_value}
+    if planner.status == 'Optimal':
+        plan['planting_plan'], plan['farm_summary'] = lp_optimizer.build_planting_report(planner)
+    return plan
+
+
+def _run_charts(upstream, params):
+    grade_counts = pd.Series(upstream['grades']).value_counts()
+    fertility_grades_counts = {f'Grade {g}': int(grade_counts.get(g, 0)) for g in ('I', 'II', 'III')}
+    charts = {'fertility_distribution': plot_fertility_distribution(
+        fertility_grades_counts, os.path.join(params['chart_dir'], 'fertility_distribution.png'))}
+    if 'planting_plan' in upstream['lp_plan'] and not upstream['lp_plan']['planting_plan'].empty:
+        charts['planting_profit_by_farm'] = plot_farm_profits(
+            upstream['lp_plan']['planting_plan'], os.path.join(params['chart_dir'], 'planting_profit_by_farm.png'))
+    return charts
+
+
+# Stage name -> declaration, in a valid execution order.
+# 'version' is part of the cache key: bump it when a stage's code changes its output.
+# 'sources' name parameters holding file paths whose content is hashed.
+# 'writes_files' marks stages whose artifact is {name: path}; a cached entry
+# is only reused while those files still exist.
+STAGES = {
+    'soil_table': {'inputs': (), 'params': ('soil_workbook',), 'sources': ('soil_workbook',), 'run': _run_soil_table, 'version': 1},
+    'crop_table': {'inputs': (), 'params': ('crop_workbook',), 'sources': ('crop_workbook',), 'run': _run_crop_table, 'version': 1},
+    'farm_areas': {'inputs': (), 'params': ('area_register',), 'run': _run_farm_areas, 'version': 1},
+    'fertility': {'inputs': ('soil_table',), 'params': (), 'run': _run_fertility, 'version': 1},
+    'grades': {'inputs': ('fertility', 'farm_areas'), 'params': ('default_grade',), 'run': _run_grades, 'version': 1},
+    'crop_economics': {'inputs': ('crop_table',), 'params': ('price_overrides',), 'run': _run_crop_economics, 'version': 1},
+    'lp_plan': {'inputs': ('farm_areas', 'crop_economics', 'grades'),
+                'params': ('recommendations', 'nitrogen_fixers', 'fixer_ratios'), 'run': _run_lp_plan, 'version': 1},
+    'charts': {'inputs': ('grades', 'lp_plan'), 'params': ('chart_dir',), 'run': _run_charts, 'version': 1,
+               'writes_files': True}
+}
+
+
+# --- 2. Cache Keys and Artifact Store ---
+def _canonical_json(value):
+    return json.dumps(value, sort_keys=True, ensure_ascii=False, default=str)
+
+
+def stage_key(name, params, input_hashes):
+    """Hash of everything a stage's output depends on."""
+    stage = STAGES[name]
+    digest = hashlib.sha256()
+    digest.update(_canonical_json({
+        'stage': name,
+        'version': stage['version'],
+        'params': {p: params[p] for p in stage['params']},
+        'sources': {p: file_fingerprint(params[p])[0] for p in stage.get('sources', ())},
+        'inputs': {i: input_hashes[i] for i in stage['inputs']}
+    }).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def _artifact_hash(payload):
+    return hashlib.sha256(payload).hexdigest()
+
+
+def _cache_file(name, key, cache_dir):
+    return os.path.join(cache_dir, f"{name}-{key[:24]}.pkl")
+
+
+def _load_artifact(name, key, cache_dir):
+    cache_file = _cache_file(name, key, cache_dir)
+    if not os.path.exists(cache_file):
+        return None
+    with open(cache_file, 'rb') as f:
+        payload = f.read()
+    artifact = pickle.loads(payload)
+    if STAGES[name].get('writes_files') and not all(os.path.exists(p) for p in artifact.values()):
+        return None
+    return artifact, _artifact_hash(payload)
+
+
+def _store_artifact(name, key, artifact, cache_dir):
+    os.makedirs(cache_dir, exist_ok=True)
+    payload = pickle.dumps(artifact, protocol=pickle.HIGHEST_PROTOCOL)
+    cache_file = _cache_file(name, key, cache_dir)
+    tmp_file = cache_file + '.tmp'
+    with open(tmp_file, 'wb') as f:
+        f.write(payload)
+    os.replace(tmp_file, cache_file)
+    # Keep only the latest artifact per stage
+    for entry in os.listdir(cache_dir):
+        if entry.startswith(f"{name}-") and entry.endswith('.pkl') and os.path.join(cache_dir, entry) != cache_file:
+            os.remove(os.path.join(cache_dir, entry))
+    return _artifact_hash(payload)
+
+
+# --- 3. Runner ---
+def stage_order(targets=None):
+    """Stages needed for `targets` (all stages by default), upstream first."""
+    needed, stack = set(), list(targets or STAGES)
+    while stack:
+        name = stack.pop()
+        if name not in needed:
+            needed.add(name)
+            stack.extend(STAGES[name]['inputs'])
+    return [name for name in STAGES if name in needed]
+
+
+def run_pipeline(params=None, targets=None, cache_dir=PIPELINE_CACHE_DIR, force=()):
+    """Run the stages needed for `targets`, re-using cached artifacts where inputs are unchanged.
+
+    `params` override DEFAULT_PARAMS; `force` lists stages to re-run regardless
+    of the cache. Returns (artifacts by stage, run log DataFrame with
+    Stage / Status ('ran' or 'cached') / Seconds / Key).
+    """
+    params = {**DEFAULT_PARAMS, **(params or {})}
+    artifacts, hashes, log = {}, {}, []
+    for name in stage_order(targets):
+        start = time.perf_counter()
+        with span(f'pipeline.{name}') as stage_attrs:
+            key = stage_key(name, params, hashes)
+            cached = None if name in force else _load_artifact(name, key, cache_dir)
+            if cached is not None:
+                artifacts[name], hashes[name] = cached
+                status = 'cached'
+            else:
+                upstream = {i: artifacts[i] for i in STAGES[name]['inputs']}
+                artifacts[name] = STAGES[name]['run'](upstream, params)
+                hashes[name] = _store_artifact(name, key, artifacts[name], cache_dir)
+                status = 'ran'
+            stage_attrs['status'] = status
+        log.append({'Stage': name, 'Status': status, 'Seconds': round(time.perf_counter() - start, 4), 'Key': key[:12]})
+    return artifacts, pd.DataFrame(log)
+
+
+def main():
+    print("--- Pipeline Run ---")
+    artifacts, log = run_pipeline()
+    print(log.to_string())
+    print(f"Total Expected Profit: {artifacts['lp_plan']['objective']:.2f} Yuan")
+
+    print("\n--- Re-run with Unchanged Inputs ---")
+    print(run_pipeline()[1].to_string())
+
+    print("\n--- Re-run after a Price Change (蒜 at 10.0 Yuan/kg) ---")
+    artifacts, log = run_pipeline({'price_overrides': {'蒜': 10.0}})
+    print(log.to_string())
+    print(f"Total Expected Profit: {artifacts['lp_plan']['objective']:.2f} Yuan")
+
+
+if __name__ == '__main__':
+    main()
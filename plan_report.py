@@ -0,0 +1,103 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+from fertility_scoring import round_half_even
+from tracing import traced
+
+# Post-processing of a solved planting LP without per-row DataFrame lookups.
+# The solution vector is read once, its nonzero positions are mapped through
+# the model's var_farm / var_crop index arrays to names, grades and profit
+# per m², and the per-farm totals and N-fixer areas are bincount sums over
+# farm codes. Output columns, order and rounding match lp_optimizer.py's
+# planting plan and per-farm summary: allocated areas were rounded with
+# Python's round() on floats, every NumPy-valued column with np.round.
+
+PLAN_COLUMNS = ['Farm_Name', 'Fertility_Grade', 'Crop_Name', 'Area_m2_Allocated', 'Expected_Profit_from_Crop']
+SUMMARY_COLUMNS = ['Farm_Name', 'Fertility_Grade', 'Total_Area_Planted_m2', 'Farm_Capacity_m2', 'N_Fixer_Area_m2',
+                   'N_Fixer_Percentage']
+
+
+@traced('report.plan_tables')
+def plan_tables(model, solution):
+    """(planting plan, per-farm summary) DataFrames for a build_lp_arrays() model and its solution vector.
+
+    Farms in the model without any allocation keep a summary row with only
+    Farm_Name set; if nothing is planted at all, every farm is listed with
+    zero areas and its capacity.
+    """
+    solution = np.asarray(solution, dtype=np.float64)
+    farm_names, farm_grades = model['farm_names'], model['farm_grades']
+    n_farms = len(farm_names)
+    capacity = model['farm_areas']
+    if np.array_equal(capacity, np.round(capacity)): # Whole-m² registers print as integers
+        capacity = capacity.astype(np.int64)
+
+    planted = np.flatnonzero(solution > 0)
+    farms, crops = model['var_farm'][planted], model['var_crop'][planted]
+    areas = round_half_even(solution[planted], 2)
+    planting_plan_df = pd.DataFrame({
+        'Farm_Name': farm_names[farms],
+        'Fertility_Grade': farm_grades[farms],
+        'Crop_Name': model['crop_names'][crops],
+        'Area_m2_Allocated': areas,
+        'Expected_Profit_from_Crop': np.round(solution[planted] * model['crop_profit'][crops], 2)
+    }, columns=PLAN_COLUMNS)
+
+    if not len(planted):
+        farm_summary_df = pd.DataFrame({
+            'Farm_Name': farm_names, 'Fertility_Grade': farm_grades, 'Total_Area_Planted_m2': 0,
+            'Farm_Capacity_m2': capacity, 'N_Fixer_Area_m2': 0, 'N_Fixer_Percentage': 0
+        }, columns=SUMMARY_COLUMNS)
+        return planting_plan_df, farm_summary_df
+
+    total = np.bincount(farms, weights=areas, minlength=n_farms)
+    fixer_area = np.bincount(farms, weights=areas * model['is_fixer'][crops], minlength=n_farms)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        percentage = np.where(total > 0, fixer_area / total * 100, 0.0)
+    has_plan = np.bincount(farms, minlength=n_farms) > 0
+    farm_summary_df = pd.DataFrame({
+        'Farm_Name': farm_names[has_plan],
+        'Fertility_Grade': farm_grades[has_plan],
+        'Total_Area_Planted_m2': np.round(total[has_plan], 2),
+        'Farm_Capacity_m2': capacity[has_plan],
+        'N_Fixer_Area_m2': np.round(fixer_area[has_plan], 2),
+        'N_Fixer_Percentage': np.round(percentage[has_plan], 2)
+    }, columns=SUMMARY_COLUMNS)
+    # Unplanted farms as all-NaN rows, in model (farm register) order
+    farm_summary_df = farm_summary_df.set_index('Farm_Name').reindex(farm_names.tolist()).reset_index()
+    return planting_plan_df, farm_summary_df
+
+
+# --- Benchmark ---
+def benchmark_plan_tables(plot_counts=(10_000, 100_000, 300_000), crops_per_plot=3, seed=0):
+    """Seconds to build the plan and summary from a solution with `crops_per_plot` nonzeros per plot."""
+    import lp_optimizer
+    from lp_model_builder import build_lp_arrays
+    from synthetic_data import make_farm_areas, make_fertility_grades
+
+    rng = np.random.default_rng(seed)
+    rows = []
+    for n in plot_counts:
+        farm_areas_df = make_farm_areas(n, seed=seed)
+        grades = make_fertility_grades(farm_areas_df['Farm_Name'], seed=seed)
+        model = build_lp_arrays(farm_areas_df, lp_optimizer.crop_df, grades, lp_optimizer.recommendations,
+                                lp_optimizer.nitrogen_fixers)
+        # Any allocation pattern will do for timing: a few random crops per plot
+        solution = np.zeros(len(model['c']))
+        planted = rng.random(len(solution)) < crops_per_plot / 7
+        solution[planted] = rng.uniform(1, 200, int(planted.sum()))
+        start = time.perf_counter()
+        planting_plan_df, farm_summary_df = plan_tables(model, solution)
+        rows.append({'Plots': n, 'Allocations': len(planting_plan_df), 'Seconds': round(time.perf_counter() - start, 4)})
+    return pd.DataFrame(rows)
+
+
+def main():
+    print("--- Planting Plan Post-processing ---")
+    print(benchmark_plan_tables().to_string())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,293 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from lp_model_builder import DEFAULT_FIXER_RATIOS, build_lp_arrays, crop_profit_per_m2
+from plan_report import plan_tables
+from separable_solver import solve_planning_model
+from solver_backends import solve_model
+from tracing import span
+
+# Planning many independent campuses / partner sites in one call.
+# Instances come as stacked tables keyed by Instance_ID: farms (Farm_Name,
+# Area_m2, Fertility_Grade) and optional per-instance selling prices
+# (Crop_Name, price). Recommendations, N-fixers and fixer ratios are shared.
+#   mode='block' - every farm of every instance goes into one model (farm
+#                  names prefixed by the instance); farms never share a row,
+#                  so the matrix is block diagonal and one solve plans the
+#                  portfolio (closed-form 'separable' by default, or an LP
+#                  backend on the whole block). Build / solve seconds are
+#                  shared out by each instance's variable count.
+#   mode='pool'  - one model per instance, built and solved in a process
+#                  pool; seconds are measured per instance.
+# Either way the result is {instance_id: {'status', 'objective',
+# 'planting_plan', 'farm_summary'}} plus a per-instance timing table.
+
+PRICE_COLUMN = 'Avg_Selling_Price_Yuan_per_kg'
+FARM_COLUMNS = ['Instance_ID', 'Farm_Name', 'Area_m2', 'Fertility_Grade']
+
+
+def stack_instances(instances):
+    """Stacked farm table from {instance_id: (farm_area_data_dict, farm_fertility_grades)}."""
+    frames = [pd.DataFrame({'Instance_ID': instance_id, 'Farm_Name': list(areas),
+                            'Area_m2': list(areas.values()),
+                            'Fertility_Grade': [grades.get(f) for f in areas]})
+              for instance_id, (areas, grades) in instances.items()]
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=FARM_COLUMNS)
+
+
+def stack_prices(prices, price_column=PRICE_COLUMN):
+    """Stacked price table from {instance_id: {crop name: Yuan/kg}}."""
+    rows = [(instance_id, crop, price) for instance_id, crop_prices in prices.items()
+            for crop, price in crop_prices.items()]
+    return pd.DataFrame(rows, columns=['Instance_ID', 'Crop_Name', price_column])
+
+
+def instance_crop_tables(crop_df, instance_ids, prices_df=None, price_column=PRICE_COLUMN):
+    """{instance_id: crop_df with that instance's prices (and Profit_per_m2)}; unlisted crops keep crop_df's price."""
+    tables = {}
+    overrides = {} if prices_df is None else {k: g for k, g in prices_df.groupby('Instance_ID', sort=False)}
+    unknown = set(overrides) - set(instance_ids)
+    if unknown:
+        raise KeyError(f"Prices for unknown instances: {sorted(unknown, key=str)}")
+    for instance_id in instance_ids:
+        table = crop_df.reset_index(drop=True).copy()
+        if instance_id in overrides:
+            prices = overrides[instance_id].set_index('Crop_Name')[price_column]
+            missing = set(prices.index) - set(table['Crop_Name'])
+            if missing:
+                raise KeyError(f"Unknown crops in prices for {instance_id!r}: {sorted(missing)}")
+            listed = table['Crop_Name'].isin(prices.index)
+            table.loc[listed, price_column] = prices.reindex(table.loc[listed, 'Crop_Name']).to_numpy()
+        table['Profit_per_m2'] = crop_profit_per_m2(table, price_column)
+        tables[instance_id] = table
+    return tables
+
+
+# --- 1. Block-Diagonal Model ---
+def build_portfolio_model(farms_df, crop_tables, recommendations, nitrogen_fixers,
+                          fixer_ratios=DEFAULT_FIXER_RATIOS):
+    """One build_lp_arrays() model over every instance's farms, with per-instance profits in c.
+
+    Farm names are '<instance position>|<Farm_Name>'; extra keys
+    'instance_ids', 'farm_instance' (instance position per farm) and
+    'var_instance'. Farms without a Fertility_Grade are left out, as in
+    lp_optimizer.py.
+    """
+    farms = farms_df[farms_df['Fertility_Grade'].notna()].reset_index(drop=True)
+    instance_ids = list(crop_tables)
+    position = {instance_id: k for k, instance_id in enumerate(instance_ids)}
+    farm_instance = farms['Instance_ID'].map(position)
+    if farm_instance.isna().any():
+        raise KeyError("Farms of instances without a crop table")
+    farm_instance = farm_instance.to_numpy(dtype=np.intp)
+    keys = [f"{k}|{f}" for k, f in zip(farm_instance.tolist(), farms['Farm_Name'].tolist())]
+    if len(set(keys)) != len(keys):
+        raise ValueError("Duplicate Farm_Name within an instance")
+    crop_df = crop_tables[instance_ids[0]]
+    model = build_lp_arrays(pd.DataFrame({'Farm_Name': keys, 'Area_m2': farms['Area_m2'].to_numpy()}), crop_df,
+                            dict(zip(keys, farms['Fertility_Grade'])), recommendations, nitrogen_fixers,
+                            fixer_ratios)
+    profit = np.array([crop_tables[i]['Profit_per_m2'].to_numpy(dtype=np.float64) for i in instance_ids])
+    var_instance = farm_instance[model['var_farm']]
+    model['c'] = profit[var_instance, model['var_crop']]
+    model.update(instance_ids=instance_ids, farm_instance=farm_instance, var_instance=var_instance,
+                 instance_farm_names=farms['Farm_Name'].to_numpy(dtype=object))
+    return model
+
+
+def _solve(model, backend):
+    if backend == 'separable':
+        return solve_planning_model(model, fallback='highs')
+    return solve_model(model, backend)
+
+
+def _split_tables(model, x):
+    """Stacked plan / summary tables of a portfolio solution, split into {instance_id: (plan, summary)}."""
+    planting_plan_df, farm_summary_df = plan_tables(model, x)
+    # plan_tables prices allocations with the shared crop_profit; use each instance's own
+    planted = np.flatnonzero(np.asarray(x) > 0)
+    planting_plan_df['Expected_Profit_from_Crop'] = np.round(x[planted] * model['c'][planted], 2)
+    farm_position = model['farm_index']
+    tables = {}
+    for df in (planting_plan_df, farm_summary_df):
+        farm = df['Farm_Name'].map(farm_position).to_numpy(dtype=np.intp)
+        df['Farm_Name'] = model['instance_farm_names'][farm]
+        df.insert(0, 'Instance_ID', np.asarray(model['instance_ids'], dtype=object)[model['farm_instance'][farm]])
+    plans = dict(tuple(planting_plan_df.groupby('Instance_ID', sort=False)))
+    summaries = dict(tuple(farm_summary_df.groupby('Instance_ID', sort=False)))
+    for instance_id in model['instance_ids']:
+        tables[instance_id] = (plans.get(instance_id, planting_plan_df.iloc[:0]).drop(columns='Instance_ID')
+                               .reset_index(drop=True),
+                               summaries.get(instance_id, farm_summary_df.iloc[:0]).drop(columns='Instance_ID')
+                               .reset_index(drop=True))
+    return tables
+
+
+def _plan_block(farms_df, crop_tables, recommendations, nitrogen_fixers, fixer_ratios, backend):
+    start = time.perf_counter()
+    model = build_portfolio_model(farms_df, crop_tables, recommendations, nitrogen_fixers, fixer_ratios)
+    build_seconds = time.perf_counter() - start
+    result = _solve(model, backend)
+    start = time.perf_counter()
+    tables = _split_tables(model, result['x'])
+    report_seconds = time.perf_counter() - start
+
+    n_instances = len(model['instance_ids'])
+    variables = np.bincount(model['var_instance'], minlength=n_instances)
+    objective = np.bincount(model['var_instance'], weights=model['c'] * result['x'], minlength=n_instances)
+    share = variables / max(1, variables.sum())
+    plans, timing = {}, []
+    for k, instance_id in enumerate(model['instance_ids']):
+        plans[instance_id] = {'status': result['status'],
+                              'objective': float(objective[k]) if result['status'] == 'Optimal' else None,
+                              'planting_plan': tables[instance_id][0], 'farm_summary': tables[instance_id][1]}
+        timing.append({'Instance_ID': instance_id, 'Farms': int((model['farm_instance'] == k).sum()),
+                       'Variables': int(variables[k]), 'Status': result['status'],
+                       'Total_Profit': plans[instance_id]['objective'], 'Build_s': build_seconds * share[k],
+                       'Solve_s': result['seconds'] * share[k], 'Report_s': report_seconds * share[k],
+                       'Timing': 'shared'})
+    return plans, timing
+
+
+# --- 2. Worker Pool ---
+def _plan_instance(instance_id, farms, crop_df, recommendations, nitrogen_fixers, fixer_ratios, backend):
+    """Build, solve and report one instance (runs in a worker process)."""
+    start = time.perf_counter()
+    farms = farms[farms['Fertility_Grade'].notna()]
+    model = build_lp_arrays(farms[['Farm_Name', 'Area_m2']], crop_df,
+                            dict(zip(farms['Farm_Name'], farms['Fertility_Grade'])), recommendations,
+                            nitrogen_fixers, fixer_ratios)
+    build_seconds = time.perf_counter() - start
+    result = _solve(model, backend)
+    start = time.perf_counter()
+    planting_plan_df, farm_summary_df = plan_tables(model, result['x'])
+    plan = {'status': result['status'], 'objective': result['objective'], 'planting_plan': planting_plan_df,
+            'farm_summary': farm_summary_df}
+    timing = {'Instance_ID': instance_id, 'Farms': len(model['farm_names']), 'Variables': len(model['c']),
+              'Status': result['status'], 'Total_Profit': result['objective'], 'Build_s': build_seconds,
+              'Solve_s': result['seconds'], 'Report_s': time.perf_counter() - start, 'Timing': 'measured'}
+    return instance_id, plan, timing
+
+
+def _plan_pool(farms_df, crop_tables, recommendations, nitrogen_fixers, fixer_ratios, backend, processes):
+    groups = dict(tuple(farms_df.groupby('Instance_ID', sort=False)))
+    empty = farms_df.iloc[:0]
+    with ProcessPoolExecutor(max_workers=processes or os.cpu_count() or 1) as pool:
+        futures = [pool.submit(_plan_instance, instance_id, groups.get(instance_id, empty), crop_df,
+                               recommendations, nitrogen_fixers, fixer_ratios, backend)
+                   for instance_id, crop_df in crop_tables.items()]
+        outputs = [future.result() for future in futures]
+    return {instance_id: plan for instance_id, plan, _ in outputs}, [timing for _, _, timing in outputs]
+
+
+# --- 3. Portfolio API ---
+def plan_portfolio(farms_df, crop_df, recommendations, nitrogen_fixers, prices_df=None,
+                   fixer_ratios=DEFAULT_FIXER_RATIOS, mode='block', backend='separable', processes=None,
+                   price_column=PRICE_COLUMN):
+    """Plan every instance in `farms_df` (stacked, keyed by Instance_ID) in one call.
+
+    `prices_df` (Instance_ID, Crop_Name, price_column) overrides crop_df's
+    selling prices per instance. `backend` is 'separable' (closed form,
+    falling back to HiGHS), 'highs' or 'cbc'. Returns (plans, timing):
+    plans maps instance_id -> {'status', 'objective', 'planting_plan',
+    'farm_summary'}; timing is a per-instance DataFrame (Farms, Variables,
+    Status, Total_Profit, Build_s, Solve_s, Report_s, Timing) with a 'Wall_s'
+    attribute for the whole call.
+    """
+    if mode not in ('block', 'pool'):
+        raise ValueError(f"Unknown portfolio mode: {mode!r} (use 'block' or 'pool')")
+    start = time.perf_counter()
+    instance_ids = list(pd.unique(farms_df['Instance_ID']))
+    with span('portfolio.plan', instances=len(instance_ids), mode=mode, backend=backend):
+        crop_tables = instance_crop_tables(crop_df, instance_ids, prices_df, price_column)
+        if mode == 'block':
+            plans, timing = _plan_block(farms_df, crop_tables, recommendations, nitrogen_fixers, fixer_ratios,
+                                        backend)
+        else:
+            plans, timing = _plan_pool(farms_df, crop_tables, recommendations, nitrogen_fixers, fixer_ratios,
+                                       backend, processes)
+    timing = pd.DataFrame(timing)
+    timing.attrs['Wall_s'] = time.perf_counter() - start
+    return plans, timing
+
+
+# --- 4. Benchmark ---
+def make_portfolio(n_instances, plots_per_instance, crop_df, seed=0, price_spread=True):
+    """Synthetic portfolio: stacked farms and per-instance prices drawn between each crop's Min and Max."""
+    from synthetic_data import make_farm_areas, make_fertility_grades
+
+    rng = np.random.default_rng(seed)
+    frames, prices = [], {}
+    for k in range(n_instances):
+        instance_id = f"site_{k}"
+        areas = make_farm_areas(plots_per_instance, seed=seed + k)
+        grades = make_fertility_grades(areas['Farm_Name'], seed=seed + k)
+        frames.append(areas.assign(Instance_ID=instance_id, Fertility_Grade=areas['Farm_Name'].map(grades)))
+        if price_spread:
+            low = crop_df['Min_Selling_Price_Yuan_per_kg'].to_numpy(dtype=np.float64)
+            high = crop_df['Max_Selling_Price_Yuan_per_kg'].to_numpy(dtype=np.float64)
+            prices[instance_id] = dict(zip(crop_df['Crop_Name'], low + (high - low) * rng.random(len(low))))
+    farms_df = pd.concat(frames, ignore_index=True)[FARM_COLUMNS]
+    return farms_df, stack_prices(prices) if price_spread else None
+
+
+def benchmark_portfolio(instance_counts=(10, 50, 200), plots_per_instance=200, sequential_limit=50, seed=0):
+    """Wall seconds to plan a portfolio: one CropPlanner run per instance vs. block and pool modes."""
+    import lp_optimizer
+
+    rows = []
+    for n in instance_counts:
+        farms_df, prices_df = make_portfolio(n, plots_per_instance, lp_optimizer.crop_df, seed=seed)
+        reference = None
+        if n <= sequential_limit:
+            # Today's workflow: a separate planner (PuLP/CBC) per instance
+            start = time.perf_counter()
+            tables = instance_crop_tables(lp_optimizer.crop_df, list(pd.unique(farms_df['Instance_ID'])), prices_df)
+            reference = {}
+            for instance_id, farms in farms_df.groupby('Instance_ID', sort=False):
+                planner = lp_optimizer.CropPlanner(farms[['Farm_Name', 'Area_m2']], tables[instance_id],
+                                                   dict(zip(farms['Farm_Name'], farms['Fertility_Grade'])),
+                                                   lp_optimizer.recommendations, lp_optimizer.nitrogen_fixers)
+                planner.solve()
+                lp_optimizer.build_planting_report(planner)
+                reference[instance_id] = planner.objective_value
+            rows.append({'Instances': n, 'Plots': len(farms_df), 'Method': 'CropPlanner per instance (cbc)',
+                         'Wall_s': round(time.perf_counter() - start, 3), 'Matches_Reference': True})
+        for mode, backend in (('block', 'separable'), ('block', 'highs'), ('pool', 'separable')):
+            plans, timing = plan_portfolio(farms_df, lp_optimizer.crop_df, lp_optimizer.recommendations,
+                                           lp_optimizer.nitrogen_fixers, prices_df, mode=mode, backend=backend)
+            match = None
+            if reference is not None:
+                match = all(np.isclose(plans[i]['objective'], reference[i], rtol=1e-7) for i in reference)
+            rows.append({'Instances': n, 'Plots': len(farms_df), 'Method': f'{mode} ({backend})',
+                         'Wall_s': round(timing.attrs['Wall_s'], 3), 'Matches_Reference': match})
+    return pd.DataFrame(rows)
+
+
+def main():
+    import lp_optimizer
+
+    # The campus plus synthetic partner sites with their own prices
+    farms_df, prices_df = make_portfolio(5, 50, lp_optimizer.crop_df, seed=1)
+    campus = stack_instances({'campus': (dict(zip(lp_optimizer.farm_areas_df['Farm_Name'],
+                                                  lp_optimizer.farm_areas_df['Area_m2'])),
+                                         lp_optimizer.farm_fertility_grades)})
+    farms_df = pd.concat([campus, farms_df], ignore_index=True)
+    plans, timing = plan_portfolio(farms_df, lp_optimizer.crop_df, lp_optimizer.recommendations,
+                                   lp_optimizer.nitrogen_fixers, prices_df)
+    pd.set_option('display.width', 200)
+    print(f"--- Portfolio Plan ({len(plans)} instances, {timing.attrs['Wall_s']:.3f} s) ---")
+    print(timing.round(5).to_string())
+    print(f"\nCampus: {plans['campus']['objective']:.2f} Yuan")
+    print(plans['campus']['farm_summary'].to_string())
+
+    print("\n--- Portfolio Planning Time ---")
+    print(benchmark_portfolio().to_string())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,156 @@
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+import lp_optimizer
+from lp_optimizer import CropPlanner
+
+# Price-uncertainty sweep for the crop planting LP.
+# Scenarios draw each crop's selling price between Min_Selling_Price_Yuan_per_kg
+# and Max_Selling_Price_Yuan_per_kg. Each worker process builds one CropPlanner
+# and re-solves it per scenario; results are streamed to a JSON-lines store.
+
+PRICE_COLUMN = 'Avg_Selling_Price_Yuan_per_kg'
+MIN_PRICE_COLUMN = 'Min_Selling_Price_Yuan_per_kg'
+MAX_PRICE_COLUMN = 'Max_Selling_Price_Yuan_per_kg'
+
+
+# --- 1. Scenario Generation ---
+def sample_price_scenarios(crop_df, n_scenarios, seed=None):
+    """Uniformly sampled prices between each crop's Min and Max price (scenarios × crops)."""
+    rng = np.random.default_rng(seed)
+    low = crop_df[MIN_PRICE_COLUMN].to_numpy(dtype=np.float64)
+    high = crop_df[MAX_PRICE_COLUMN].to_numpy(dtype=np.float64)
+    prices = low + (high - low) * rng.random((n_scenarios, len(low)))
+    return pd.DataFrame(prices, columns=crop_df['Crop_Name'].tolist())
+
+
+def grid_price_scenarios(crop_df, points_per_crop=3, crops=None):
+    """Full factorial grid of prices between Min and Max for the chosen crops.
+
+    Crops not in `crops` stay at their average price. The grid has
+    points_per_crop ** len(crops) rows, so pick the crops that matter.
+    """
+    crops = list(crop_df['Crop_Name']) if crops is None else list(crops)
+    by_name = crop_df.set_index('Crop_Name')
+    axes = [np.linspace(by_name.at[c, MIN_PRICE_COLUMN], by_name.at[c, MAX_PRICE_COLUMN], points_per_crop)
+            for c in crops]
+    grid = np.stack([a.ravel() for a in np.meshgrid(*axes, indexing='ij')], axis=1)
+    prices = np.tile(crop_df[PRICE_COLUMN].to_numpy(dtype=np.float64), (len(grid), 1))
+    crop_pos = crop_df['Crop_Name'].tolist()
+    prices[:, [crop_pos.index(c) for c in crops]] = grid
+    return pd.DataFrame(prices, columns=crop_pos)
+
+
+# --- 2. Worker Processes ---
+_WORKER_PLANNER = None
+
+
+def _init_worker(planner_args):
+    global _WORKER_PLANNER
+    _WORKER_PLANNER = CropPlanner(*planner_args)
+
+
+def _solve_chunk(scenario_ids, crop_names, price_rows):
+    planner = _WORKER_PLANNER
+    farm_names, crop_labels = planner.model['farm_names'], planner.model['crop_names']
+    records = []
+    for scenario_id, prices in zip(scenario_ids, price_rows):
+        start = time.perf_counter()
+        planner.update_prices(dict(zip(crop_names, prices)))
+        status = planner.solve()
+        x = planner.solution
+        nonzero = np.flatnonzero(x > 0)
+        records.append({
+            'scenario_id': int(scenario_id),
+            'status': status,
+            'total_profit': planner.objective_value,
+            'prices': dict(zip(crop_names, map(float, prices))),
+            'plan': [[farm_names[planner.model['var_farm'][k]], crop_labels[planner.model['var_crop'][k]], float(x[k])]
+                     for k in nonzero.tolist()],
+            'solve_seconds': time.perf_counter() - start
+        })
+    return records
+
+
+# --- 3. Sweep Runner ---
+def run_price_scenarios(scenarios, store_path, planner_args=None, processes=None, chunk_size=25):
+    """Solve every price scenario across a process pool, streaming results to `store_path`.
+
+    `scenarios` is a DataFrame of prices (one column per crop, one row per
+    scenario), e.g. from sample_price_scenarios(). Each finished chunk is
+    appended to the JSON-lines store immediately, so partial sweeps survive
+    interruption. Returns the sweep wall time in seconds.
+    """
+    if planner_args is None:
+        planner_args = (lp_optimizer.farm_areas_df, lp_optimizer.crop_df, lp_optimizer.farm_fertility_grades,
+                        lp_optimizer.recommendations, lp_optimizer.nitrogen_fixers)
+    processes = processes or os.cpu_count() or 1
+    crop_names = scenarios.columns.tolist()
+    values = scenarios.to_numpy(dtype=np.float64)
+    ids = scenarios.index.to_numpy()
+
+    start = time.perf_counter()
+    with open(store_path, 'a', encoding='utf-8') as store, \
+            ProcessPoolExecutor(max_workers=processes, initializer=_init_worker, initargs=(planner_args,)) as pool:
+        futures = [pool.submit(_solve_chunk, ids[i:i + chunk_size], crop_names, values[i:i + chunk_size])
+                   for i in range(0, len(values), chunk_size)]
+        for future in as_completed(futures):
+            for record in future.result():
+                store.write(json.dumps(record, ensure_ascii=False) + '\n')
+            store.flush()
+    return time.perf_counter() - start
+
+
+# --- 4. Reporting ---
+def load_scenario_results(store_path):
+    """Read a JSON-lines result store back into a list of records."""
+    with open(store_path, encoding='utf-8') as store:
+        return [json.loads(line) for line in store if line.strip()]
+
+
+def summarize_scenarios(records):
+    """Profit distribution and per-crop allocation frequency over solved scenarios.
+
+    Returns (profit_stats, crop_frequency_df): profit_stats is a Series of
+    count/mean/std/percentiles of total profit; crop_frequency_df gives, per
+    crop, the share of scenarios in which it is planted and its mean area.
+    """
+    solved = [r for r in records if r['status'] == 'Optimal']
+    profits = pd.Series([r['total_profit'] for r in solved], name='Total_Profit', dtype='float64')
+    profit_stats = profits.describe(percentiles=[0.05, 0.25, 0.5, 0.75, 0.95])
+
+    plan_rows = pd.DataFrame([(r['scenario_id'], crop, area) for r in solved for _, crop, area in r['plan']],
+                             columns=['scenario_id', 'Crop_Name', 'Area_m2'])
+    if plan_rows.empty or not solved:
+        return profit_stats, pd.DataFrame(columns=['Crop_Name', 'Scenario_Frequency', 'Mean_Area_m2'])
+    per_scenario = plan_rows.groupby(['Crop_Name', 'scenario_id'])['Area_m2'].sum()
+    crop_frequency_df = pd.DataFrame({
+        'Scenario_Frequency': per_scenario.groupby(level='Crop_Name').size() / len(solved),
+        'Mean_Area_m2': per_scenario.groupby(level='Crop_Name').sum() / len(solved)
+    }).sort_values('Scenario_Frequency', ascending=False).reset_index()
+    return profit_stats, crop_frequency_df
+
+
+def main(n_scenarios=200, store_path='price_scenarios.jsonl', seed=2024):
+    scenarios = sample_price_scenarios(lp_optimizer.crop_df, n_scenarios, seed=seed)
+    if os.path.exists(store_path):
+        os.remove(store_path)
+    wall = run_price_scenarios(scenarios, store_path)
+    profit_stats, crop_frequency_df = summarize_scenarios(load_scenario_results(store_path))
+
+    print("--- Price Scenario Sweep ---")
+    print(f"Scenarios solved: {int(profit_stats['count'])} in {wall:.2f}s "
+          f"({profit_stats['count'] / wall:.1f} scenarios/s on {os.cpu_count()} cores)")
+    print("\nTotal Profit Distribution (Yuan):")
+    print(profit_stats.round(2).to_string())
+    print("\nCrop Allocation Frequency:")
+    print(crop_frequency_df.round(3).to_string())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+import time
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+# Data-driven crop recommendations. Each crop has a row of soil requirements:
+# the fertility grades it is recommended for plus optional pH range and
+# minimum N/P/K levels. eligibility_mask() evaluates every requirement for
+# all plots × crops in one broadcast step and returns a sparse plot × crop
+# boolean mask; build_lp_arrays(eligibility=...) creates LP variables only
+# for its nonzero pairs.
+
+# Requirement column -> (soil input column, comparison); NaN means "no requirement"
+REQUIREMENT_COLUMNS = {
+    'pH_min': ('pH_value', np.greater_equal),
+    'pH_max': ('pH_value', np.less_equal),
+    'N_min_mg_per_kg': ('N_mg_per_kg', np.greater_equal),
+    'P_min_mg_per_kg': ('P_mg_per_kg', np.greater_equal),
+    'K_min_mg_per_kg': ('K_mg_per_kg', np.greater_equal)
+}
+
+
+def requirements_from_recommendations(recommendations, crop_names):
+    """Requirement table equivalent to a grade -> crop list dict (no soil thresholds)."""
+    crop_names = list(crop_names)
+    grades = {crop: tuple(g for g, crops in recommendations.items() if crop in crops) for crop in crop_names}
+    requirements = pd.DataFrame({'Crop_Name': crop_names, 'Grades': [grades[c] for c in crop_names]})
+    for col in REQUIREMENT_COLUMNS:
+        requirements[col] = np.nan
+    return requirements
+
+
+def eligibility_mask(farm_names, farm_grades, requirements, soil=None):
+    """Plot × crop eligibility as {'farm_names', 'crop_names', 'mask' (CSR bool)}.
+
+    `farm_grades` maps farm -> grade (dict or Series) or is a grade array
+    aligned with `farm_names`. `soil` holds Farm_Name
+    and the soil input columns (pH_value, N_mg_per_kg, P_mg_per_kg,
+    K_mg_per_kg); plots without a sample only pass crops whose thresholds
+    are all unset.
+    """
+    farm_names = np.asarray(farm_names, dtype=object)
+    crop_names = requirements['Crop_Name'].to_numpy(dtype=object)
+
+    # Grade gate: grade × crop table broadcast to plots by grade code
+    if isinstance(farm_grades, (dict, pd.Series)):
+        plot_grades = pd.Series(farm_grades).reindex(farm_names).to_numpy(dtype=object)
+    else:
+        plot_grades = np.asarray(farm_grades, dtype=object)
+    grade_names = pd.Index(sorted({g for gs in requirements['Grades'] for g in gs} |
+                                  {g for g in pd.unique(plot_grades) if isinstance(g, str)}))
+    grade_crop = np.array([[g in gs for gs in requirements['Grades']] for g in grade_names], dtype=bool)
+    # Extra all-False row for ungraded plots
+    grade_crop = np.vstack([grade_crop.reshape(len(grade_names), len(crop_names)), np.zeros((1, len(crop_names)), dtype=bool)])
+    grade_codes = grade_names.get_indexer(plot_grades)
+    grade_codes[grade_codes < 0] = len(grade_names)
+    mask = grade_crop[grade_codes]
+
+    # Soil thresholds: (plots, 1) values against (1, crops) thresholds
+    soil = soil.set_index('Farm_Name').reindex(farm_names) if soil is not None else None
+    for col, (soil_col, compare) in REQUIREMENT_COLUMNS.items():
+        thresholds = requirements[col].to_numpy(dtype=np.float64)
+        constrained = ~np.isnan(thresholds)
+        if not constrained.any():
+            continue
+        values = (soil[soil_col].to_numpy(dtype=np.float64) if soil is not None and soil_col in soil.columns
+                  else np.full(len(farm_names), np.nan))
+        mask[:, constrained] &= compare(values[:, None], thresholds[None, constrained])
+    return {'farm_names': farm_names, 'crop_names': crop_names, 'mask': sp.csr_matrix(mask)}
+
+
+def eligible_crops(eligibility, farm_name):
+    """Crop names a plot may grow."""
+    row = list(eligibility['farm_names']).index(farm_name)
+    return eligibility['crop_names'][eligibility['mask'][row].indices].tolist()
+
+
+# --- Example and Benchmark ---
+def benchmark_eligibility(plot_counts=(10_000, 100_000, 1_000_000), seed=0):
+    """Seconds to build the plot × crop mask from soil samples with pH/N thresholds set."""
+    import lp_optimizer
+    from synthetic_data import make_fertility_grades, make_soil_samples
+
+    requirements = requirements_from_recommendations(lp_optimizer.recommendations, lp_optimizer.crop_df['Crop_Name'])
+    requirements['pH_max'] = 8.0
+    requirements['N_min_mg_per_kg'] = 15.0
+    rows = []
+    for n in plot_counts:
+        samples = make_soil_samples(n, seed=seed)
+        soil = pd.DataFrame({'Farm_Name': samples['学院'], 'pH_value': samples['pH'], 'N_mg_per_kg': samples['氮']})
+        grades = np.array(list(make_fertility_grades(soil['Farm_Name'], seed=seed).values()), dtype=object)
+        start = time.perf_counter()
+        eligibility = eligibility_mask(soil['Farm_Name'], grades, requirements, soil)
+        rows.append({'Plots': n, 'Eligible_Pairs': eligibility['mask'].nnz, 'Seconds': round(time.perf_counter() - start, 3)})
+    return pd.DataFrame(rows)
+
+
+def main():
+    import lp_optimizer
+    from data_ingest import load_soil_table
+    from lp_model_builder import build_lp_arrays
+
+    soil_table = load_soil_table()
+    soil = pd.DataFrame({'Farm_Name': soil_table.index, 'pH_value': soil_table['pH'].to_numpy(),
+                         'N_mg_per_kg': soil_table['氮'].to_numpy(), 'P_mg_per_kg': soil_table['磷'].to_numpy(),
+                         'K_mg_per_kg': soil_table['钾'].to_numpy()})
+    farm_names = lp_optimizer.farm_areas_df['Farm_Name']
+    requirements = requirements_from_recommendations(lp_optimizer.recommendations, lp_optimizer.crop_df['Crop_Name'])
+    # Example thresholds: 蒜 only on plots with at least 20 mg/kg N, 西蓝花 with pH ≤ 8.0
+    requirements.loc[requirements['Crop_Name'] == '蒜', 'N_min_mg_per_kg'] = 20.0
+    requirements.loc[requirements['Crop_Name'] == '西蓝花', 'pH_max'] = 8.0
+    eligibility = eligibility_mask(farm_names, lp_optimizer.farm_fertility_grades, requirements, soil)
+    model = build_lp_arrays(lp_optimizer.farm_areas_df, lp_optimizer.crop_df, lp_optimizer.farm_fertility_grades,
+                            lp_optimizer.recommendations, lp_optimizer.nitrogen_fixers, eligibility=eligibility)
+    print("--- Eligible Crops per Plot (grade lists + example soil thresholds) ---")
+    for farm_name in farm_names:
+        print(f"{farm_name}: {', '.join(eligible_crops(eligibility, farm_name))}")
+    print(f"LP variables materialized: {len(model['c'])} of {len(farm_names) * len(requirements)} plot × crop pairs")
+
+    print("\n--- Eligibility Mask Build Time ---")
+    print(benchmark_eligibility().to_string())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,155 @@
+import time
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from pulp import PULP_CBC_CMD, LpStatus, value
+
+import lp_optimizer
+from lp_model_builder import DEFAULT_FIXER_RATIOS, build_lp_arrays, pulp_problem_from_arrays, lp_var_name
+from lp_optimizer import CropPlanner
+from price_scenarios import sample_price_scenarios
+
+# Scenario-robust crop planting: one extensive-form LP over a batch of price
+# scenarios instead of one LP per scenario. The first-stage decision is the
+# farm × crop allocation x shared by all scenarios; scenario s earns
+# C_s·x with C_s[k] = yield × price_s − cost of variable k's crop.
+#
+#   expected:   max (1/S) Σ_s C_s·x
+#   worst_case: max t            s.t. t ≤ C_s·x for every s
+#   cvar:       max t − 1/(αS) Σ_s u_s   s.t. u_s ≥ t − C_s·x, u_s ≥ 0
+#               (CVaR of the α lowest-profit tail of scenarios)
+
+OBJECTIVES = ('expected', 'worst_case', 'cvar')
+
+
+def scenario_profit_matrix(model, crop_df, scenarios):
+    """(scenarios × variables) profit per m² for every LP variable under every price scenario."""
+    prices = scenarios[crop_df['Crop_Name'].tolist()].to_numpy(dtype=np.float64)
+    crop_profit = prices * crop_df['Yield_kg_per_m2'].to_numpy(dtype=np.float64) - crop_df['Cost_Yuan_per_m2'].to_numpy(dtype=np.float64)
+    return crop_profit[:, model['var_crop']]
+
+
+def build_robust_arrays(model, scenario_profits, objective='expected', alpha=0.1):
+    """Extend the base array model with scenario rows for the chosen objective.
+
+    Returns (c, A_ub, b_ub, var_names, row_names, lower_bounds) over the
+    variables [x, t, u_1..u_S] (t and u only where the objective needs them).
+    """
+    if objective not in OBJECTIVES:
+        raise ValueError(f"Unknown objective '{objective}', expected one of {OBJECTIVES}")
+    n_scenarios, n_vars = scenario_profits.shape
+    var_names = [lp_var_name(model['farm_names'][f], model['crop_names'][j])
+                 for f, j in zip(model['var_farm'].tolist(), model['var_crop'].tolist())]
+    if objective == 'expected':
+        return (scenario_profits.mean(axis=0), model['A_ub'], model['b_ub'], var_names,
+                list(model['row_names']), [0] * n_vars)
+
+    # Scenario rows: t − C_s·x (− u_s) ≤ 0
+    n_u = n_scenarios if objective == 'cvar' else 0
+    base = sp.hstack([model['A_ub'], sp.csr_matrix((model['A_ub'].shape[0], 1 + n_u))], format='csr')
+    scenario_rows = [sp.csr_matrix(-scenario_profits), sp.csr_matrix(np.ones((n_scenarios, 1)))]
+    if n_u:
+        scenario_rows.append(-sp.identity(n_scenarios, format='csr'))
+    A_ub = sp.vstack([base, sp.hstack(scenario_rows, format='csr')], format='csr')
+    b_ub = np.concatenate([model['b_ub'], np.zeros(n_scenarios)])
+
+    c = np.zeros(n_vars + 1 + n_u)
+    c[n_vars] = 1.0
+    if n_u:
+        c[n_vars + 1:] = -1.0 / (alpha * n_scenarios)
+    var_names = var_names + ['Profit_Threshold'] + [f'Shortfall_{s}' for s in range(n_u)]
+    row_names = list(model['row_names']) + [f'Scenario_{s}' for s in range(n_scenarios)]
+    lower_bounds = [0] * n_vars + [None] + [0] * n_u
+    return c, A_ub, b_ub, var_names, row_names, lower_bounds
+
+
+def solve_robust_plan(scenarios, objective='expected', alpha=0.1, farm_areas_df=None, crop_df=None,
+                      farm_fertility_grades=None, recommendations=None, nitrogen_fixers=None,
+                      fixer_ratios=DEFAULT_FIXER_RATIOS, solver=None):
+    """Solve one extensive-form LP over all price scenarios.
+
+    Inputs default to the lp_optimizer.py instance. Returns a dict with the
+    status, the planting plan DataFrame, the per-scenario profits of that one
+    allocation, their mean / worst case / CVaR, and build and solve timings.
+    """
+    farm_areas_df = lp_optimizer.farm_areas_df if farm_areas_df is None else farm_areas_df
+    crop_df = lp_optimizer.crop_df if crop_df is None else crop_df
+    farm_fertility_grades = lp_optimizer.farm_fertility_grades if farm_fertility_grades is None else farm_fertility_grades
+    recommendations = lp_optimizer.recommendations if recommendations is None else recommendations
+    nitrogen_fixers = lp_optimizer.nitrogen_fixers if nitrogen_fixers is None else nitrogen_fixers
+
+    build_start = time.perf_counter()
+    model = build_lp_arrays(farm_areas_df, crop_df, farm_fertility_grades, recommendations, nitrogen_fixers, fixer_ratios)
+    scenario_profits = scenario_profit_matrix(model, crop_df, scenarios)
+    c, A_ub, b_ub, var_names, row_names, lower_bounds = build_robust_arrays(model, scenario_profits, objective, alpha)
+    prob, variables = pulp_problem_from_arrays(c, A_ub, b_ub, var_names, row_names, lower_bounds,
+                                               name=f"Robust_Crop_Planting_{objective}")
+    build_seconds = time.perf_counter() - build_start
+
+    solve_start = time.perf_counter()
+    prob.solve(solver or PULP_CBC_CMD(msg=False))
+    solve_seconds = time.perf_counter() - solve_start
+
+    n_vars = len(model['var_farm'])
+    x = np.array([v.varValue or 0.0 for v in variables[:n_vars]])
+    profits = scenario_profits @ x
+    nonzero = np.flatnonzero(x > 0)
+    plan_df = pd.DataFrame({
+        'Farm_Name': model['farm_names'][model['var_farm'][nonzero]],
+        'Fertility_Grade': model['farm_grades'][model['var_farm'][nonzero]],
+        'Crop_Name': model['crop_names'][model['var_crop'][nonzero]],
+        'Area_m2_Allocated': np.round(x[nonzero], 2)
+    })
+    tail = np.sort(profits)[:max(1, int(np.ceil(alpha * len(profits))))]
+    return {
+        'status': LpStatus[prob.status],
+        'objective': objective,
+        'objective_value': value(prob.objective),
+        'plan': plan_df,
+        'scenario_profits': profits,
+        'expected_profit': profits.mean(),
+        'worst_case_profit': profits.min(),
+        'cvar_profit': tail.mean(),
+        'n_scenarios': len(profits),
+        'build_seconds': build_seconds,
+        'solve_seconds': solve_seconds
+    }
+
+
+def time_per_scenario_solves(scenarios, planner_args=None):
+    """Wall time of solving each scenario separately with one reused CropPlanner."""
+    if planner_args is None:
+        planner_args = (lp_optimizer.farm_areas_df, lp_optimizer.crop_df, lp_optimizer.farm_fertility_grades,
+                        lp_optimizer.recommendations, lp_optimizer.nitrogen_fixers)
+    start = time.perf_counter()
+    planner = CropPlanner(*planner_args)
+    crop_names = scenarios.columns.tolist()
+    for prices in scenarios.to_numpy(dtype=np.float64):
+        planner.update_prices(dict(zip(crop_names, prices)))
+        planner.solve()
+    return time.perf_counter() - start
+
+
+def main(n_scenarios=200, seed=2024):
+    scenarios = sample_price_scenarios(lp_optimizer.crop_df, n_scenarios, seed=seed)
+    print(f"--- Robust Planting over {n_scenarios} Price Scenarios ---")
+    rows = []
+    for objective in OBJECTIVES:
+        result = solve_robust_plan(scenarios, objective=objective)
+        rows.append({
+            'Objective': objective,
+            'Status': result['status'],
+            'Expected_Profit': round(result['expected_profit'], 2),
+            'Worst_Case_Profit': round(result['worst_case_profit'], 2),
+            'CVaR_10pct_Profit': round(result['cvar_profit'], 2),
+            'Build_s': round(result['build_seconds'], 3),
+            'Solve_s': round(result['solve_seconds'], 3)
+        })
+    print(pd.DataFrame(rows).to_string())
+    sequential = time_per_scenario_solves(scenarios)
+    print(f"\nOne LP per scenario ({n_scenarios} solves): {sequential:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
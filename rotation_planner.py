@@ -0,0 +1,218 @@
+import re
+import time
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from pulp import PULP_CBC_CMD, LpStatus, value
+
+import lp_optimizer
+from lp_model_builder import DEFAULT_FIXER_RATIOS, crop_profit_per_m2, pulp_problem_from_arrays
+from synthetic_data import make_farm_areas, make_fertility_grades
+
+# Multi-period rotation planning over a one- or multi-year horizon.
+# The year is split into `periods_per_year` equal periods; the first half are
+# spring (春季) periods and the second half autumn (秋季) periods. A crop may be
+# started in a period matching its Planting_Season (双季 crops in any period)
+# and then occupies the plot for ceil(max growth days / period length)
+# periods. Variables x[f, c, t] are the m² of crop c started on farm f in
+# period t, and every constraint block is assembled with index arithmetic:
+#
+#   occupancy: Σ x[f, c, t'] over plantings covering period t  ≤ area_f
+#   N-fixer:   ratio·Σ x[f, ·, t∈year] − Σ x[f, fixer, t∈year] ≤ 0   (per year)
+#   rotation:  x[f, c, t] + x[f, c, t + d_c] ≤ area_f
+#
+# The rotation row only caps the area planted with crop c in back-to-back
+# plantings at the plot area; it does not forbid replanting c on the same
+# m² (half the plot can carry c in t and t + d_c). Crops whose growth cycle
+# has no day range (e.g. "全年") have no duration and are rejected.
+
+DAYS_PER_YEAR = 365
+SEASON_CODES = {'春季': 0, '秋季': 1, '双季': 2}
+_CYCLE_RANGE = re.compile(r'(\d+)\s*[~～-]\s*(\d+)\s*天(/茬)?')
+
+
+# --- 1. Growth Cycle Parsing ---
+def parse_growth_cycle(text):
+    """Numeric (min_days, max_days) bounds from a Growth_Cycle_days string.
+
+    "60~90天" -> (60, 90). Alternative products are merged into one envelope:
+    "叶用30~50天，块根100~180天" -> (30, 180). Re-harvest intervals marked
+    "/茬" are not part of the planting cycle: "首茬60~80天，之后20~30天/茬"
+    -> (60, 80). Returns (nan, nan) when no range is found.
+    """
+    ranges = [(int(lo), int(hi)) for lo, hi, regrowth in _CYCLE_RANGE.findall(str(text)) if not regrowth]
+    if not ranges:
+        return np.nan, np.nan
+    return min(lo for lo, _ in ranges), max(hi for _, hi in ranges)
+
+
+def add_growth_cycle_bounds(crop_df):
+    """Copy of crop_df with Growth_Cycle_Min_days / Growth_Cycle_Max_days columns."""
+    bounds = np.array([parse_growth_cycle(t) for t in crop_df['Growth_Cycle_days']], dtype=np.float64).reshape(-1, 2)
+    crop_df = crop_df.copy()
+    crop_df['Growth_Cycle_Min_days'] = bounds[:, 0]
+    crop_df['Growth_Cycle_Max_days'] = bounds[:, 1]
+    return crop_df
+
+
+# --- 2. Sparse Model Construction ---
+def build_rotation_arrays(farm_areas_df, crop_df, farm_fertility_grades, recommendations, nitrogen_fixers,
+                          periods_per_year=4, years=1, fixer_ratios=DEFAULT_FIXER_RATIOS, rotation=True):
+    """Assemble the multi-period planting LP as arrays (max c·x s.t. A_ub·x ≤ b_ub, x ≥ 0)."""
+    crop_df = add_growth_cycle_bounds(crop_df)
+    no_cycle = crop_df.loc[crop_df['Growth_Cycle_Max_days'].isna(), 'Crop_Name'].tolist()
+    if no_cycle:
+        raise ValueError(f"No growth cycle day range for crop(s): {', '.join(map(str, no_cycle))}")
+    farms = farm_areas_df[farm_areas_df['Farm_Name'].map(farm_fertility_grades).notna()]
+    farm_names = farms['Farm_Name'].to_numpy(dtype=object)
+    farm_areas = farms['Area_m2'].to_numpy(dtype=np.float64)
+    farm_grades = np.array([farm_fertility_grades[f] for f in farm_names], dtype=object)
+    crop_names = crop_df['Crop_Name'].to_numpy(dtype=object)
+    crop_profit = crop_profit_per_m2(crop_df).to_numpy(dtype=np.float64)
+    is_fixer = np.isin(crop_names, list(nitrogen_fixers))
+    n_farms, n_crops = len(farm_names), len(crop_names)
+    n_periods = periods_per_year * years
+    period_days = DAYS_PER_YEAR / periods_per_year
+
+    # Crop × start-period feasibility from season and cycle length
+    duration = np.ceil(crop_df['Growth_Cycle_Max_days'].to_numpy() / period_days).astype(np.int64)
+    crop_season = crop_df['Planting_Season'].map(SEASON_CODES).fillna(SEASON_CODES['双季']).to_numpy(dtype=np.int64)
+    period = np.arange(n_periods)
+    period_season = ((period % periods_per_year) >= periods_per_year // 2).astype(np.int64)
+    start_ok = (((crop_season[:, None] == SEASON_CODES['双季']) | (crop_season[:, None] == period_season[None, :]))
+                & (period[None, :] + duration[:, None] <= n_periods))
+
+    # Farm × crop eligibility from the grade recommendations
+    grade_names = sorted(set(farm_grades) | set(recommendations))
+    grade_crop_mask = np.array([np.isin(crop_names, list(recommendations.get(g, []))) for g in grade_names],
+                               dtype=bool).reshape(len(grade_names), n_crops)
+    eligible = grade_crop_mask[np.searchsorted(grade_names, farm_grades)]
+
+    # Variables in (farm, crop, start) order, so flat keys are sorted
+    var_farm, var_crop, var_start = np.nonzero(eligible[:, :, None] & start_ok[None, :, :])
+    n_vars = len(var_farm)
+    var_duration = duration[var_crop]
+    c = crop_profit[var_crop]
+
+    # Occupancy: variable k covers periods start..start+duration-1
+    cover_var = np.repeat(np.arange(n_vars), var_duration)
+    cover_offset = np.arange(len(cover_var)) - np.repeat(np.cumsum(var_duration) - var_duration, var_duration)
+    cover_row = var_farm[cover_var] * n_periods + var_start[cover_var] + cover_offset
+    A_occ = sp.csr_matrix((np.ones(len(cover_var)), (cover_row, cover_var)), shape=(n_farms * n_periods, n_vars))
+    occ_rows = np.flatnonzero(np.diff(A_occ.indptr) > 0)
+    A_occ = A_occ[occ_rows]
+    b_occ = farm_areas[occ_rows // n_periods]
+
+    # N-fixer share per farm and year, only where a fixer can be planted that year
+    farm_ratio = np.array([fixer_ratios.get(g, np.nan) for g in farm_grades], dtype=np.float64)
+    var_year = var_start // periods_per_year
+    fixer_row_key = var_farm * years + var_year
+    has_fixer = np.bincount(fixer_row_key, weights=is_fixer[var_crop], minlength=n_farms * years) > 0
+    in_fixer = ~np.isnan(farm_ratio[var_farm]) & has_fixer[fixer_row_key]
+    A_fix = sp.csr_matrix((farm_ratio[var_farm[in_fixer]] - is_fixer[var_crop[in_fixer]],
+                           (fixer_row_key[in_fixer], np.flatnonzero(in_fixer))), shape=(n_farms * years, n_vars))
+    fix_rows = np.flatnonzero(np.diff(A_fix.indptr) > 0)
+    A_fix = A_fix[fix_rows]
+
+    blocks, b_blocks = [A_occ, A_fix], [b_occ, np.zeros(len(fix_rows))]
+    row_names = ([f'Occupancy_{farm_names[r // n_periods]}_P{r % n_periods}' for r in occ_rows] +
+                 [f'N_Fixer_{farm_names[r // years]}_Y{r % years}' for r in fix_rows])
+
+    # Rotation: cap the area replanted with the same crop right after harvest
+    if rotation:
+        key = (var_farm * n_crops + var_crop) * n_periods + var_start
+        follow_key = key + var_duration
+        pos = np.minimum(np.searchsorted(key, follow_key), n_vars - 1) if n_vars else np.zeros(0, dtype=np.int64)
+        has_follow = (var_start + var_duration < n_periods) & (key[pos] == follow_key) if n_vars else np.zeros(0, dtype=bool)
+        first, second = np.flatnonzero(has_follow), pos[has_follow]
+        n_rot = len(first)
+        A_rot = sp.csr_matrix((np.ones(2 * n_rot), (np.tile(np.arange(n_rot), 2), np.concatenate([first, second]))),
+                              shape=(n_rot, n_vars))
+        blocks.append(A_rot)
+        b_blocks.append(farm_areas[var_farm[first]])
+        row_names += [f'Rotation_{farm_names[var_farm[k]]}_{crop_names[var_crop[k]]}_P{var_start[k]}' for k in first]
+
+    return {
+        'farm_names': farm_names,
+        'farm_areas': farm_areas,
+        'farm_grades': farm_grades,
+        'crop_names': crop_names,
+        'crop_duration_periods': duration,
+        'period_season': period_season,
+        'var_farm': var_farm,
+        'var_crop': var_crop,
+        'var_start': var_start,
+        'c': c,
+        'A_ub': sp.vstack(blocks, format='csr'),
+        'b_ub': np.concatenate(b_blocks),
+        'row_names': row_names
+    }
+
+
+# --- 3. Solve and Plan ---
+def solve_rotation_plan(model, solver=None):
+    """Solve the rotation model with PuLP; returns (status, total_profit, plan_df)."""
+    var_names = [f'X{k}' for k in range(len(model['c']))]
+    prob, variables = pulp_problem_from_arrays(model['c'], model['A_ub'], model['b_ub'], var_names,
+                                               model['row_names'], name='Crop_Rotation_Planning')
+    prob.solve(solver or PULP_CBC_CMD(msg=False))
+    x = np.array([v.varValue or 0.0 for v in variables])
+    k = np.flatnonzero(x > 1e-9)
+    start = model['var_start'][k]
+    plan_df = pd.DataFrame({
+        'Farm_Name': model['farm_names'][model['var_farm'][k]],
+        'Crop_Name': model['crop_names'][model['var_crop'][k]],
+        'Start_Period': start,
+        'End_Period': start + model['crop_duration_periods'][model['var_crop'][k]] - 1,
+        'Season': np.where(model['period_season'][start] == 0, '春季', '秋季'),
+        'Area_m2_Allocated': np.round(x[k], 2)
+    })
+    return LpStatus[prob.status], value(prob.objective), plan_df
+
+
+def benchmark_rotation_build(plot_counts=(18, 100, 1000, 5000), period_counts=(4, 6, 8), years=1,
+                             solve_up_to=1000, seed=0):
+    """Build (and, for small instances, solve) times across plots × periods per year."""
+    rows = []
+    for n_plots in plot_counts:
+        farm_areas_df = make_farm_areas(n_plots, seed=seed)
+        grades = make_fertility_grades(farm_areas_df['Farm_Name'], seed=seed)
+        for periods_per_year in period_counts:
+            start = time.perf_counter()
+            model = build_rotation_arrays(farm_areas_df, lp_optimizer.crop_df, grades, lp_optimizer.recommendations,
+                                          lp_optimizer.nitrogen_fixers, periods_per_year=periods_per_year, years=years)
+            build_seconds = time.perf_counter() - start
+            solve_seconds = np.nan
+            if n_plots <= solve_up_to:
+                start = time.perf_counter()
+                solve_rotation_plan(model)
+                solve_seconds = time.perf_counter() - start
+            rows.append({
+                'Plots': n_plots,
+                'Periods': periods_per_year * years,
+                'Variables': len(model['c']),
+                'Rows': model['A_ub'].shape[0],
+                'Nonzeros': model['A_ub'].nnz,
+                'Build_s': round(build_seconds, 4),
+                'PuLP_Build_and_Solve_s': round(solve_seconds, 3)
+            })
+    return pd.DataFrame(rows)
+
+
+def main(periods_per_year=4, years=1):
+    model = build_rotation_arrays(lp_optimizer.farm_areas_df, lp_optimizer.crop_df, lp_optimizer.farm_fertility_grades,
+                                  lp_optimizer.recommendations, lp_optimizer.nitrogen_fixers,
+                                  periods_per_year=periods_per_year, years=years)
+    status, total_profit, plan_df = solve_rotation_plan(model)
+    print(f"--- Rotation Plan ({periods_per_year} periods/year, {years} year(s)) ---")
+    print(f"Status: {status}")
+    if status == 'Optimal':
+        print(f"Total Expected Profit: {total_profit:.2f} Yuan")
+        print(plan_df.to_string())
+    print("\n--- Build Benchmark ---")
+    print(benchmark_rotation_build().to_string())
+
+
+if __name__ == '__main__':
+    main()
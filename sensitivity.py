@@ -0,0 +1,204 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+from separable_solver import separable_structure, solve_separable
+
+# Post-solve sensitivity of the crop planting LP from one solve:
+#   constraints - shadow price (row dual) of every Area_Constraint_* and
+#                 N_Fixer_* row: Yuan gained per m² of extra area, or per m²
+#                 of relaxation of the fixer requirement
+#   variables   - reduced cost of every farm × crop variable (≤ 0; how much
+#                 a crop's profit per m² must rise before it enters that farm)
+#   ranging     - for each crop, how far its Profit_per_m2 can move (all of
+#                 its variables at once) while the current plan stays optimal
+# The model is separable per farm, so the optimal value of each farm is the
+# best of a few vertex plans (all on one crop, the fixer blend, nothing).
+# Along a change δ of one crop's profit each vertex value is a line in δ;
+# the current plan stays optimal while its own line is on top, which gives
+# per-farm limits that are intersected over the farms growing or eligible
+# for the crop.
+
+
+def _top_two(positions, c, var_farm, var_crop, n_farms):
+    """Per-farm best value, its crop and the runner-up value over the variables at `positions`."""
+    best = np.full(n_farms, -np.inf)
+    best_crop = np.full(n_farms, -1, dtype=np.intp)
+    second = np.full(n_farms, -np.inf)
+    if not len(positions):
+        return best, best_crop, second
+    values, farms = c[positions], var_farm[positions]
+    starts = np.flatnonzero(np.r_[True, farms[1:] != farms[:-1]])
+    best[farms[starts]] = np.maximum.reduceat(values, starts)
+    hits = np.flatnonzero(values == best[farms])
+    first = hits[np.r_[True, farms[hits][1:] != farms[hits][:-1]]]
+    best_crop[farms[first]] = var_crop[positions[first]]
+    rest = values.copy()
+    rest[first] = -np.inf
+    second[farms[starts]] = np.maximum.reduceat(rest, starts)
+    return best, best_crop, second
+
+
+def _limits(plan_value, plan_slope, lines, scale, tol):
+    """Range of δ over which the line plan_value + δ·plan_slope stays ≥ every (intercept, slope) line.
+
+    Slopes within tol·scale of the plan's count as parallel (solver round-off).
+    """
+    lower = np.full(len(plan_value), -np.inf)
+    upper = np.full(len(plan_value), np.inf)
+    for intercept, slope in lines:
+        gap = plan_value - intercept # ≥ 0 up to rounding: the plan is optimal at δ = 0
+        gap = np.where(np.isfinite(intercept), np.maximum(gap, 0.0), np.inf)
+        diff = slope - plan_slope
+        parallel = np.abs(diff) <= tol * scale
+        with np.errstate(divide='ignore', invalid='ignore'):
+            step = gap / np.abs(diff)
+        upper = np.where((diff > 0) & ~parallel, np.minimum(upper, step), upper)
+        lower = np.where((diff < 0) & ~parallel, np.maximum(lower, -step), lower)
+    return lower, upper
+
+
+def crop_ranging(model, solution, structure=None, tol=1e-7):
+    """Allowable decrease / increase of each crop's Profit_per_m2 keeping `solution` optimal."""
+    structure = structure or separable_structure(model)
+    if structure is None:
+        raise ValueError("Objective ranging needs the per-farm planting model (no coupling rows)")
+    c, var_farm, var_crop = model['c'], model['var_farm'], model['var_crop']
+    farm_names, crop_names = model['farm_names'], model['crop_names']
+    n_farms = len(farm_names)
+    fixer_var = model['is_fixer'][var_crop]
+    area = np.nan_to_num(structure['area'], nan=0.0)
+    has_ratio = ~np.isnan(structure['ratio'])
+    ratio = np.where(has_ratio, np.maximum(structure['ratio'], 0.0), 0.0)
+    feasible = ratio <= 1 # ratio > 1 only admits the empty plan, whatever the prices
+
+    top_fixer, top_fixer_crop, second_fixer = _top_two(np.flatnonzero(fixer_var), c, var_farm, var_crop, n_farms)
+    top_other, top_other_crop, second_other = _top_two(np.flatnonzero(~fixer_var), c, var_farm, var_crop, n_farms)
+    solution = np.asarray(solution, dtype=np.float64)
+    farm_value = np.bincount(var_farm, weights=c * solution, minlength=n_farms)
+
+    rows = []
+    order = np.argsort(var_crop, kind='stable')
+    bounds = np.searchsorted(var_crop[order], np.arange(len(crop_names) + 1))
+    for k, crop_name in enumerate(crop_names):
+        positions = order[bounds[k]:bounds[k + 1]]
+        farms = var_farm[positions]
+        p_k = model['crop_profit'][k]
+        A, r, plain = area[farms], ratio[farms], ~has_ratio[farms]
+        # Best fixer / non-fixer values on each farm without crop k
+        fixer_wo = np.where(top_fixer_crop[farms] == k, second_fixer[farms], top_fixer[farms])
+        other_wo = np.where(top_other_crop[farms] == k, second_other[farms], top_other[farms])
+        any_wo = np.maximum(fixer_wo, other_wo)
+        with np.errstate(invalid='ignore'):
+            blend_wo = r * fixer_wo + (1 - r) * other_wo # NaN for r = 1 without a non-fixer
+            # Best plan without crop k is a constant line; plans with k have slope = area share on k
+            without_k = np.where(plain, any_wo, np.where(feasible[farms], np.fmax(fixer_wo, blend_wo), -np.inf))
+            constant = np.maximum(without_k, 0.0) * A
+            lines = [(constant, np.zeros(len(farms)))]
+            is_fixer_k = bool(model['is_fixer'][k])
+            alone = plain | (is_fixer_k & feasible[farms]) # k grown on the whole farm
+            lines.append((np.where(alone, p_k * A, -np.inf), np.where(alone, A, 0.0)))
+            if is_fixer_k:
+                paired = ~plain & feasible[farms] & np.isfinite(other_wo) # k as the blend's fixer
+                lines.append((np.where(paired, (r * p_k + (1 - r) * other_wo) * A, -np.inf),
+                              np.where(paired, r * A, 0.0)))
+            else:
+                paired = ~plain & feasible[farms] & np.isfinite(fixer_wo) # k as the blend's non-fixer
+                lines.append((np.where(paired, (r * fixer_wo + (1 - r) * p_k) * A, -np.inf),
+                              np.where(paired, (1 - r) * A, 0.0)))
+        lower, upper = _limits(farm_value[farms], solution[positions], lines, np.maximum(A, 1.0), tol)
+        down, up = (lower.max(initial=-np.inf), upper.min(initial=np.inf))
+        rows.append({
+            'Crop_Name': crop_name,
+            'Profit_per_m2': p_k,
+            'Area_m2_Planted': float(solution[positions].sum()),
+            'Allowable_Decrease': -down,
+            'Allowable_Increase': up,
+            'Lower_Limit': p_k + down,
+            'Upper_Limit': p_k + up,
+            'Limiting_Farm_Down': farm_names[farms[np.argmax(lower)]] if np.isfinite(down) else None,
+            'Limiting_Farm_Up': farm_names[farms[np.argmin(upper)]] if np.isfinite(up) else None
+        })
+    return pd.DataFrame(rows)
+
+
+def sensitivity_report(model, result=None):
+    """Shadow prices, reduced costs and crop profit ranging for a planting model as DataFrames.
+
+    `result` is a solver_backends result dict with row duals (any LP backend
+    or 'separable'); without one, or without duals, the closed-form solve
+    supplies them.
+    """
+    structure = separable_structure(model)
+    if structure is None:
+        raise ValueError("Sensitivity report needs the per-farm planting model (no coupling rows)")
+    if result is None or result.get('row_duals') is None:
+        result = solve_separable(model, structure)
+    x, y = result['x'], result['row_duals']
+    n_area = len(model['area_farms'])
+    row_farms = np.concatenate([model['area_farms'], model['fixer_farms']])
+    activity = model['A_ub'] @ x
+    constraints = pd.DataFrame({
+        'Constraint': model['row_names'],
+        'Farm_Name': model['farm_names'][row_farms],
+        'Type': ['Area'] * n_area + ['N_Fixer'] * len(model['fixer_farms']),
+        'RHS': model['b_ub'],
+        'Activity': activity,
+        'Slack': model['b_ub'] - activity,
+        'Shadow_Price': y
+    })
+    reduced_costs = result['reduced_costs'] if result.get('reduced_costs') is not None else \
+        model['c'] - model['A_ub'].T @ y
+    variables = pd.DataFrame({
+        'Farm_Name': model['farm_names'][model['var_farm']],
+        'Crop_Name': model['crop_names'][model['var_crop']],
+        'Area_m2': x,
+        'Profit_per_m2': model['c'],
+        'Reduced_Cost': reduced_costs
+    })
+    return {
+        'objective': float(model['c'] @ x),
+        'backend': result['backend'],
+        'constraints': constraints,
+        'variables': variables,
+        'ranging': crop_ranging(model, x, structure)
+    }
+
+
+def sensitivity_json(report, path=None):
+    """Machine-readable sensitivity report (infinite limits as null); written to `path` if given."""
+    def records(df):
+        df = df.replace([np.inf, -np.inf], np.nan).astype(object)
+        return df.where(df.notna(), None).to_dict(orient='records')
+
+    payload = {'objective': report['objective'], 'backend': report['backend'],
+               **{key: records(report[key]) for key in ('constraints', 'variables', 'ranging')}}
+    text = json.dumps(payload, ensure_ascii=False, indent=2)
+    if path is not None:
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+    return text
+
+
+def main():
+    import lp_optimizer
+
+    planner = lp_optimizer.CropPlanner(lp_optimizer.farm_areas_df, lp_optimizer.crop_df,
+                                       lp_optimizer.farm_fertility_grades, lp_optimizer.recommendations,
+                                       lp_optimizer.nitrogen_fixers)
+    planner.solve()
+    report = planner.sensitivity()
+    pd.set_option('display.width', 200)
+    print(f"--- Sensitivity Report (objective {report['objective']:.2f} Yuan, {report['backend']} duals) ---")
+    print("\nShadow prices:")
+    print(report['constraints'].round(4).to_string())
+    print("\nNonzero reduced costs (first 20):")
+    variables = report['variables']
+    print(variables[variables['Reduced_Cost'] < -1e-9].head(20).round(4).to_string())
+    print("\nProfit_per_m2 ranging per crop:")
+    print(report['ranging'].round(4).to_string())
+
+
+if __name__ == '__main__':
+    main()
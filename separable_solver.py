@@ -0,0 +1,205 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+from solver_backends import DEFAULT_BACKEND, _result, solve_model
+from tracing import span
+
+# Closed-form solver for the crop planting LP when it is separable per farm.
+# With only the farm's area row (Σ x ≤ A) and its N-fixer row
+# (Σ x_fixer ≥ r·Σ x) every farm is an independent 2-row LP whose optimum is
+#   best fixer ≥ best non-fixer: all of A on the best fixer crop
+#   otherwise: r·A on the best fixer and (1 − r)·A on the best non-fixer,
+#              if that blended profit per m² is positive
+# and nothing is planted when no option has a positive profit. All farms are
+# solved at once with segment maxima over the farm-major variable order. The
+# matching dual values are closed-form too, so every result carries row duals
+# and reduced costs and its optimality can be certified without an LP
+# solver (certify_optimal). Models with any other rows (cross-farm
+# couplings) fall back to a general LP backend.
+
+
+def _segment_best(positions, c, var_farm, n_farms):
+    """Best c per farm over the variables at `positions` and where it first occurs (-inf / -1 if none)."""
+    best = np.full(n_farms, -np.inf)
+    position = np.full(n_farms, -1, dtype=np.intp)
+    if not len(positions):
+        return best, position
+    values, farms = c[positions], var_farm[positions]
+    starts = np.flatnonzero(np.r_[True, farms[1:] != farms[:-1]])
+    best[farms[starts]] = np.maximum.reduceat(values, starts)
+    hits = np.flatnonzero(values == best[farms])
+    hit_farms = farms[hits]
+    first = np.r_[True, hit_farms[1:] != hit_farms[:-1]]
+    position[hit_farms[first]] = positions[hits[first]]
+    return best, position
+
+
+def separable_structure(model, verify=False):
+    """Per-farm area and N-fixer ratio if the model has only per-farm area / N-fixer rows, else None.
+
+    The row layout declared by build_lp_arrays (one area row per farm, then
+    one N-fixer row per farm; extra coupling rows change the row count) is
+    checked per row; `verify=True` also checks every matrix entry.
+    Returns {'area': area row RHS per farm (NaN without a row), 'ratio': r per
+    farm (NaN without an N-fixer row)}.
+    """
+    var_farm, var_crop, is_fixer = model['var_farm'], model['var_crop'], model['is_fixer']
+    area_farms, fixer_farms = model['area_farms'], model['fixer_farms']
+    A, b = model['A_ub'].tocsr(), model['b_ub']
+    n_farms, n_area = len(model['farm_names']), len(area_farms)
+    if A.shape[0] != n_area + len(fixer_farms) or np.any(b[n_area:] != 0):
+        return None
+    # Each farm's rows hold exactly as many entries as the farm has variables
+    row_farm = np.concatenate([area_farms, fixer_farms])
+    vars_per_farm = np.bincount(var_farm, minlength=n_farms)
+    if not np.array_equal(np.diff(A.indptr), vars_per_farm[row_farm]):
+        return None
+    first_entry = A.indptr[:-1]
+    if A.nnz and not np.array_equal(var_farm[A.indices[first_entry[vars_per_farm[row_farm] > 0]]],
+                                    row_farm[vars_per_farm[row_farm] > 0]):
+        return None
+    # N-fixer entries are r − is_fixer: r from each row's first entry
+    fixer_row_start = first_entry[n_area:]
+    row_ratio = A.data[fixer_row_start] + is_fixer[var_crop[A.indices[fixer_row_start]]]
+    if verify:
+        entry_row = np.repeat(np.arange(A.shape[0]), np.diff(A.indptr))
+        if (np.any(np.diff(var_farm) < 0) or not np.array_equal(var_farm[A.indices], row_farm[entry_row])
+                or not np.all(A.data[entry_row < n_area] == 1.0)):
+            return None
+        fixer_entries = entry_row >= n_area
+        entry_ratio = A.data[fixer_entries] + is_fixer[var_crop[A.indices[fixer_entries]]]
+        if not np.allclose(entry_ratio, row_ratio[entry_row[fixer_entries] - n_area], rtol=0, atol=1e-12):
+            return None
+    area = np.full(n_farms, np.nan)
+    area[area_farms] = b[:n_area]
+    ratio = np.full(n_farms, np.nan)
+    ratio[fixer_farms] = row_ratio
+    return {'area': area, 'ratio': ratio}
+
+
+def solve_separable(model, structure=None):
+    """Closed-form optimum of a separable planting model as a solver_backends result dict (backend 'separable')."""
+    start = time.perf_counter()
+    structure = structure or separable_structure(model)
+    if structure is None:
+        raise ValueError("Model has cross-farm or non-standard rows; use solve_model() with an LP backend")
+    var_farm, c = model['var_farm'], model['c']
+    n_farms = len(model['farm_names'])
+    is_fixer = model['is_fixer'][model['var_crop']]
+    area = np.nan_to_num(structure['area'], nan=0.0)
+    has_ratio = ~np.isnan(structure['ratio'])
+    ratio = np.where(has_ratio, np.maximum(structure['ratio'], 0.0), 0.0)
+
+    best_fixer, fixer_pos = _segment_best(np.flatnonzero(is_fixer), c, var_farm, n_farms)
+    best_other, other_pos = _segment_best(np.flatnonzero(~is_fixer), c, var_farm, n_farms)
+    best_any = np.maximum(best_fixer, best_other)
+
+    # Case per farm: unconstrained, all on a fixer, or the r : (1 − r) blend
+    with np.errstate(invalid='ignore'):
+        blend = np.where(ratio <= 1, ratio * best_fixer + (1 - ratio) * best_other, -np.inf)
+    fixer_first = best_fixer >= best_other
+    plain = ~has_ratio | ~np.isfinite(best_fixer)
+    use_blend = ~plain & ~fixer_first & (blend > 0)
+    use_fixer = ~plain & fixer_first & (best_fixer > 0) & (ratio <= 1)
+    use_best = plain & (best_any > 0)
+
+    x = np.zeros(len(c))
+    best_pos = np.where(best_fixer >= best_other, fixer_pos, other_pos)
+    farms = np.flatnonzero(use_best)
+    x[best_pos[farms]] = area[farms]
+    farms = np.flatnonzero(use_fixer)
+    x[fixer_pos[farms]] = area[farms]
+    farms = np.flatnonzero(use_blend)
+    x[fixer_pos[farms]] = ratio[farms] * area[farms]
+    x[other_pos[farms]] = (1 - ratio[farms]) * area[farms]
+
+    # Duals (max-problem signs): y_area on the area row, y_fixer on ratio·Σx − Σx_fixer ≤ 0
+    y_area = np.where(plain, np.maximum(best_any, 0.0),
+                      np.where(fixer_first, np.maximum(best_fixer, 0.0), np.maximum(blend, 0.0)))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        y_fixer = np.where(fixer_first, 0.0, best_other - best_fixer)
+        over_one = ratio > 1 # Only x = 0 is feasible
+        y_fixer = np.where(over_one, np.maximum.reduce([best_fixer / (ratio - 1), best_other / ratio,
+                                                        np.zeros(n_farms)]), y_fixer)
+    y_area = np.where(over_one, 0.0, y_area)
+    row_duals = np.concatenate([y_area[model['area_farms']], y_fixer[model['fixer_farms']]])
+    reduced_costs = c - model['A_ub'].T @ row_duals
+    return _result('separable', 'Optimal', x, float(c @ x), time.perf_counter() - start, row_duals, reduced_costs,
+                   {'farms': n_farms})
+
+
+def certify_optimal(model, result, tol=1e-7):
+    """Primal/dual feasibility and duality gap of a result with row duals, as a dict."""
+    x, y = result['x'], result['row_duals']
+    slack = model['b_ub'] - model['A_ub'] @ x
+    reduced_costs = model['c'] - model['A_ub'].T @ y
+    primal, dual = float(model['c'] @ x), float(model['b_ub'] @ y)
+    scale = max(1.0, abs(primal))
+    certificate = {
+        'Primal_Feasible': bool(slack.min(initial=0.0) >= -tol * scale and x.min(initial=0.0) >= -tol),
+        'Dual_Feasible': bool(y.min(initial=0.0) >= -tol and reduced_costs.max(initial=0.0) <= tol),
+        'Duality_Gap': abs(primal - dual) / scale
+    }
+    certificate['Optimal'] = certificate['Primal_Feasible'] and certificate['Dual_Feasible'] and \
+        certificate['Duality_Gap'] <= tol
+    return certificate
+
+
+def solve_planning_model(model, fallback=DEFAULT_BACKEND, **options):
+    """Closed-form solve when the model is separable per farm, otherwise `fallback` LP backend."""
+    with span('lp.solve_separable', variables=len(model['c'])) as attrs:
+        structure = separable_structure(model)
+        attrs['separable'] = structure is not None
+        if structure is None:
+            return solve_model(model, fallback, **options)
+        return solve_separable(model, structure)
+
+
+# --- Benchmark ---
+def benchmark_separable(plot_counts=(1_000, 10_000, 100_000, 1_000_000), reference_limit=10_000, seed=0):
+    """Closed-form solve time per size, its optimality certificate and, up to `reference_limit` plots,
+    the PuLP/CBC objective for comparison."""
+    import lp_optimizer
+    from lp_model_builder import build_lp_arrays
+    from synthetic_data import make_farm_areas, make_fertility_grades
+
+    rows = []
+    for n in plot_counts:
+        farm_areas_df = make_farm_areas(n, seed=seed)
+        grades = make_fertility_grades(farm_areas_df['Farm_Name'], seed=seed)
+        start = time.perf_counter()
+        model = build_lp_arrays(farm_areas_df, lp_optimizer.crop_df, grades, lp_optimizer.recommendations,
+                                lp_optimizer.nitrogen_fixers)
+        build_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        result = solve_planning_model(model)
+        solve_seconds = time.perf_counter() - start
+        row = {'Plots': n, 'Variables': len(model['c']), 'Build_s': round(build_seconds, 3),
+               'Closed_Form_s': round(solve_seconds, 3), 'Objective': round(result['objective'], 2),
+               'Certified_Optimal': certify_optimal(model, result)['Optimal'], 'PuLP_s': None, 'PuLP_Match': None}
+        if n <= reference_limit:
+            reference = solve_model(model, 'cbc')
+            row['PuLP_s'] = round(reference['seconds'], 3)
+            row['PuLP_Match'] = bool(np.isclose(reference['objective'], result['objective'], rtol=1e-9))
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def main():
+    import lp_optimizer
+
+    planner = lp_optimizer.CropPlanner(lp_optimizer.farm_areas_df, lp_optimizer.crop_df,
+                                       lp_optimizer.farm_fertility_grades, lp_optimizer.recommendations,
+                                       lp_optimizer.nitrogen_fixers)
+    for backend in ('separable', 'cbc'):
+        planner.solve(backend=backend)
+        print(f"Campus plan ({backend}): {planner.status}, objective {planner.objective_value:.2f} Yuan")
+
+    print("\n--- Closed-Form Separable Solve ---")
+    print(benchmark_separable().to_string())
+
+
+if __name__ == '__main__':
+    main()
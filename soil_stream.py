@@ -0,0 +1,138 @@
+import os
+import resource
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from data_ingest import clean_col_name
+from fertility_scoring import score_soil
+from synthetic_data import write_soil_export_csv
+from tracing import traced
+from unit_parser import parse_numeric
+
+# Streaming reader for large soil-sample exports (附件1 layout: one row per
+# sample, units inside the cells). Rows are read in fixed-size batches from
+# CSV (pandas chunk iterator) or .xlsx (openpyxl read-only mode), cleaned to
+# float64 and handed on batch by batch, so memory stays bounded by the batch
+# size rather than by the file size.
+
+DEFAULT_BATCH_ROWS = 50_000
+
+# Cleaned soil column -> fertility_scoring input column
+SCORING_COLUMNS = {'pH': 'pH_value', '氮': 'N_mg_per_kg', '磷': 'P_mg_per_kg', '钾': 'K_mg_per_kg'}
+
+
+# --- 1. Raw Row Batches ---
+def _iter_csv_batches(path, batch_rows):
+    for chunk in pd.read_csv(path, dtype=str, chunksize=batch_rows, skip_blank_lines=True):
+        yield chunk
+
+
+def _iter_xlsx_batches(path, batch_rows, sheet_name=None):
+    from openpyxl import load_workbook # Only needed for Excel exports
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        sheet = workbook[sheet_name] if sheet_name else workbook.worksheets[0]
+        rows = sheet.iter_rows(values_only=True)
+        header = None
+        for row in rows:
+            # The 附件1 sheet starts with a title row; the header row is the first fully filled one
+            if row and all(cell is not None for cell in row):
+                header = [str(cell) for cell in row]
+                break
+        if header is None:
+            return
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) == batch_rows:
+                yield pd.DataFrame(batch, columns=header, dtype=object)
+                batch = []
+        if batch:
+            yield pd.DataFrame(batch, columns=header, dtype=object)
+    finally:
+        workbook.close()
+
+
+# --- 2. Typed, Unit-Stripped Batches ---
+@traced('ingest.clean_soil_batch')
+def clean_soil_batch(raw):
+    """Clean one raw batch: unit-free column names, 学院 as Farm_Name, float64 values.
+
+    Blank rows and trailing notes (e.g. '注：2024年11月采样') are dropped.
+    """
+    raw = raw.rename(columns=clean_col_name)
+    id_column = raw.columns[0]
+    farm_names = raw[id_column].astype(object)
+    keep = farm_names.notna() & ~farm_names.astype(str).str.startswith('注')
+    raw = raw[keep]
+    batch = pd.DataFrame({'Farm_Name': raw[id_column].astype(str).to_numpy()})
+    for col in raw.columns[1:]:
+        batch[col] = parse_numeric(raw[col])[0]
+    return batch
+
+
+def iter_soil_batches(path, batch_rows=DEFAULT_BATCH_ROWS, sheet_name=None):
+    """Yield cleaned soil batches of at most `batch_rows` rows from a .csv/.txt or .xlsx export."""
+    if str(path).lower().endswith(('.xlsx', '.xlsm')):
+        raw_batches = _iter_xlsx_batches(path, batch_rows, sheet_name)
+    else:
+        raw_batches = _iter_csv_batches(path, batch_rows)
+    for raw in raw_batches:
+        batch = clean_soil_batch(raw)
+        if len(batch):
+            yield batch
+
+
+def to_scoring_frame(batch):
+    """Rename a cleaned soil batch to the fertility_scoring input columns."""
+    return batch.rename(columns=SCORING_COLUMNS)[['Farm_Name'] + list(SCORING_COLUMNS.values())]
+
+
+def iter_scored_batches(path, batch_rows=DEFAULT_BATCH_ROWS, sheet_name=None):
+    """Stream an export straight through Pᵢ/P综 scoring, one scored batch at a time."""
+    for batch in iter_soil_batches(path, batch_rows, sheet_name):
+        yield score_soil(to_scoring_frame(batch))
+
+
+# --- 3. Benchmark ---
+def _stream_and_measure(path, batch_rows):
+    start = time.perf_counter()
+    n_rows, grade_counts = 0, pd.Series(dtype='int64')
+    for scored in iter_scored_batches(path, batch_rows):
+        n_rows += len(scored)
+        grade_counts = grade_counts.add(scored['Fertility_Grade'].value_counts(), fill_value=0)
+    seconds = time.perf_counter() - start
+    peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024 # KiB on Linux
+    return n_rows, seconds, peak_rss_mb
+
+
+def benchmark_soil_stream(row_counts=(100_000, 400_000, 1_600_000), batch_rows=DEFAULT_BATCH_ROWS, seed=0):
+    """Rows/sec and peak RSS of read + clean + score for growing CSV exports.
+
+    Each size runs in a fresh process so peak RSS is measured per input size.
+    """
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for n in row_counts:
+            path = os.path.join(tmp_dir, f'soil_{n}.csv')
+            write_soil_export_csv(path, n, seed=seed)
+            with ProcessPoolExecutor(max_workers=1) as pool:
+                n_rows, seconds, peak_rss_mb = pool.submit(_stream_and_measure, path, batch_rows).result()
+            rows.append({
+                'Rows': n_rows,
+                'File_MB': round(os.path.getsize(path) / 2**20, 1),
+                'Seconds': round(seconds, 2),
+                'Rows_per_s': round(n_rows / seconds),
+                'Peak_RSS_MB': round(peak_rss_mb, 1)
+            })
+            os.remove(path)
+    return pd.DataFrame(rows)
+
+
+if __name__ == '__main__':
+    print("--- Streaming Soil Reader Benchmark (CSV, batch of %d rows) ---" % DEFAULT_BATCH_ROWS)
+    print(benchmark_soil_stream().to_string())
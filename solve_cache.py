@@ -0,0 +1,346 @@
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from solver_backends import _result
+
+# Content-addressed cache for CropPlanner solves. The key is a SHA-256 of
+# the canonicalized inputs: graded farms and areas, recommendation sets (or
+# the per-plot eligibility), crop economics, N-fixers, fixer ratios and the
+# solver options (backend, demand curves, custom solver settings). Farms,
+# crops and dict entries are sorted and numbers written as floats, so the
+# same request in another order or with 465 vs 465.0 maps to the same key.
+# An entry holds the status, objective, nonzero areas per (farm, crop) and
+# the planting plan / per-farm summary tables; on a hit they are put back
+# into the planner in the request's farm and crop order, without a solve.
+#   MemoryCache - in-process, entries kept pickled (callers get copies)
+#   DiskCache   - one pickle file per key in a local directory, so entries
+#                 survive restarts (only point it at a trusted directory)
+# Both drop entries unused for max_age_s and evict the least recently used
+# ones beyond max_entries / max_bytes, and count hits, misses, stores and
+# evictions.
+
+CACHE_VERSION = 1 # Bump when the key inputs or the entry layout change
+
+
+def _number(value):
+    value = float(value)
+    return value + 0.0 # -0.0 -> 0.0
+
+
+def _solver_options(solver):
+    if solver is None:
+        return None
+    settings = {k: v for k, v in vars(solver).items()
+                if isinstance(v, (bool, int, float, str, type(None)))}
+    settings['options'] = [str(o) for o in getattr(solver, 'options', None) or []]
+    return {'class': type(solver).__name__, 'settings': settings}
+
+
+def canonical_inputs(planner, backend=None):
+    """JSON-ready dict of everything a CropPlanner solve depends on, in a canonical order."""
+    farms = planner.farm_areas_df
+    grades = planner.farm_fertility_grades
+    graded = farms[farms['Farm_Name'].map(grades).notna()]
+    crop_df = planner.crop_df.sort_values('Crop_Name', kind='stable')
+    inputs = {
+        'version': CACHE_VERSION,
+        'farms': sorted([name, _number(area), grades[name]]
+                        for name, area in zip(graded['Farm_Name'], graded['Area_m2'])),
+        'crops': [[name, _number(y), _number(cost), _number(price), _number(low)] for name, y, cost, price, low in zip(
+            crop_df['Crop_Name'], crop_df['Yield_kg_per_m2'], crop_df['Cost_Yuan_per_m2'],
+            crop_df[planner.price_column], crop_df['Min_Selling_Price_Yuan_per_kg'])],
+        'nitrogen_fixers': sorted(planner.nitrogen_fixers),
+        'fixer_ratios': sorted([grade, _number(ratio)] for grade, ratio in planner.fixer_ratios.items()),
+        'backend': backend or planner.backend,
+        'demand': planner.demand,
+        'solver': _solver_options(planner.solver)
+    }
+    if planner.eligibility is None:
+        inputs['recommendations'] = sorted([grade, sorted(crops)] for grade, crops in planner.recommendations.items())
+    else:
+        # Eligible crops of every modelled farm, as the model actually uses them
+        model = planner.model
+        pairs = pd.DataFrame({'farm': model['farm_names'][model['var_farm']],
+                              'crop': model['crop_names'][model['var_crop']]})
+        inputs['eligibility'] = sorted([farm, sorted(group['crop'])] for farm, group in pairs.groupby('farm'))
+    return inputs
+
+
+def planner_cache_key(planner, backend=None):
+    """SHA-256 hex digest of canonical_inputs()."""
+    text = json.dumps(canonical_inputs(planner, backend), ensure_ascii=False, sort_keys=True, separators=(',', ':'),
+                      default=str)
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+# --- 1. Planner Entries ---
+def cache_entry(planner, report):
+    """What a solved planner stores: status, objective, backend, nonzero areas and its (plan, summary) tables."""
+    model, x = planner.model, planner.solution
+    planted = np.flatnonzero(x != 0)
+    return {
+        'status': planner.status,
+        'objective': planner.objective_value,
+        'backend': planner.result['backend'] if planner.result else None,
+        'areas': list(zip(model['farm_names'][model['var_farm'][planted]].tolist(),
+                          model['crop_names'][model['var_crop'][planted]].tolist(), x[planted].tolist())),
+        'planting_plan': report[0],
+        'farm_summary': report[1]
+    }
+
+
+def restore_entry(planner, entry, seconds=0.0):
+    """Load a cached entry into the planner (solution, status, result) and return its (plan, summary) tables."""
+    model = planner.model
+    areas = {(farm, crop): area for farm, crop, area in entry['areas']}
+    x = np.array([areas.get(key, 0.0) for key in planner._var_keys()], dtype=np.float64)
+    for var, area in zip(planner.variables, x.tolist()):
+        var.varValue = area
+    planner.result = _result(entry['backend'], entry['status'], x, entry['objective'], seconds,
+                             stats={'cache': 'hit'})
+    planner.status = entry['status']
+    planner.objective_value = entry['objective']
+    planner.solution = x
+
+    # Back into this request's farm / crop order
+    farm_position = pd.Series(np.arange(len(model['farm_names'])), index=model['farm_names'])
+    crop_position = pd.Series(np.arange(len(model['crop_names'])), index=model['crop_names'])
+    plan = entry['planting_plan']
+    order = np.lexsort((plan['Crop_Name'].map(crop_position).to_numpy(), plan['Farm_Name'].map(farm_position).to_numpy()))
+    plan = plan.iloc[order].reset_index(drop=True)
+    summary = entry['farm_summary'].set_index('Farm_Name').reindex(model['farm_names'].tolist()).reset_index()
+    return plan, summary
+
+
+# --- 2. Backends ---
+class SolveCache:
+    """Common counters and eviction limits; subclasses store pickled entries."""
+
+    def __init__(self, max_entries=1024, max_bytes=256 * 2 ** 20, max_age_s=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_age_s = max_age_s
+        self.hits = self.misses = self.stores = self.evictions = 0
+
+    def _expired(self, last_used, now):
+        return self.max_age_s is not None and now - last_used > self.max_age_s
+
+    def get(self, key):
+        """The stored entry or None; counts a hit or a miss."""
+        value = self._load(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        self._store(key, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+        self.stores += 1
+        self.evictions += self._evict()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {'hits': self.hits, 'misses': self.misses, 'hit_rate': self.hits / lookups if lookups else None,
+                'stores': self.stores, 'evictions': self.evictions, **self._usage()}
+
+
+class MemoryCache(SolveCache):
+    """In-process cache: key -> (last use, pickled entry), least recently used first."""
+
+    def __init__(self, max_entries=1024, max_bytes=256 * 2 ** 20, max_age_s=None):
+        super().__init__(max_entries, max_bytes, max_age_s)
+        self._entries = OrderedDict()
+        self._bytes = 0
+
+    def _load(self, key):
+        item = self._entries.get(key)
+        if item is None:
+            return None
+        now = time.time()
+        if self._expired(item[0], now):
+            self._drop(key)
+            self.evictions += 1
+            return None
+        self._entries[key] = (now, item[1])
+        self._entries.move_to_end(key)
+        return pickle.loads(item[1])
+
+    def _store(self, key, data):
+        if key in self._entries:
+            self._drop(key)
+        self._entries[key] = (time.time(), data)
+        self._bytes += len(data)
+
+    def _drop(self, key):
+        _, data = self._entries.pop(key)
+        self._bytes -= len(data)
+
+    def _evict(self):
+        evicted = 0
+        now = time.time()
+        for key in [k for k, (last_used, _) in self._entries.items() if self._expired(last_used, now)]:
+            self._drop(key)
+            evicted += 1
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            self._drop(next(iter(self._entries)))
+            evicted += 1
+        return evicted
+
+    def _usage(self):
+        return {'entries': len(self._entries), 'bytes': self._bytes}
+
+    def clear(self):
+        self._entries.clear()
+        self._bytes = 0
+
+
+class DiskCache(SolveCache):
+    """One '<key>.pkl' file per entry under `directory`; a file's mtime is its last use."""
+
+    def __init__(self, directory, max_entries=1024, max_bytes=256 * 2 ** 20, max_age_s=None):
+        super().__init__(max_entries, max_bytes, max_age_s)
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.pkl")
+
+    def _load(self, key):
+        path = self._path(key)
+        try:
+            if self._expired(os.path.getmtime(path), time.time()):
+                os.remove(path)
+                self.evictions += 1
+                return None
+            with open(path, 'rb') as f:
+                value = pickle.load(f)
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        except (pickle.UnpicklingError, EOFError, AttributeError, ImportError, ValueError):
+            # Truncated or outdated entry: drop it and solve again
+            self._remove(path)
+            return None
+        return value
+
+    def _store(self, key, data):
+        # Write then rename, so readers never see a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, self._path(key))
+
+    def _files(self):
+        files = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.pkl'):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+        return sorted(files)
+
+    def _evict(self):
+        evicted = 0
+        now = time.time()
+        files = self._files()
+        keep = []
+        for mtime, size, path in files:
+            if self._expired(mtime, now):
+                evicted += self._remove(path)
+            else:
+                keep.append((mtime, size, path))
+        total = sum(size for _, size, _ in keep)
+        while keep and (len(keep) > self.max_entries or total > self.max_bytes):
+            _, size, path = keep.pop(0)
+            total -= size
+            evicted += self._remove(path)
+        return evicted
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+            return 1
+        except FileNotFoundError: # Evicted by another process
+            return 0
+
+    def _usage(self):
+        files = self._files()
+        return {'entries': len(files), 'bytes': sum(size for _, size, _ in files)}
+
+    def clear(self):
+        for _, _, path in self._files():
+            self._remove(path)
+
+
+# --- 3. Benchmark ---
+def benchmark_solve_cache(plot_counts=(18, 1_000, 10_000), backend='highs', seed=0):
+    """Seconds for a cold solve (miss + store) vs. the best of 3 memory hits / disk hits (fresh cache object)."""
+    import lp_optimizer
+    from synthetic_data import make_farm_areas, make_fertility_grades
+
+    rows = []
+    for n in plot_counts:
+        if n == len(lp_optimizer.farm_areas_df):
+            farm_areas_df, grades = lp_optimizer.farm_areas_df, lp_optimizer.farm_fertility_grades
+        else:
+            farm_areas_df = make_farm_areas(n, seed=seed)
+            grades = make_fertility_grades(farm_areas_df['Farm_Name'], seed=seed)
+        args = (farm_areas_df, lp_optimizer.crop_df, grades, lp_optimizer.recommendations, lp_optimizer.nitrogen_fixers)
+        with tempfile.TemporaryDirectory() as directory:
+            seconds = {}
+            for label, cache in (('memory', MemoryCache()), ('disk', DiskCache(directory))):
+                planner = lp_optimizer.CropPlanner(*args, backend=backend, cache=cache)
+                start = time.perf_counter()
+                planner.solve()
+                lp_optimizer.build_planting_report(planner)
+                seconds.setdefault('Miss_s', time.perf_counter() - start)
+                if label == 'disk':
+                    cache = DiskCache(directory) # As after a restart
+                    planner.cache = cache
+                hits = []
+                for _ in range(3):
+                    start = time.perf_counter()
+                    planner.solve()
+                    lp_optimizer.build_planting_report(planner)
+                    hits.append(time.perf_counter() - start)
+                seconds[f'Hit_{label}_s'] = min(hits)
+                seconds[f'{label}_stats'] = cache.stats()
+            rows.append({'Plots': n, 'Miss_s': round(seconds['Miss_s'], 4),
+                         'Memory_Hit_s': round(seconds['Hit_memory_s'], 4), 'Disk_Hit_s': round(seconds['Hit_disk_s'], 4),
+                         'Disk_Entry_Bytes': seconds['disk_stats']['bytes'],
+                         'Disk_Hits_After_Restart': seconds['disk_stats']['hits']})
+    return pd.DataFrame(rows)
+
+
+def main():
+    import lp_optimizer
+
+    cache = MemoryCache(max_entries=64)
+    planner = lp_optimizer.CropPlanner(lp_optimizer.farm_areas_df, lp_optimizer.crop_df,
+                                       lp_optimizer.farm_fertility_grades, lp_optimizer.recommendations,
+                                       lp_optimizer.nitrogen_fixers, cache=cache)
+    for prices in (None, {'蒜': 12.5}, {'蒜': 12.25}, None):
+        if prices:
+            planner.update_prices(prices)
+        planner.solve()
+        print(f"Objective {planner.objective_value:.2f} Yuan ({planner.result['stats'].get('cache', 'solved')})")
+    print(f"Counters: {cache.stats()}")
+
+    print("\n--- Solve Cache Latency ---")
+    print(benchmark_solve_cache().to_string())
+
+
+if __name__ == '__main__':
+    main()
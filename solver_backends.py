@@ -0,0 +1,183 @@
+import time
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from pulp import PULP_CBC_CMD, LpStatus
+from scipy.optimize import Bounds, LinearConstraint, linprog, milp
+
+from lp_model_builder import pulp_problem_from_arrays
+from tracing import cbc_log_stats, solver_log_path, span
+
+# Pluggable solvers for the array form of the planting models
+# (max c·x s.t. A_ub·x ≤ b_ub, lb ≤ x ≤ ub, optional integrality).
+#   'cbc'   - PuLP model handed to the CBC executable (writes an MPS file,
+#             spawns a process and reads the solution file back)
+#   'highs' - in-process HiGHS through scipy.optimize.linprog (LP) or milp
+#             (MIP) directly on the sparse matrices
+# Every backend returns the same result dict, so callers can switch per run.
+# For LPs the result also carries the row duals (shadow prices of the max
+# problem) and the reduced costs of the variables.
+
+DEFAULT_BACKEND = 'cbc'
+
+# scipy.optimize status codes -> LpStatus strings used throughout the planners
+_SCIPY_STATUS = {0: 'Optimal', 1: 'Not Solved', 2: 'Infeasible', 3: 'Unbounded', 4: 'Undefined'}
+
+
+def _bound_array(bounds, n, default):
+    if bounds is None:
+        return np.full(n, default, dtype=np.float64)
+    values = np.broadcast_to(np.asarray(bounds, dtype=object), (n,))
+    return np.array([default if v is None else v for v in values], dtype=np.float64)
+
+
+def _result(backend, status, x, objective, seconds, row_duals=None, reduced_costs=None, stats=None):
+    return {
+        'backend': backend,
+        'status': status,
+        'objective': objective if status == 'Optimal' else None,
+        'x': x,
+        'row_duals': row_duals,
+        'reduced_costs': reduced_costs,
+        'seconds': seconds,
+        'stats': stats or {}
+    }
+
+
+# --- 1. Backends ---
+def pulp_result(prob, variables, row_names, c, seconds, stats=None, backend='cbc'):
+    """Common result dict for a solved PuLP problem (duals and reduced costs for LPs)."""
+    status = LpStatus[prob.status]
+    x = np.array([v.varValue or 0.0 for v in variables], dtype=np.float64)
+    row_duals = reduced_costs = None
+    if status == 'Optimal' and prob.isMIP() == 0:
+        row_duals = np.array([prob.constraints[r].pi or 0.0 for r in row_names], dtype=np.float64)
+        reduced_costs = np.array([v.dj or 0.0 for v in variables], dtype=np.float64)
+    return _result(backend, status, x, float(np.dot(c, x)), seconds, row_duals, reduced_costs, stats)
+
+
+def _solve_cbc(c, A_ub, b_ub, lower, upper, integrality, options):
+    start = time.perf_counter()
+    n = len(c)
+    categories = ['Integer' if flag else 'Continuous' for flag in integrality] if integrality is not None else 'Continuous'
+    row_names = [f'R{r}' for r in range(len(b_ub))]
+    prob, variables = pulp_problem_from_arrays(
+        c, A_ub, b_ub, [f'X{k}' for k in range(n)], row_names,
+        lower_bounds=[None if np.isinf(v) else v for v in lower.tolist()],
+        upper_bounds=[None if np.isinf(v) else v for v in upper.tolist()], categories=categories)
+    log_path = solver_log_path()
+    prob.solve(PULP_CBC_CMD(msg=False, logPath=log_path, gapRel=options.get('gap_rel'),
+                            timeLimit=options.get('time_limit')))
+    return pulp_result(prob, variables, row_names, c, time.perf_counter() - start, cbc_log_stats(log_path))
+
+
+def _solve_highs(c, A_ub, b_ub, lower, upper, integrality, options):
+    start = time.perf_counter()
+    c = np.asarray(c, dtype=np.float64)
+    if integrality is None:
+        res = linprog(-c, A_ub=A_ub, b_ub=b_ub, bounds=np.column_stack([lower, upper]), method='highs',
+                      options={k: v for k, v in (('time_limit', options.get('time_limit')),) if v is not None})
+        status = _SCIPY_STATUS.get(res.status, 'Undefined')
+        x = res.x if res.x is not None else np.zeros(len(c))
+        row_duals = reduced_costs = None
+        if status == 'Optimal':
+            # linprog minimizes -c·x: flip the marginals back to the max problem
+            row_duals = -res.ineqlin.marginals
+            reduced_costs = -(res.lower.marginals + res.upper.marginals)
+        stats = {'iterations': int(res.nit)}
+    else:
+        milp_options = {k: v for k, v in (('time_limit', options.get('time_limit')),
+                                          ('mip_rel_gap', options.get('gap_rel'))) if v is not None}
+        res = milp(-c, constraints=LinearConstraint(A_ub, -np.inf, b_ub), integrality=np.asarray(integrality),
+                   bounds=Bounds(lower, upper), options=milp_options)
+        status = _SCIPY_STATUS.get(res.status, 'Undefined')
+        x = res.x if res.x is not None else np.zeros(len(c))
+        row_duals = reduced_costs = None
+        stats = {'nodes': getattr(res, 'mip_node_count', None), 'gap': getattr(res, 'mip_gap', None)}
+    return _result('highs', status, np.asarray(x, dtype=np.float64), float(np.dot(c, x)),
+                   time.perf_counter() - start, row_duals, reduced_costs, stats)
+
+
+# Backend name -> solve function(c, A_ub, b_ub, lower, upper, integrality, options)
+SOLVER_BACKENDS = {
+    'cbc': _solve_cbc,
+    'highs': _solve_highs
+}
+
+
+# --- 2. Solve API ---
+def solve_arrays(c, A_ub, b_ub, backend=DEFAULT_BACKEND, lower_bounds=0, upper_bounds=None, integrality=None,
+                 **options):
+    """Maximize c·x s.t. A_ub·x ≤ b_ub with the chosen backend; returns the common result dict.
+
+    Keys: backend, status (LpStatus string), objective, x, row_duals and
+    reduced_costs (LPs only, max-problem signs), seconds, stats.
+    `integrality` is a per-variable 0/1 sequence (1 = integer). Options:
+    time_limit (s), gap_rel (MIPs).
+    """
+    if backend not in SOLVER_BACKENDS:
+        raise ValueError(f"Unknown solver backend: {backend!r} (available: {sorted(SOLVER_BACKENDS)})")
+    n = len(c)
+    lower = _bound_array(lower_bounds, n, -np.inf)
+    upper = _bound_array(upper_bounds, n, np.inf)
+    if integrality is not None and not np.any(integrality):
+        integrality = None
+    A_ub = sp.csr_matrix(A_ub, shape=(len(b_ub), n))
+    with span('lp.solve_arrays', backend=backend, variables=n, rows=A_ub.shape[0]) as attrs:
+        result = SOLVER_BACKENDS[backend](np.asarray(c, dtype=np.float64), A_ub, np.asarray(b_ub, dtype=np.float64),
+                                          lower, upper, integrality, options)
+        attrs.update(result['stats'], status=result['status'])
+    return result
+
+
+def solve_model(model, backend=DEFAULT_BACKEND, **options):
+    """Solve a build_lp_arrays() model (x ≥ 0)."""
+    return solve_arrays(model['c'], model['A_ub'], model['b_ub'], backend=backend, **options)
+
+
+# --- 3. Latency Comparison ---
+def compare_backends(plot_counts=(100, 1_000, 10_000, 50_000), backends=tuple(SOLVER_BACKENDS), repeats=3, seed=0):
+    """Best-of-`repeats` solve latency per backend on synthetic campus-crop models."""
+    import lp_optimizer
+    from lp_model_builder import build_lp_arrays
+    from synthetic_data import make_farm_areas, make_fertility_grades
+
+    rows = []
+    for n in plot_counts:
+        farm_areas_df = make_farm_areas(n, seed=seed)
+        grades = make_fertility_grades(farm_areas_df['Farm_Name'], seed=seed)
+        model = build_lp_arrays(farm_areas_df, lp_optimizer.crop_df, grades, lp_optimizer.recommendations,
+                                lp_optimizer.nitrogen_fixers)
+        objectives = {}
+        for backend in backends:
+            seconds = []
+            for _ in range(repeats):
+                result = solve_model(model, backend)
+                seconds.append(result['seconds'])
+            objectives[backend] = result['objective']
+            rows.append({'Plots': n, 'Variables': len(model['c']), 'Backend': backend, 'Status': result['status'],
+                         'Objective': round(result['objective'], 2), 'Best_s': round(min(seconds), 4)})
+        reference = objectives[backends[0]]
+        for row in rows[-len(backends):]:
+            row['Matches_' + backends[0]] = bool(np.isclose(objectives[row['Backend']], reference, rtol=1e-7))
+    return pd.DataFrame(rows)
+
+
+def main():
+    import lp_optimizer
+
+    planner = lp_optimizer.CropPlanner(lp_optimizer.farm_areas_df, lp_optimizer.crop_df,
+                                       lp_optimizer.farm_fertility_grades, lp_optimizer.recommendations,
+                                       lp_optimizer.nitrogen_fixers)
+    print("--- Campus Plan per Backend ---")
+    for backend in SOLVER_BACKENDS:
+        status = planner.solve(backend=backend)
+        print(f"{backend}: {status}, objective {planner.objective_value:.2f} Yuan")
+
+    print("\n--- Solve Latency (best of 3) ---")
+    print(compare_backends().to_string())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+import numpy as np
+import pandas as pd
+
+# Synthetic farm instances for benchmarks, shaped like the 附件1/附件4 data.
+
+
+def make_farm_areas(n_plots, seed=None, min_area=100, max_area=650):
+    """Farm_Name / Area_m2 table with integer areas like the 附件4 register."""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'Farm_Name': [f'地块{i + 1}' for i in range(n_plots)],
+        'Area_m2': rng.integers(min_area, max_area + 1, n_plots)
+    })
+
+
+def make_fertility_grades(farm_names, seed=None, grade_shares=(0.1, 0.8, 0.1)):
+    """Random farm -> I/II/III grade map; default shares follow the campus instance."""
+    rng = np.random.default_rng(seed)
+    grades = rng.choice(np.array(['I', 'II', 'III'], dtype=object), size=len(farm_names), p=grade_shares)
+    return dict(zip(farm_names, grades))
+
+
+SOIL_EXPORT_HEADER = ['学院', '温度℃', '水分%', '电导率us/cm', '酸碱度', '氮mg/kg', '磷mg/kg', '钾mg/kg', '肥力mg/kg']
+
+
+def make_soil_samples(n_rows, seed=None, start=0):
+    """Soil readings in the 附件1 value ranges as a plain numeric DataFrame."""
+    rng = np.random.default_rng(seed)
+    nitrogen = rng.uniform(10, 60, n_rows).round(0)
+    return pd.DataFrame({
+        '学院': [f'地块{i + 1}' for i in range(start, start + n_rows)],
+        '温度': rng.uniform(12, 22, n_rows).round(1),
+        '水分': rng.uniform(15, 40, n_rows).round(1),
+        '电导率': rng.uniform(250, 1100, n_rows).round(1),
+        'pH': rng.uniform(5.0, 8.6, n_rows).round(1),
+        '氮': nitrogen,
+        '磷': (nitrogen * rng.uniform(1.3, 1.5, n_rows)).round(0),
+        '钾': (nitrogen * rng.uniform(3.0, 3.4, n_rows)).round(0),
+        '肥力': (nitrogen * rng.uniform(10.5, 11.5, n_rows)).round(0)
+    })
+
+
+def write_soil_export_csv(path, n_rows, seed=None, chunk_rows=100_000):
+    """Write a 附件1-style export (units inside the cells) chunk by chunk."""
+    rng = np.random.default_rng(seed)
+    units = ['', '℃', '%', 'us/cm', '', 'mg/kg', 'mg/kg', 'mg/kg', 'mg/kg']
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        f.write(','.join(SOIL_EXPORT_HEADER) + '\n')
+        for start in range(0, n_rows, chunk_rows):
+            chunk = make_soil_samples(min(chunk_rows, n_rows - start), seed=rng.integers(1 << 31), start=start)
+            lines = chunk.iloc[:, 0].astype(str)
+            for col, unit in zip(chunk.columns[1:], units[1:]):
+                lines = lines + ',' + chunk[col].astype(str) + unit
+            f.write('\n'.join(lines) + '\n')
+
+
+def write_area_register(path, n_plots, seed=None, shared_share=0.05, chunk_rows=100_000):
+    """Write a 附件4-style area register ("地块12 423㎡"), with some 后勤临时管理用地 lines."""
+    rng = np.random.default_rng(seed)
+    with open(path, 'w', encoding='utf-8') as f:
+        for start in range(0, n_plots, chunk_rows):
+            chunk = make_farm_areas(min(chunk_rows, n_plots - start), seed=rng.integers(1 << 31))
+            names = pd.Series([f'地块{i + 1}' for i in range(start, start + len(chunk))], dtype=object)
+            names[rng.random(len(chunk)) < shared_share] = '后勤临时管理用地'
+            spacer = np.where(rng.random(len(chunk)) < 0.3, ' ㎡', '㎡')
+            f.write('\n'.join(names + ' ' + chunk['Area_m2'].astype(str) + spacer) + '\n')
+
+
+def make_crop_catalogue(n_crops, seed=None):
+    """附件3-style crop table (yields in kg/m², Min/Max/Avg prices) with n_crops synthetic crops."""
+    rng = np.random.default_rng(seed)
+    min_price = rng.uniform(1.5, 17.0, n_crops).round(1)
+    max_price = (min_price + rng.uniform(0.5, 3.0, n_crops)).round(1)
+    cycle_start = rng.integers(15, 180, n_crops)
+    return pd.DataFrame({
+        'ID': np.arange(1, n_crops + 1),
+        'Crop_Name': [f'作物{j + 1}' for j in range(n_crops)],
+        'Planting_Season': rng.choice(np.array(['春季', '秋季', '双季'], dtype=object), n_crops),
+        'Growth_Cycle_days': [f'{a}~{a + b}天' for a, b in zip(cycle_start, rng.integers(15, 60, n_crops))],
+        'Yield_kg_per_m2': (rng.uniform(2.0, 10.0, n_crops) * 2).round(0) / 2,
+        'Cost_Yuan_per_m2': rng.integers(3, 7, n_crops),
+        'Min_Selling_Price_Yuan_per_kg': min_price,
+        'Max_Selling_Price_Yuan_per_kg': max_price,
+        'Avg_Selling_Price_Yuan_per_kg': (min_price + max_price) / 2
+    })
+
+
+def make_recommendations(crop_names, seed=None, crops_per_grade=7, n_fixers=2):
+    """Random grade -> crop lists in the shape of lp_optimizer.recommendations; returns (recommendations, fixers)."""
+    rng = np.random.default_rng(seed)
+    crop_names = np.asarray(crop_names, dtype=object)
+    fixers = rng.choice(crop_names, size=min(n_fixers, len(crop_names)), replace=False)
+    others = crop_names[~np.isin(crop_names, fixers)]
+    recommendations = {}
+    for grade in ('I', 'II', 'III'):
+        picks = rng.choice(others, size=min(max(crops_per_grade - len(fixers), 0), len(others)), replace=False)
+        recommendations[grade] = list(picks) + list(fixers)
+    return recommendations, list(fixers)
@@ -0,0 +1,32 @@
+import io
+
+import pytest
+
+from farm_area_parser import parse_area_text, read_area_register
+
+COLLIDING_REGISTERS = [
+    "学院4 465㎡\n后勤临时管理用地1 10㎡\n后勤临时管理用地 20㎡\n",
+    "学院4 465㎡\n学院4 10㎡\n学院4_2 20㎡\n",
+    "学院4_2 20㎡\n学院4 465㎡\n学院4 10㎡\n学院4 30㎡\n",
+]
+
+
+@pytest.mark.parametrize('text', COLLIDING_REGISTERS)
+def test_farm_names_are_unique(text):
+    df_areas, malformed = parse_area_text(text)
+    assert df_areas['Farm_Name'].is_unique
+    assert len(df_areas) == text.count('\n') and malformed.empty
+
+
+@pytest.mark.parametrize('text', COLLIDING_REGISTERS)
+def test_chunked_names_match_whole_text(text):
+    whole = parse_area_text(text)[0]
+    chunked = read_area_register(io.StringIO(text), chunk_lines=1)[0]
+    assert chunked['Farm_Name'].tolist() == whole['Farm_Name'].tolist()
+
+
+@pytest.mark.parametrize('line', ['学院4 46.5㎡', '465㎡', '  465 ㎡', '.5㎡'])
+def test_malformed_lines_are_reported(line):
+    df_areas, malformed = parse_area_text(f"学院1 610㎡\n{line}\n学院2 522 ㎡\n")
+    assert df_areas['Farm_Name'].tolist() == ['学院1', '学院2']
+    assert malformed['Line_Number'].tolist() == [2] and malformed['Line'].tolist() == [line.strip()]
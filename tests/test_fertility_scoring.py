@@ -0,0 +1,10 @@
+import pandas as pd
+
+from fertility_scoring import score_soil
+
+
+def test_score_soil_matches_row_loop():
+    # fertility_calculator is a script: importing it runs the per-farm loop
+    import fertility_calculator
+    pd.testing.assert_frame_equal(score_soil(fertility_calculator.soil_df), fertility_calculator.output_df,
+                                  check_exact=True)
@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import lp_optimizer
+from fertility_scoring import score_soil
+from incremental_planner import IncrementalPlanner, _synthetic_soil
+from synthetic_data import make_farm_areas
+
+ARGS = (lp_optimizer.crop_df, lp_optimizer.recommendations, lp_optimizer.nitrogen_fixers)
+
+
+@pytest.mark.parametrize('backend', ['cbc', 'highs'])
+def test_apply_changes_matches_planning_from_scratch(backend):
+    n = 60
+    soil_df, farm_areas_df = _synthetic_soil(n, 0), make_farm_areas(n, seed=0)
+    incremental = IncrementalPlanner(soil_df, farm_areas_df, *ARGS, backend=backend)
+
+    # A new sample that changes one plot's grade, a resized plot and a new plot
+    candidates = _synthetic_soil(n, 1)
+    old_grades = score_soil(soil_df)['Fertility_Grade'].to_numpy()
+    regraded = int(np.flatnonzero(score_soil(candidates)['Fertility_Grade'].to_numpy() != old_grades)[0])
+    resized = (regraded + 1) % n
+    new_farm = _synthetic_soil(1, 2, start=n)
+    new_soil = pd.concat([candidates.iloc[[regraded]], new_farm], ignore_index=True)
+    areas = {farm_areas_df['Farm_Name'].iloc[resized]: 123, new_farm['Farm_Name'].iloc[0]: 456}
+    result = incremental.apply_changes(new_soil, areas)
+    assert list(result['Regraded']) == [soil_df['Farm_Name'].iloc[regraded]]
+    assert result['Added'] == [new_farm['Farm_Name'].iloc[0]]
+
+    soil_after = soil_df.copy()
+    soil_after.iloc[regraded] = candidates.iloc[regraded].to_numpy()
+    soil_after = pd.concat([soil_after, new_farm], ignore_index=True)
+    areas_after = farm_areas_df.copy()
+    areas_after.loc[resized, 'Area_m2'] = 123
+    areas_after = pd.concat([areas_after, pd.DataFrame({'Farm_Name': list(areas)[1:], 'Area_m2': [456]})],
+                            ignore_index=True)
+    reference = IncrementalPlanner(soil_after, areas_after, *ARGS, backend=backend)
+
+    planner = incremental.planner
+    assert result['Status'] == 'Optimal'
+    assert np.isclose(result['Objective'], reference.planner.objective_value, rtol=1e-9)
+    assert planner.result['objective'] == planner.objective_value
+    assert planner.result['backend'] == backend
@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from lp_model_builder import build_lp_arrays
+from separable_solver import certify_optimal, separable_structure, solve_planning_model, solve_separable
+from solver_backends import solve_arrays
+from synthetic_data import make_crop_catalogue, make_farm_areas, make_fertility_grades, make_recommendations
+
+
+def synthetic_model(seed, n_plots=300, fixer_ratios=None):
+    crop_df = make_crop_catalogue(12, seed=seed)
+    recommendations, fixers = make_recommendations(crop_df['Crop_Name'], seed=seed)
+    farm_areas_df = make_farm_areas(n_plots, seed=seed)
+    grades = make_fertility_grades(farm_areas_df['Farm_Name'], seed=seed)
+    kwargs = {} if fixer_ratios is None else {'fixer_ratios': fixer_ratios}
+    return build_lp_arrays(farm_areas_df, crop_df, grades, recommendations, fixers, **kwargs)
+
+
+def allocation(model, x):
+    # Area per farm and (profit, fixer) class, so ties between equally profitable crops do not matter
+    keys = pd.DataFrame({'farm': model['var_farm'], 'c': model['c'],
+                         'fixer': model['is_fixer'][model['var_crop']], 'x': x})
+    return keys.groupby(['farm', 'c', 'fixer'])['x'].sum().to_numpy()
+
+
+CASES = [(seed, None) for seed in (0, 1, 2)] + [(3, {'II': 0.10, 'III': 1.0})]
+
+
+@pytest.mark.parametrize('seed, fixer_ratios', CASES)
+def test_closed_form_matches_highs(seed, fixer_ratios):
+    model = synthetic_model(seed, fixer_ratios=fixer_ratios)
+    assert separable_structure(model, verify=True) is not None
+    result = solve_planning_model(model)
+    reference = solve_arrays(model['c'], model['A_ub'], model['b_ub'], backend='highs')
+    assert result['backend'] == 'separable' and reference['status'] == 'Optimal'
+    assert np.isclose(result['objective'], reference['objective'], rtol=1e-9)
+    np.testing.assert_allclose(allocation(model, result['x']), allocation(model, reference['x']), atol=1e-6)
+    assert certify_optimal(model, result)['Optimal']
+
+
+def test_grade_three_all_fixer_farm():
+    model = synthetic_model(3, fixer_ratios={'II': 0.10, 'III': 1.0})
+    result = solve_separable(model)
+    grade_three = np.flatnonzero(model['farm_grades'] == 'III')
+    assert len(grade_three)
+    planted = np.isin(model['var_farm'], grade_three) & (result['x'] > 0)
+    assert planted.any() and model['is_fixer'][model['var_crop'][planted]].all()
+    np.testing.assert_allclose(np.bincount(model['var_farm'][planted], weights=result['x'][planted],
+                                           minlength=len(model['farm_names']))[grade_three],
+                               model['farm_areas'][grade_three])
+
+
+def test_certificate_rejects_a_suboptimal_plan():
+    model = synthetic_model(0)
+    result = solve_separable(model)
+    worse = dict(result, x=result['x'] * 0.5)
+    assert not certify_optimal(model, worse)['Optimal']
@@ -0,0 +1,124 @@
+import os
+
+import numpy as np
+import pytest
+
+import lp_optimizer
+from recommendation_engine import eligibility_mask, requirements_from_recommendations
+from solve_cache import DiskCache, MemoryCache, planner_cache_key
+
+
+def campus_planner(**kwargs):
+    return lp_optimizer.CropPlanner(lp_optimizer.farm_areas_df, lp_optimizer.crop_df,
+                                    lp_optimizer.farm_fertility_grades, lp_optimizer.recommendations,
+                                    lp_optimizer.nitrogen_fixers, backend='highs', **kwargs)
+
+
+def campus_mask():
+    crop_names = lp_optimizer.crop_df['Crop_Name'].to_numpy(dtype=object)
+    requirements = requirements_from_recommendations(lp_optimizer.recommendations, crop_names)
+    return eligibility_mask(lp_optimizer.farm_areas_df['Farm_Name'].to_numpy(dtype=object),
+                            lp_optimizer.farm_fertility_grades, requirements)
+
+
+def test_same_inputs_in_another_order_share_a_key():
+    planner = campus_planner()
+    shuffled = lp_optimizer.CropPlanner(
+        lp_optimizer.farm_areas_df.iloc[::-1].astype({'Area_m2': float}), lp_optimizer.crop_df.iloc[::-1],
+        dict(reversed(list(lp_optimizer.farm_fertility_grades.items()))),
+        {grade: crops[::-1] for grade, crops in reversed(list(lp_optimizer.recommendations.items()))},
+        lp_optimizer.nitrogen_fixers[::-1], backend='highs')
+    assert planner_cache_key(shuffled) == planner_cache_key(planner)
+
+
+@pytest.mark.parametrize('change', ['price', 'area', 'ratio', 'eligibility', 'backend'])
+def test_any_key_input_change_misses(change):
+    planner = campus_planner(eligibility=campus_mask() if change == 'eligibility' else None)
+    key = planner_cache_key(planner)
+    crop = lp_optimizer.crop_df['Crop_Name'].iloc[0]
+    farm = lp_optimizer.farm_areas_df['Farm_Name'].iloc[0]
+    if change == 'price':
+        planner.update_prices({crop: float(lp_optimizer.crop_df['Avg_Selling_Price_Yuan_per_kg'].iloc[0]) + 0.1})
+    elif change == 'area':
+        planner.update_areas({farm: 466})
+    elif change == 'ratio':
+        planner.update_fixer_ratios({'II': 0.15})
+    elif change == 'eligibility':
+        mask = campus_mask()
+        mask['mask'] = mask['mask'].tolil()
+        mask['mask'][0, :] = 0
+        mask['mask'] = mask['mask'].tocsr()
+        planner.update_eligibility(mask)
+    else:
+        planner.backend = 'cbc'
+    assert planner_cache_key(planner) != key
+
+
+def test_identical_inputs_hit_and_changed_inputs_miss():
+    cache = MemoryCache()
+    planner = campus_planner(cache=cache)
+    planner.solve()
+    objective = planner.objective_value
+    report = lp_optimizer.build_planting_report(planner)
+
+    again = campus_planner(cache=cache)
+    again.solve()
+    assert again.result['stats'] == {'cache': 'hit'}
+    assert again.objective_value == objective
+    np.testing.assert_array_equal(again.solution, planner.solution)
+    assert lp_optimizer.build_planting_report(again)[0].equals(report[0])
+
+    again.update_areas({lp_optimizer.farm_areas_df['Farm_Name'].iloc[0]: 100})
+    again.solve()
+    assert again.result['stats'] != {'cache': 'hit'}
+    assert again.objective_value != objective
+    assert (cache.hits, cache.misses, cache.stores) == (1, 2, 2)
+
+
+def _age(cache, key, seconds):
+    # Pretend the entry was last used `seconds` ago
+    if isinstance(cache, MemoryCache):
+        last_used, data = cache._entries[key]
+        cache._entries[key] = (last_used - seconds, data)
+    else:
+        path = cache._path(key)
+        then = os.path.getmtime(path) - seconds
+        os.utime(path, (then, then))
+
+
+@pytest.fixture(params=['memory', 'disk'])
+def make_cache(request, tmp_path):
+    def make(**kwargs):
+        return MemoryCache(**kwargs) if request.param == 'memory' else DiskCache(str(tmp_path), **kwargs)
+    return make
+
+
+def test_least_recently_used_entry_is_evicted(make_cache):
+    cache = make_cache(max_entries=2)
+    cache.put('a', {'value': 1})
+    cache.put('b', {'value': 2})
+    _age(cache, 'a', 20)
+    _age(cache, 'b', 10)
+    assert cache.get('a') == {'value': 1} # a is now the most recently used
+    cache.put('c', {'value': 3})
+    assert cache.get('b') is None
+    assert cache.get('a') == {'value': 1} and cache.get('c') == {'value': 3}
+    assert cache.stats()['entries'] == 2 and cache.evictions == 1
+
+
+def test_entries_older_than_max_age_are_dropped(make_cache):
+    cache = make_cache(max_age_s=60)
+    cache.put('old', {'value': 1})
+    cache.put('new', {'value': 2})
+    _age(cache, 'old', 120)
+    assert cache.get('old') is None
+    assert cache.get('new') == {'value': 2}
+    assert cache.evictions == 1 and cache.stats()['entries'] == 1
+
+
+def test_size_limit_evicts_oldest(make_cache):
+    cache = make_cache(max_bytes=1_500)
+    cache.put('a', {'value': 'x' * 1_000})
+    _age(cache, 'a', 10)
+    cache.put('b', {'value': 'y' * 1_000})
+    assert cache.get('a') is None and cache.get('b') is not None
@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+
+from unit_parser import parse_numeric, _regex_path
+
+
+def test_unitless_first_cell():
+    numbers, unit = parse_numeric(['12', '13mg/kg', '14mg/kg'])
+    np.testing.assert_array_equal(numbers, [12.0, 13.0, 14.0])
+    assert unit == 'mg/kg'
+
+
+def test_mixed_units_match_regex_path():
+    cells = ['12℃', '13%']
+    numbers, unit = parse_numeric(cells)
+    np.testing.assert_array_equal(numbers, _regex_path(pd.Series(cells)))
+    assert unit == '℃'
+
+
+def test_same_dimension_units_are_converted():
+    numbers, unit = parse_numeric(['12mg/kg', '1g/kg', '5'])
+    np.testing.assert_array_equal(numbers, [12.0, 1000.0, 5.0])
+    assert unit == 'mg/kg'
+
+
+def test_unknown_suffix_is_nan():
+    numbers, _ = parse_numeric(['1', 'x2', '3abc'])
+    assert numbers[0] == 1.0 and np.isnan(numbers[1:]).all()
+
+
+def test_unknown_first_suffix_is_not_the_column_unit():
+    numbers, unit = parse_numeric(['1_000mg/kg', '2mg/kg'])
+    assert np.isnan(numbers[0]) and numbers[1] == 2.0
+    assert unit == 'mg/kg'
+
+
+def test_unit_is_only_stripped_at_the_end_of_a_cell():
+    numbers, unit = parse_numeric(['12mg/kg', '1mg/kg3'])
+    assert numbers[0] == 12.0 and np.isnan(numbers[1])
+    numbers, _ = parse_numeric(b'12mg/kg\n1mg/kg3\n')
+    assert numbers[0] == 12.0 and np.isnan(numbers[1])
+
+
+def test_junk_first_cell():
+    numbers, unit = parse_numeric(['5abc', '6', '7'])
+    assert np.isnan(numbers[0])
+    np.testing.assert_array_equal(numbers[1:], [6.0, 7.0])
+    assert unit == ''
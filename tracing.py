@@ -0,0 +1,266 @@
+import atexit
+import functools
+import json
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import pandas as pd
+
+# Opt-in instrumentation for the planning scripts. Ingest, scoring, LP build
+# and solve, report output and chart rendering run inside named spans; while
+# tracing is off a span is a single global check. When on (enable_tracing()
+# or the PLANNER_TRACE environment variable), every finished span records
+# wall and CPU seconds, the net number of allocated memory blocks, optional
+# tracemalloc peak bytes, its parent span and any attributes the code adds
+# (e.g. CBC iterations, nodes and gap). Spans go to a JSON-lines file (one
+# record per span, appended as they finish) or to a Chrome trace file
+# (.json, for chrome://tracing / Perfetto) written when tracing stops.
+
+TRACE_ENV_VAR = 'PLANNER_TRACE' # Path of the trace file; '.json' selects the Chrome trace format
+TRACE_ALLOC_ENV_VAR = 'PLANNER_TRACE_ALLOCATIONS' # '1' also tracks tracemalloc peak bytes per span
+
+_tracer = None
+
+
+class _Tracer:
+    def __init__(self, path, fmt, allocations):
+        self.path = path
+        self.fmt = fmt
+        self.allocations = allocations
+        self.origin = time.perf_counter()
+        self.events = []
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.file = open(path, 'a', encoding='utf-8') if fmt == 'jsonl' else None
+        if allocations and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def stack(self):
+        if not hasattr(self.local, 'stack'):
+            self.local.stack = []
+        return self.local.stack
+
+    def emit(self, record):
+        with self.lock:
+            if self.file is not None:
+                self.file.write(json.dumps(record, ensure_ascii=False, default=str) + '\n')
+                self.file.flush()
+            else:
+                self.events.append(record)
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+        else:
+            write_chrome_trace(self.events, self.path)
+        if self.allocations:
+            tracemalloc.stop()
+
+
+# --- 1. Switching Tracing On and Off ---
+def enable_tracing(path, fmt=None, allocations=False):
+    """Start recording spans to `path` ('jsonl', or 'chrome' – the default for *.json paths)."""
+    global _tracer
+    disable_tracing()
+    fmt = fmt or ('chrome' if str(path).lower().endswith('.json') else 'jsonl')
+    if fmt not in ('jsonl', 'chrome'):
+        raise ValueError(f"Unknown trace format: {fmt!r} (expected 'jsonl' or 'chrome')")
+    _tracer = _Tracer(path, fmt, allocations)
+    return path
+
+
+def disable_tracing():
+    """Stop recording and flush the trace file."""
+    global _tracer
+    tracer, _tracer = _tracer, None
+    if tracer is not None:
+        tracer.close()
+
+
+def tracing_enabled():
+    return _tracer is not None
+
+
+# --- 2. Spans ---
+@contextmanager
+def span(name, **attrs):
+    """Time the enclosed block as span `name`; yields a dict for extra attributes.
+
+    With tracing off this only yields `attrs` back.
+    """
+    tracer = _tracer
+    if tracer is None:
+        yield attrs
+        return
+    stack = tracer.stack()
+    parent = stack[-1] if stack else None
+    if tracer.allocations:
+        # Fold the running peak into the parent before resetting it for this span
+        if parent is not None:
+            parent['peak'] = max(parent['peak'], tracemalloc.get_traced_memory()[1])
+        tracemalloc.reset_peak()
+    frame = {'name': name, 'peak': 0}
+    stack.append(frame)
+    blocks = sys.getallocatedblocks()
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    try:
+        yield attrs
+    finally:
+        wall = time.perf_counter() - wall_start
+        cpu = time.process_time() - cpu_start
+        record = {
+            'name': name,
+            'start_s': round(wall_start - tracer.origin, 6),
+            'wall_s': round(wall, 6),
+            'cpu_s': round(cpu, 6),
+            'alloc_blocks': sys.getallocatedblocks() - blocks,
+            'parent': parent['name'] if parent is not None else None,
+            'depth': len(stack) - 1,
+            'pid': os.getpid(),
+            'tid': threading.get_ident()
+        }
+        if tracer.allocations:
+            frame['peak'] = max(frame['peak'], tracemalloc.get_traced_memory()[1])
+            record['peak_alloc_bytes'] = frame['peak']
+            if parent is not None:
+                parent['peak'] = max(parent['peak'], frame['peak'])
+        stack.pop()
+        if attrs:
+            record['attrs'] = attrs
+        tracer.emit(record)
+
+
+def traced(name):
+    """Decorator running the function inside span(name)."""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _tracer is None:
+                return func(*args, **kwargs)
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+# --- 3. Solver Statistics ---
+_CBC_PATTERNS = {
+    'rows': (r'Problem \S+ has (\d+) rows', int),
+    'columns': (r'Problem \S+ has \d+ rows, (\d+) columns', int),
+    'elements': (r'columns and (\d+) elements', int),
+    'iterations': (r'(?:Total iterations|Optimal objective \S+ -)\s*:?\s*(\d+)', int),
+    'nodes': (r'Enumerated nodes:\s*(\d+)', int),
+    'gap': (r'^Gap:\s*(\S+)', float),
+    'objective': (r'(?:Objective value:|Optimal objective)\s*(\S+)', float),
+    'solver_cpu_s': (r'Total time \(CPU seconds\):\s*(\S+)', float),
+    'solver_wall_s': (r'\(Wallclock seconds\):\s*(\S+)', float)
+}
+
+
+def solver_log_path():
+    """Temporary CBC log file while tracing is on, else None (pass as PULP_CBC_CMD(logPath=...))."""
+    if _tracer is None:
+        return None
+    handle, path = tempfile.mkstemp(prefix='cbc-', suffix='.log')
+    os.close(handle)
+    return path
+
+
+def cbc_log_stats(log_path, remove=True):
+    """Iterations, nodes, gap, size and timing parsed from a CBC log (empty dict without a log)."""
+    if log_path is None or not os.path.exists(log_path):
+        return {}
+    with open(log_path, encoding='utf-8', errors='replace') as f:
+        text = f.read()
+    if remove:
+        os.remove(log_path)
+    stats = {}
+    for key, (pattern, convert) in _CBC_PATTERNS.items():
+        match = re.search(pattern, text, re.M)
+        if match:
+            try:
+                stats[key] = convert(match.group(1))
+            except ValueError:
+                pass
+    return stats
+
+
+# --- 4. Trace Files ---
+def write_chrome_trace(records, path):
+    """Write span records as Chrome trace 'complete' events (microsecond timestamps)."""
+    events = [{'name': r['name'], 'ph': 'X', 'ts': round(r['start_s'] * 1e6, 1), 'dur': round(r['wall_s'] * 1e6, 1),
+               'pid': r['pid'], 'tid': r['tid'],
+               'args': {k: v for k, v in r.items() if k not in ('name', 'start_s', 'wall_s', 'pid', 'tid')}}
+              for r in records]
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f, ensure_ascii=False, default=str)
+    return path
+
+
+def read_trace(path):
+    """Span records from a JSON-lines or Chrome trace file as a DataFrame."""
+    with open(path, encoding='utf-8') as f:
+        if str(path).lower().endswith('.json'):
+            records = [{'name': e['name'], 'start_s': e['ts'] / 1e6, 'wall_s': e['dur'] / 1e6, 'pid': e['pid'],
+                        'tid': e['tid'], **e['args']} for e in json.load(f)['traceEvents']]
+        else:
+            records = [json.loads(line) for line in f if line.strip()]
+    return pd.DataFrame(records)
+
+
+def summarize_trace(path):
+    """Per-span totals (calls, wall, CPU, allocated blocks) sorted by total wall time."""
+    spans = read_trace(path)
+    return (spans.groupby('name', sort=False)
+            .agg(Calls=('wall_s', 'size'), Wall_s=('wall_s', 'sum'), CPU_s=('cpu_s', 'sum'),
+                 Alloc_Blocks=('alloc_blocks', 'sum'))
+            .sort_values('Wall_s', ascending=False).round(4))
+
+
+if os.environ.get(TRACE_ENV_VAR):
+    enable_tracing(os.environ[TRACE_ENV_VAR], allocations=os.environ.get(TRACE_ALLOC_ENV_VAR) == '1')
+atexit.register(disable_tracing)
+
+
+def main():
+    # Go through the imported module: when run as a script this file is __main__,
+    # a separate copy from the `tracing` module the instrumented code uses
+    import tracing
+    import lp_optimizer
+    import visualizer
+    from data_ingest import parse_crop_workbook, parse_soil_workbook
+    from fertility_scoring import score_soil
+    from soil_stream import to_scoring_frame
+
+    trace_dir = tempfile.mkdtemp()
+    trace_file = os.path.join(trace_dir, 'planner_trace.jsonl')
+    tracing.enable_tracing(trace_file, allocations=True)
+    with tracing.span('run.lp_optimizer_workflow'):
+        soil = parse_soil_workbook()
+        parse_crop_workbook()
+        scored = score_soil(to_scoring_frame(soil.reset_index().rename(columns={soil.index.name: 'Farm_Name'})))
+        planner = lp_optimizer.CropPlanner(lp_optimizer.farm_areas_df, lp_optimizer.crop_df,
+                                           lp_optimizer.farm_fertility_grades, lp_optimizer.recommendations,
+                                           lp_optimizer.nitrogen_fixers)
+        planner.solve()
+        lp_optimizer.build_planting_report(planner)
+        grade_counts = scored['Fertility_Grade'].value_counts()
+        visualizer.plot_fertility_distribution({f'Grade {g}': int(grade_counts.get(g, 0)) for g in ('I', 'II', 'III')},
+                                               os.path.join(trace_dir, 'fertility_distribution.png'))
+    tracing.disable_tracing()
+
+    print(f"--- Span Summary ({trace_file}) ---")
+    print(summarize_trace(trace_file).to_string())
+    spans = read_trace(trace_file)
+    print(f"\nSolver statistics: {spans.loc[spans['name'] == 'lp.solve', 'attrs'].iloc[-1]}")
+
+
+if __name__ == '__main__':
+    main()
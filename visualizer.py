@@ -3,37 +3,60 @@ matplotlib.use('Agg') # Use a non-interactive backend
 import matplotlib.pyplot as plt
 import pandas as pd
 
+from tracing import traced
+
 # Data for Soil Fertility Distribution
 # Based on Step 4/6 outputs: 1 Grade I, 1 Grade III, 16 Grade II (12 original + 4 '后勤' assumed II)
 fertility_grades_counts = {'Grade I': 1, 'Grade II': 16, 'Grade III': 1}
-grades = list(fertility_grades_counts.keys())
-counts = list(fertility_grades_counts.values())
 
-# Create Bar Chart
-plt.figure(figsize=(8, 6))
-bars = plt.bar(grades, counts, color=['#4CAF50', '#FFC107', '#F44336']) # Green, Amber, Red
 
-# Add titles and labels
-plt.title('Soil Fertility Grade Distribution Across Micro-Farms', fontsize=16)
-plt.xlabel('Fertility Grade', fontsize=12)
-plt.ylabel('Number of Farms', fontsize=12)
-plt.xticks(fontsize=10)
-plt.yticks(range(0, max(counts) + 2, 2), fontsize=10) # Adjust y-axis ticks
+@traced('viz.fertility_distribution')
+def plot_fertility_distribution(fertility_grades_counts, file_path='fertility_distribution.png'):
+    """Bar chart of the number of farms per fertility grade."""
+    grades = list(fertility_grades_counts.keys())
+    counts = list(fertility_grades_counts.values())
+
+    # Create Bar Chart
+    plt.figure(figsize=(8, 6))
+    bars = plt.bar(grades, counts, color=['#4CAF50', '#FFC107', '#F44336']) # Green, Amber, Red
+
+    # Add titles and labels
+    plt.title('Soil Fertility Grade Distribution Across Micro-Farms', fontsize=16)
+    plt.xlabel('Fertility Grade', fontsize=12)
+    plt.ylabel('Number of Farms', fontsize=12)
+    plt.xticks(fontsize=10)
+    plt.yticks(range(0, max(counts) + 2, 2), fontsize=10) # Adjust y-axis ticks
+
+    # Add count labels on top of bars
+    for bar in bars:
+        yval = bar.get_height()
+        plt.text(bar.get_x() + bar.get_width()/2.0, yval + 0.1, int(yval), ha='center', va='bottom', fontsize=10)
+
+    # Add a grid for better readability
+    plt.grid(axis='y', linestyle='--', alpha=0.7)
 
-# Add count labels on top of bars
-for bar in bars:
-    yval = bar.get_height()
-    plt.text(bar.get_x() + bar.get_width()/2.0, yval + 0.1, int(yval), ha='center', va='bottom', fontsize=10)
+    # Save the chart
+    plt.savefig(file_path)
+    plt.close() # Close the figure to free memory
+    return file_path
 
-# Add a grid for better readability
-plt.grid(axis='y', linestyle='--', alpha=0.7)
 
-# Save the chart
-file_path = 'fertility_distribution.png'
-plt.savefig(file_path)
-plt.close() # Close the figure to free memory
+@traced('viz.farm_profits')
+def plot_farm_profits(planting_plan_df, file_path='planting_profit_by_farm.png'):
+    """Stacked bar chart of expected profit per farm, split by crop."""
+    profits = planting_plan_df.pivot_table(index='Farm_Name', columns='Crop_Name', values='Expected_Profit_from_Crop',
+                                           aggfunc='sum', sort=False).fillna(0)
+    ax = profits.plot(kind='bar', stacked=True, figsize=(12, 6))
+    ax.set_title('Expected Profit per Farm (Optimized Planting Plan)', fontsize=16)
+    ax.set_xlabel('Farm', fontsize=12)
+    ax.set_ylabel('Expected Profit (Yuan)', fontsize=12)
+    ax.grid(axis='y', linestyle='--', alpha=0.7)
+    plt.tight_layout()
+    plt.savefig(file_path)
+    plt.close()
+    return file_path
+
 
-print(f"Bar chart saved to {file_path}")
 
 # Data for Optimized Planting Plan Table (to be used in the report text)
 # This part is more for structuring the data for the text report
@@ -62,5 +85,14 @@ crop_details_data = {
 # enriched_df = pd.DataFrame(enriched_plan)
 # print("\nEnriched Planting Plan (Conceptual for Text Report):")
 # print(enriched_df.to_string())
-# This part is illustrative; the actual table will be built in the report text.
-print("Visualizer script finished conceptual data structuring for report.")
+
+
+def main():
+    file_path = plot_fertility_distribution(fertility_grades_counts)
+    print(f"Bar chart saved to {file_path}")
+    # This part is illustrative; the actual table will be built in the report text.
+    print("Visualizer script finished conceptual data structuring for report.")
+
+
+if __name__ == '__main__':
+    main()